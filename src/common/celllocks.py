@@ -0,0 +1,73 @@
+"""Locks for bot updates running on many threads: one global lock, or one lock per region of the world.
+
+With GlobalLock only one bot in the whole world moves at a time. CellLocks splits the world into square cells and
+gives each cell a lock (cells share a fixed pool of `stripes` locks by hash, so the world needs no bounds). Before its
+update a bot takes the locks of every cell within `reach` of its position:
+
+- reach = bot size + twice the longest single step. Two bots that could touch by the end of their moves are within
+  reach of each other now, so their lock sets share at least one lock and they never update at the same time.
+- Bots further apart update concurrently. They still read each other's positions in the collision scan, but only
+  to find them out of range, which doesn't depend on how far through its move the other bot is.
+
+Locks are always taken in ascending stripe order, so two bots with overlapping lock sets can't deadlock. Changes to
+the bot list itself (add/remove, dragging a bot) take every lock with all().
+"""
+import contextlib
+import math
+import threading
+from typing import Iterator, List
+
+
+class GlobalLock:
+    """Same interface as CellLocks, one lock for everything"""
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def for_move(self, x: float, y: float) -> Iterator[None]:
+        with self.lock:
+            yield
+
+    @contextlib.contextmanager
+    def all(self) -> Iterator[None]:
+        with self.lock:
+            yield
+
+
+class CellLocks:
+    def __init__(self, cell_size: float = 40.0, reach: float = 20.0, stripes: int = 64):
+        self.cell_size = cell_size
+        self.reach = reach
+        self.locks = [threading.Lock() for _ in range(stripes)]
+
+    def stripes_for(self, x: float, y: float) -> List[int]:
+        """Sorted indexes of the locks for the cells within reach of (x, y)"""
+        size = self.cell_size
+        r = self.reach
+        col0, col1 = int(math.floor((x - r) / size)), int(math.floor((x + r) / size))
+        row0, row1 = int(math.floor((y - r) / size)), int(math.floor((y + r) / size))
+        count = len(self.locks)
+        return sorted({(col * 73856093 ^ row * 19349663) % count
+                       for col in range(col0, col1 + 1) for row in range(row0, row1 + 1)})
+
+    @contextlib.contextmanager
+    def for_move(self, x: float, y: float) -> Iterator[None]:
+        """Hold the locks for a bot at (x, y) to update"""
+        held = [self.locks[i] for i in self.stripes_for(x, y)]
+        for lock in held:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(held):
+                lock.release()
+
+    @contextlib.contextmanager
+    def all(self) -> Iterator[None]:
+        for lock in self.locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self.locks):
+                lock.release()
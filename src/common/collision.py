@@ -0,0 +1,71 @@
+"""Collision queries that stop at the first hit.
+
+arcade's collides_with_list() runs the general polygon-vs-polygon test against every candidate and builds the full
+list of overlapping sprites, but the bots only ever need to know "would I overlap anything?". These functions stop at
+the first hit and use cheap tests for the common case of square (rectangular) hit boxes:
+
+- both sprites axis-aligned (angle a multiple of 90): exact AABB test, no polygons at all
+- otherwise: circumscribed circles that don't touch -> no hit, inscribed circles that overlap -> hit
+- only what is left over falls back to arcade's polygon test
+
+Candidates come from the list's spatial hash when it has one, or from its `collision_grid` (a common.spatial.SpatialGrid
+queried `collision_pad` around the sprite, see crowd_tiles.tiles.TileBots), otherwise every sprite in it is tested.
+
+Assumes sprites use the default rectangular hit box from their width/height (true for all Bots).
+"""
+import math
+
+import arcade
+from arcade.geometry import are_polygons_intersecting
+
+
+def _half_extents(sprite):
+    """Half width/height of the sprite's hit box in world axes (only valid when angle is a multiple of 90)"""
+    if sprite.angle % 180 == 90:
+        return sprite.height / 2, sprite.width / 2
+    return sprite.width / 2, sprite.height / 2
+
+
+def overlaps(a: arcade.Sprite, b: arcade.Sprite) -> bool:
+    """Do the hit boxes of the two sprites overlap? Same answer as arcade's polygon test, but cheaper."""
+    dx = abs(a.center_x - b.center_x)
+    dy = abs(a.center_y - b.center_y)
+    if a.angle % 90 == 0 and b.angle % 90 == 0:
+        a_hw, a_hh = _half_extents(a)
+        b_hw, b_hh = _half_extents(b)
+        return dx < a_hw + b_hw and dy < a_hh + b_hh
+
+    a_hw, a_hh = a.width / 2, a.height / 2
+    b_hw, b_hh = b.width / 2, b.height / 2
+    dist2 = dx * dx + dy * dy
+    outer = math.hypot(a_hw, a_hh) + math.hypot(b_hw, b_hh)
+    if dist2 >= outer * outer:
+        return False
+    inner = min(a_hw, a_hh) + min(b_hw, b_hh)
+    if dist2 < inner * inner:
+        return True
+    return are_polygons_intersecting(a.points, b.points)
+
+
+def _candidates(sprite: arcade.Sprite, sprite_list: arcade.SpriteList):
+    if getattr(sprite_list, 'use_spatial_hash', False):
+        return sprite_list.spatial_hash.get_objects_for_box(sprite)
+    grid = getattr(sprite_list, 'collision_grid', None)
+    if grid is not None:  # a common.spatial.SpatialGrid of the list, with positions as of its last rebuild
+        pad = sprite_list.collision_pad
+        x, y = sprite.center_x, sprite.center_y
+        return grid.query_box(x - pad, y - pad, x + pad, y + pad)
+    return sprite_list
+
+
+def first_collision(sprite: arcade.Sprite, sprite_list: arcade.SpriteList):
+    """Return the first sprite in sprite_list that overlaps sprite (ignoring sprite itself), or None"""
+    for other in _candidates(sprite, sprite_list):
+        if other is not sprite and overlaps(sprite, other):
+            return other
+    return None
+
+
+def any_collision(sprite: arcade.Sprite, sprite_list: arcade.SpriteList) -> bool:
+    """Early-exit replacement for `len(sprite.collides_with_list(sprite_list)) > 0`"""
+    return first_collision(sprite, sprite_list) is not None
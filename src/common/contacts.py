@@ -0,0 +1,153 @@
+"""Per-pair contact cache so jammed bots don't rescan the whole world to find the neighbour they hit last frame.
+
+A bot that was blocked by another bot last frame is very likely blocked by the same one this frame (deadlocked
+clusters are common). query() first re-tests last frame's contacts of the bot, which is one overlap test per contact,
+and only falls back to a full scan when none of them still blocks it. Cached contacts where either bot has moved more
+than `threshold` since the contact was recorded are dropped instead of re-tested.
+
+The overlap test is always made on current positions, so the cache only changes how fast the answer is found, not the
+answer (apart from which blocker is reported when several overlap).
+
+Contacts are keyed by bot id pair. end_frame() turns the pairs seen this frame into contact begin/end events.
+
+ContactEvents is the other half: bots report who blocked them, and once per frame the whole frame's begin/persist/end
+events go out in one batch per bot class, so behaviours react to contacts in one pass instead of each bot handling
+(or polling) its own. Each world has its own (see events_of()): bot ids repeat across worlds, so a shared one would
+match one world's contacts against another's.
+"""
+import collections
+from typing import Callable, Dict, List, NamedTuple, Set, Tuple
+
+from common import collision
+
+Pair = Tuple[int, int]
+
+
+def pair_key(a, b) -> Pair:
+    return (a.id, b.id) if a.id < b.id else (b.id, a.id)
+
+
+class ContactCache:
+    def __init__(self, threshold: float = 2.0):
+        self.threshold = threshold
+        # bot id -> [(other bot, own x, own y, other x, other y)] recorded last frame
+        self._last: Dict[int, List[tuple]] = {}
+        self._current: Dict[int, List[tuple]] = collections.defaultdict(list)
+        self.pairs: Set[Pair] = set()
+        self._pairs_now: Set[Pair] = set()
+        self.began: Set[Pair] = set()
+        self.ended: Set[Pair] = set()
+        self.cache_hits = 0
+        self.full_scans = 0
+
+    def _record(self, sprite, other) -> None:
+        self._current[sprite.id].append((other, sprite.center_x, sprite.center_y, other.center_x, other.center_y))
+        self._pairs_now.add(pair_key(sprite, other))
+
+    def query(self, sprite, sprite_list) -> bool:
+        """Does sprite overlap any sprite in sprite_list? Drop-in for collision.any_collision()."""
+        return self.first(sprite, sprite_list) is not None
+
+    def first(self, sprite, sprite_list):
+        """The sprite in sprite_list that sprite overlaps, or None. Drop-in for collision.first_collision()."""
+        t = self.threshold
+        x, y = sprite.center_x, sprite.center_y
+        for other, sx, sy, ox, oy in self._last.get(sprite.id, ()):
+            if not getattr(other, 'alive', True):
+                continue
+            if abs(x - sx) > t or abs(y - sy) > t or abs(other.center_x - ox) > t or abs(other.center_y - oy) > t:
+                continue
+            if collision.overlaps(sprite, other):
+                self.cache_hits += 1
+                self._record(sprite, other)
+                return other
+        self.full_scans += 1
+        other = collision.first_collision(sprite, sprite_list)
+        if other is not None:
+            self._record(sprite, other)
+        return other
+
+    def end_frame(self) -> None:
+        """Make this frame's contacts the ones re-tested next frame and work out which contacts began/ended"""
+        now = self._pairs_now
+        self.began = now - self.pairs
+        self.ended = self.pairs - now
+        self.pairs = now
+        self._pairs_now = set()
+        self._last = dict(self._current)
+        self._current = collections.defaultdict(list)
+
+    def reset_stats(self) -> None:
+        self.cache_hits = 0
+        self.full_scans = 0
+
+
+BEGIN, PERSIST, END = 'begin', 'persist', 'end'
+
+
+class ContactEvent(NamedTuple):
+    kind: str  # BEGIN: first frame bot was blocked by other, PERSIST: again this frame, END: not any more
+    bot_id: int  # the bot whose move was blocked...
+    other_id: int  # ...by this one
+    bot: object
+
+
+class ContactEvents:
+    """Who blocked whom this frame, dispatched once per frame as one batch of events per bot class.
+
+    A bot whose move was cancelled by another calls hit(). end_frame() compares the frame's hits with last frame's
+    (pairs are directed: (blocked bot id, blocker id)) and calls every subscriber of a class once, with the events of
+    all bots of exactly that class, in the order the hits happened. Classes without subscribers cost one dict write
+    per hit.
+    """
+    def __init__(self):
+        self.subscribers: Dict[type, List[Callable[[List[ContactEvent]], None]]] = collections.defaultdict(list)
+        self._hits: Dict[Pair, object] = {}
+        self._last: Dict[Pair, object] = {}
+        self.dispatched = 0
+
+    def subscribe(self, cls: type, handler: Callable[[List[ContactEvent]], None]) -> None:
+        self.subscribers[cls].append(handler)
+
+    def hit(self, bot, other) -> None:
+        self._hits[(bot.id, other.id)] = bot
+
+    def reset(self) -> None:
+        """Forget this and last frame's hits, e.g. when the world jumps to another frame (subscribers stay)"""
+        self._hits = {}
+        self._last = {}
+
+    def end_frame(self) -> int:
+        """Dispatch this frame's events. Returns how many were dispatched."""
+        hits, last = self._hits, self._last
+        self._hits, self._last = {}, hits
+        subscribers = self.subscribers
+        batches: Dict[type, List[ContactEvent]] = {}
+        for pair, bot in hits.items():
+            if type(bot) in subscribers:
+                batches.setdefault(type(bot), []).append(
+                    ContactEvent(PERSIST if pair in last else BEGIN, pair[0], pair[1], bot))
+        for pair, bot in last.items():
+            if pair not in hits and type(bot) in subscribers:
+                batches.setdefault(type(bot), []).append(ContactEvent(END, pair[0], pair[1], bot))
+        count = 0
+        for cls, events in batches.items():
+            for handler in subscribers[cls]:
+                handler(events)
+            count += len(events)
+        self.dispatched += count
+        return count
+
+
+def events_of(bots, subscribe: Callable[[ContactEvents], ContactEvents]) -> ContactEvents:
+    """The ContactEvents of the world whose bot list is `bots`, made with subscribe() on first use and kept on the list.
+
+    A plain list can't keep one, so every call with one gets a fresh ContactEvents that nobody dispatches."""
+    events = getattr(bots, 'contact_events', None)
+    if events is None:
+        events = subscribe(ContactEvents())
+        try:
+            bots.contact_events = events
+        except AttributeError:
+            pass
+    return events
@@ -0,0 +1,135 @@
+"""Grid flow fields: one shortest-path pass from a goal, shared by every bot heading for that goal.
+
+Aiming straight at the goal (Bot.set_goal) walks bots into the StationaryBot wall where they pile up and deadlock.
+A FlowField is a distance field built with one Dijkstra pass outward from the goal cell over the free cells (8-way
+moves, no cutting corners past obstacles), plus the direction to the best neighbour of each cell. A bot then only
+looks up the direction of the cell it is in, O(1) per frame however many bots follow the field.
+
+Obstacles are boxes inflated by `clearance` (about half a bot) so a cell is only free if a bot centered anywhere in it
+clears the obstacle. FlowFieldCache keeps the most recently used fields by goal cell, so clicking the same goal again
+costs nothing; changing the obstacles empties it.
+"""
+import collections
+import heapq
+import math
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+Cell = Tuple[int, int]
+UNREACHABLE = math.inf
+
+_STEPS = [(dc, dr, math.hypot(dc, dr)) for dc in (-1, 0, 1) for dr in (-1, 0, 1) if dc or dr]
+
+
+class FlowField:
+    def __init__(self, cols: int, rows: int, cell_size: float, blocked: FrozenSet[Cell], goal: Cell):
+        self.cols = cols
+        self.rows = rows
+        self.cell_size = cell_size
+        self.goal = goal
+        self.distance: List[float] = [UNREACHABLE] * (cols * rows)
+        self.angles: List[Optional[float]] = [None] * (cols * rows)  # None: at the goal or cut off from it
+        self._build(blocked)
+
+    def _free(self, col: int, row: int, blocked: FrozenSet[Cell]) -> bool:
+        return 0 <= col < self.cols and 0 <= row < self.rows and (col, row) not in blocked
+
+    def _build(self, blocked: FrozenSet[Cell]) -> None:
+        cols = self.cols
+        dist = self.distance
+        goal_col, goal_row = self.goal
+        dist[goal_row * cols + goal_col] = 0.0
+        heap = [(0.0, goal_col, goal_row)]
+        while heap:
+            d, col, row = heapq.heappop(heap)
+            if d > dist[row * cols + col]:
+                continue
+            for dc, dr, cost in _STEPS:
+                c, r = col + dc, row + dr
+                if not self._free(c, r, blocked):
+                    continue
+                if dc and dr and not (self._free(col + dc, row, blocked) and self._free(col, row + dr, blocked)):
+                    continue  # diagonal squeezing past an obstacle corner
+                nd = d + cost
+                if nd < dist[r * cols + c]:
+                    dist[r * cols + c] = nd
+                    heapq.heappush(heap, (nd, c, r))
+
+        # direction of each cell: toward the neighbour on the shortest path. Blocked cells next to free ones get one
+        # too, so a bot pressed against an obstacle (its center inside the clearance) still knows where to go.
+        for row in range(self.rows):
+            for col in range(cols):
+                if dist[row * cols + col] == 0.0:
+                    continue
+                best, best_step = UNREACHABLE, None
+                for dc, dr, cost in _STEPS:
+                    c, r = col + dc, row + dr
+                    if not 0 <= c < cols or not 0 <= r < self.rows:
+                        continue
+                    if dc and dr and not (self._free(col + dc, row, blocked) and self._free(col, row + dr, blocked)):
+                        continue
+                    if dist[r * cols + c] + cost < best:
+                        best, best_step = dist[r * cols + c] + cost, (dc, dr)
+                if best_step is not None:
+                    self.angles[row * cols + col] = math.degrees(math.atan2(best_step[1], best_step[0]))
+
+    def angle_at(self, x: float, y: float) -> Optional[float]:
+        """Heading (degrees) toward the goal from (x, y), or None at the goal, off the field or cut off from it"""
+        col = int(math.floor(x / self.cell_size))
+        row = int(math.floor(y / self.cell_size))
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return self.angles[row * self.cols + col]
+        return None
+
+
+class FlowFieldCache:
+    """LRU cache of FlowFields by goal cell, for one world size and one set of obstacles"""
+    def __init__(self, width: float, height: float, cell_size: float = 10.0, capacity: int = 8,
+                 clearance: float = 5.0):
+        self.cell_size = cell_size
+        self.cols = int(math.ceil(width / cell_size))
+        self.rows = int(math.ceil(height / cell_size))
+        self.capacity = capacity
+        self.clearance = clearance
+        self.blocked: FrozenSet[Cell] = frozenset()
+        self.fields: 'collections.OrderedDict[Cell, FlowField]' = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def cell_of(self, x: float, y: float) -> Cell:
+        col = min(max(int(math.floor(x / self.cell_size)), 0), self.cols - 1)
+        row = min(max(int(math.floor(y / self.cell_size)), 0), self.rows - 1)
+        return col, row
+
+    def set_obstacles(self, boxes: Iterable[Tuple[float, float, float, float]]) -> None:
+        """boxes: (left, bottom, right, top) of every static obstacle. Cached fields are dropped if the blocked cells
+        changed."""
+        size = self.cell_size
+        pad = self.clearance
+        blocked = set()
+        for left, bottom, right, top in boxes:
+            col0, row0 = self.cell_of(left - pad, bottom - pad)
+            col1, row1 = self.cell_of(right + pad, top + pad)
+            for col in range(col0, col1 + 1):
+                for row in range(row0, row1 + 1):
+                    if (col * size < right + pad and (col + 1) * size > left - pad and
+                            row * size < top + pad and (row + 1) * size > bottom - pad):
+                        blocked.add((col, row))
+        blocked = frozenset(blocked)
+        if blocked != self.blocked:
+            self.blocked = blocked
+            self.fields.clear()
+
+    def get(self, x: float, y: float) -> FlowField:
+        """The field leading to the goal cell containing (x, y)"""
+        goal = self.cell_of(x, y)
+        field = self.fields.get(goal)
+        if field is not None:
+            self.fields.move_to_end(goal)
+            self.hits += 1
+            return field
+        self.misses += 1
+        field = FlowField(self.cols, self.rows, self.cell_size, self.blocked, goal)
+        self.fields[goal] = field
+        if len(self.fields) > self.capacity:
+            self.fields.popitem(last=False)
+        return field
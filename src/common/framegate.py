@@ -0,0 +1,49 @@
+"""Frame barrier between a main thread and the worker threads that update bots.
+
+run_frame() (main thread) lets every registered worker through wait_for_frame() once and returns when all of them
+have called done(). Workers therefore make exactly one update per frame, and nothing updates while the main thread
+draws or changes the bot list. Without the GIL that matters: drawing reads every bot's row of the SpriteList buffers
+that the bots write to when they move.
+"""
+import threading
+from typing import Optional
+
+
+class FrameGate:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.generation = 0
+        self.workers = 0
+        self.pending = 0
+
+    def register(self) -> int:
+        """Add a worker. Returns the generation to pass to its first wait_for_frame()."""
+        with self.cond:
+            self.workers += 1
+            return self.generation
+
+    def unregister(self) -> None:
+        """Remove a worker (call from the worker itself, between frames)"""
+        with self.cond:
+            self.workers -= 1
+
+    def wait_for_frame(self, seen: int) -> int:
+        """Block until a frame after generation `seen` starts. Returns its generation."""
+        with self.cond:
+            while self.generation == seen:
+                self.cond.wait()
+            return self.generation
+
+    def done(self) -> None:
+        with self.cond:
+            self.pending -= 1
+            if self.pending <= 0:
+                self.cond.notify_all()
+
+    def run_frame(self, timeout: Optional[float] = None) -> bool:
+        """Start a frame and wait for every worker to finish it. False if timeout ran out first."""
+        with self.cond:
+            self.pending = self.workers
+            self.generation += 1
+            self.cond.notify_all()
+            return self.cond.wait_for(lambda: self.pending <= 0, timeout)
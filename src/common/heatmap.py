@@ -0,0 +1,134 @@
+"""Crowd density and flow per grid cell, accumulated every frame with vectorized bincount updates.
+
+Each frame the bot positions are binned into a grid of square cells. Per cell it keeps:
+- occupancy: total bot-frames spent in the cell since the start (where do crowds sit?)
+- exponential running averages of bot count, speed and velocity (where are they jammed right now, which way do they
+  flow?)
+
+All the per-cell work is a handful of np.bincount() calls over the bot arrays, so cost grows with bot count at NumPy
+speed, not Python speed. Velocity comes from each bot's position on the previous accumulated frame, looked up by
+bot id.
+"""
+import math
+from typing import Iterable, Optional, Tuple
+
+import arcade
+import numpy as np
+
+NEVER = np.iinfo(np.int64).min  # "previous frame" of bots that haven't been seen yet
+
+
+class FlowGrid:
+    def __init__(self, width: float, height: float, cell_size: float = 20.0, smoothing: float = 0.05):
+        """smoothing: weight of the newest frame in the running averages (0..1, higher reacts faster)"""
+        self.cell_size = cell_size
+        self.cols = int(math.ceil(width / cell_size))
+        self.rows = int(math.ceil(height / cell_size))
+        self.smoothing = smoothing
+        self.frames = 0
+        cells = self.cols * self.rows
+        self.occupancy = np.zeros(cells, dtype=np.int64)
+        self.avg_count = np.zeros(cells, dtype=np.float64)
+        self._avg_speed_sum = np.zeros(cells, dtype=np.float64)
+        self._avg_vx_sum = np.zeros(cells, dtype=np.float64)
+        self._avg_vy_sum = np.zeros(cells, dtype=np.float64)
+        self._prev_x = np.zeros(0, dtype=np.float64)
+        self._prev_y = np.zeros(0, dtype=np.float64)
+        self._prev_frame = np.zeros(0, dtype=np.int64)
+
+    def cell_index(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Flat cell index of each position, clamped to the grid"""
+        col = np.clip((xs // self.cell_size).astype(np.int64), 0, self.cols - 1)
+        row = np.clip((ys // self.cell_size).astype(np.int64), 0, self.rows - 1)
+        return row * self.cols + col
+
+    def _velocity(self, ids: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Movement since the previous accumulated frame (zero for bots not seen on that frame)"""
+        if len(ids) and ids.max() >= len(self._prev_x):
+            size = max(int(ids.max()) + 1, 2 * len(self._prev_x))
+            self._prev_x = np.resize(self._prev_x, size)
+            self._prev_y = np.resize(self._prev_y, size)
+            prev_frame = np.full(size, NEVER, dtype=np.int64)
+            prev_frame[:len(self._prev_frame)] = self._prev_frame
+            self._prev_frame = prev_frame
+        seen = self._prev_frame[ids] == self.frames - 1
+        vx = np.where(seen, xs - self._prev_x[ids], 0.0)
+        vy = np.where(seen, ys - self._prev_y[ids], 0.0)
+        self._prev_x[ids] = xs
+        self._prev_y[ids] = ys
+        self._prev_frame[ids] = self.frames
+        return vx, vy
+
+    def accumulate(self, ids, xs, ys) -> None:
+        """Add one frame of bot positions (equal length arrays; ids must be small non-negative ints)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        vx, vy = self._velocity(ids, xs, ys)
+        cells = self.cell_index(xs, ys)
+        n = len(self.occupancy)
+        count = np.bincount(cells, minlength=n)
+        self.occupancy += count
+        a = self.smoothing
+        self.avg_count += a * (count - self.avg_count)
+        self._avg_speed_sum += a * (np.bincount(cells, np.hypot(vx, vy), minlength=n) - self._avg_speed_sum)
+        self._avg_vx_sum += a * (np.bincount(cells, vx, minlength=n) - self._avg_vx_sum)
+        self._avg_vy_sum += a * (np.bincount(cells, vy, minlength=n) - self._avg_vy_sum)
+        self.frames += 1
+
+    def accumulate_sprites(self, sprites: Iterable) -> None:
+        sprites = list(sprites)
+        n = len(sprites)
+        self.accumulate(np.fromiter((s.id for s in sprites), np.int64, n),
+                        np.fromiter((s.center_x for s in sprites), np.float64, n),
+                        np.fromiter((s.center_y for s in sprites), np.float64, n))
+
+    def _per_bot(self, sums: np.ndarray) -> np.ndarray:
+        return np.divide(sums, self.avg_count, out=np.zeros_like(sums), where=self.avg_count > 1e-6)
+
+    @property
+    def mean_speed(self) -> np.ndarray:
+        """Running average speed (pixels per frame) of the bots in each cell"""
+        return self._per_bot(self._avg_speed_sum)
+
+    @property
+    def mean_velocity(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Running average velocity of the bots in each cell. Direction of flow is atan2(vy, vx)."""
+        return self._per_bot(self._avg_vx_sum), self._per_bot(self._avg_vy_sum)
+
+    def grids(self) -> dict:
+        """All per-cell statistics as (rows, cols) arrays, row 0 at the bottom of the screen"""
+        vx, vy = self.mean_velocity
+        shape = (self.rows, self.cols)
+        return {
+            'occupancy': self.occupancy.reshape(shape),
+            'density': self.avg_count.reshape(shape),
+            'speed': self.mean_speed.reshape(shape),
+            'vx': vx.reshape(shape),
+            'vy': vy.reshape(shape),
+        }
+
+    def export(self, path: str) -> None:
+        np.savez_compressed(path, cell_size=self.cell_size, frames=self.frames, **self.grids())
+
+    def cells(self, min_density: float = 0.05):
+        """Yield (left, bottom, density, vx, vy) for each cell with a running average count above min_density"""
+        vx, vy = self.mean_velocity
+        for i in np.nonzero(self.avg_count > min_density)[0]:
+            row, col = divmod(int(i), self.cols)
+            yield col * self.cell_size, row * self.cell_size, float(self.avg_count[i]), float(vx[i]), float(vy[i])
+
+
+def draw_overlay(grid: FlowGrid, max_density: Optional[float] = None) -> None:
+    """Draw the grid as translucent cells (more opaque = more crowded) with a line showing the flow direction"""
+    if max_density is None:
+        max_density = max(float(grid.avg_count.max()), 1e-6)
+    size = grid.cell_size
+    for left, bottom, density, vx, vy in grid.cells():
+        alpha = int(40 + 160 * min(density / max_density, 1.0))
+        arcade.draw_lrtb_rectangle_filled(left, left + size, bottom + size, bottom, (255, 140, 0, alpha))
+        speed = math.hypot(vx, vy)
+        if speed > 0.05:
+            cx, cy = left + size / 2, bottom + size / 2
+            scale = size / 2 / speed
+            arcade.draw_line(cx, cy, cx + vx * scale, cy + vy * scale, arcade.color.WHITE, 1)
@@ -0,0 +1,152 @@
+"""Hitch forensics: flag frames that blow the frame budget and record what was going on during them.
+
+FpsScanner only lets a human spot a hitch by eye. HitchDetector times every frame and, for frames over budget, writes
+one JSON line with the context needed to attribute the spike: garbage collections that ran during the frame
+(generation, duration, objects collected, via gc.callbacks), bot count, bots spawned/deleted that frame and event loop
+lag. Hitches are printed, and also logged when a log path is given (e.g. python -m crowd --hitch-log hitches.jsonl).
+
+GcScheduler is an optional mode for the other usual suspect: with thousands of Sprites the cyclic GC's generation 2
+passes can take many milliseconds. It freezes everything built during world construction (gc.freeze(), so the
+collector never scans it again), turns off automatic collection and instead collects in frames that finished with
+time to spare.
+"""
+import asyncio
+import gc
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+
+class HitchDetector:
+    def __init__(self, budget: float = 1 / 30, log_path: Optional[str] = None, expected_interval=1 / 60):
+        """budget: seconds a frame may take before it is flagged. expected_interval: normal time between frames.
+        log_path: JSON lines file the hitches are appended to, None to only print them."""
+        self.budget = budget
+        self.expected_interval = expected_interval
+        self.log_path = log_path
+        self.frame = 0
+        self.hitches = 0
+        self.loop_lag: Optional[float] = None  # set by LoopLagMonitor (asyncio), otherwise derived from frame interval
+        self._gc_events: List[Dict[str, Any]] = []
+        self._gc_start = 0.0
+        self._last_frame_end: Optional[float] = None
+        self._log = open(log_path, 'a') if log_path else None
+        gc.callbacks.append(self._on_gc)
+
+    def close(self) -> None:
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    def _on_gc(self, phase: str, info: Dict[str, int]) -> None:
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+        else:
+            self._gc_events.append({
+                'generation': info['generation'],
+                'ms': round((time.perf_counter() - self._gc_start) * 1000, 3),
+                'collected': info['collected'],
+                'uncollectable': info['uncollectable'],
+            })
+
+    def end_frame(self, bot_count: int, spawned: int = 0, deleted: int = 0, sleep: Optional[float] = None,
+                  **extra) -> Optional[Dict[str, Any]]:
+        """Call once at the end of every frame. Returns the hitch record if this frame was flagged.
+
+        sleep: seconds the frame slept on purpose (a frame rate preset), not counted against the budget."""
+        now = time.perf_counter()
+        record = None
+        if self._last_frame_end is not None:
+            interval = now - self._last_frame_end - (sleep or 0.0)
+            if interval > self.budget:
+                lag = self.loop_lag if self.loop_lag is not None else max(0.0, interval - self.expected_interval)
+                record = {
+                    'time': time.time(),
+                    'frame': self.frame,
+                    'frame_ms': round(interval * 1000, 3),
+                    'budget_ms': round(self.budget * 1000, 3),
+                    'gc': self._gc_events,
+                    'gc_ms': round(sum(e['ms'] for e in self._gc_events), 3),
+                    'bots': bot_count,
+                    'spawned': spawned,
+                    'deleted': deleted,
+                    'loop_lag_ms': round(lag * 1000, 3),
+                    'sleep': sleep,
+                }
+                record.update(extra)
+                self._report(record)
+        self._gc_events = []
+        self._last_frame_end = now
+        self.frame += 1
+        return record
+
+    def _report(self, record: Dict[str, Any]) -> None:
+        self.hitches += 1
+        print('HITCH frame {frame}: {frame_ms:0.1f} ms (gc {gc_ms:0.1f} ms in {n} collections, {bots} bots, '
+              '+{spawned}/-{deleted})'.format(n=len(record['gc']), **record))
+        if self._log:
+            self._log.write(json.dumps(record) + '\n')
+            self._log.flush()
+
+
+class GcScheduler:
+    """Moves cyclic garbage collection out of busy frames and into frames with spare time"""
+    def __init__(self, min_slack: float = 0.004, force_factor: int = 10):
+        """min_slack: seconds left in the frame needed to run a collection.
+        force_factor: collect anyway once allocations reach this many times the normal threshold."""
+        self.min_slack = min_slack
+        self.force_factor = force_factor
+        self.thresholds = gc.get_threshold()
+        self.enabled = False
+        self.collections = [0, 0, 0]
+
+    def freeze_after_init(self) -> None:
+        """Call after the world is built: move everything alive now to the permanent generation and take over from
+        automatic collection"""
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+        self.enabled = True
+        print('GC: froze', gc.get_freeze_count(), 'objects, automatic collection off')
+
+    def idle(self, slack: float) -> Optional[int]:
+        """Call at the end of a frame with the seconds left before the next one. Returns the generation collected."""
+        if not self.enabled:
+            return None
+        count0, count1, count2 = gc.get_count()
+        t0, t1, t2 = self.thresholds
+        if count0 < t0:
+            return None
+        if slack < self.min_slack and count0 < t0 * self.force_factor:
+            return None  # no time this frame and not urgent yet
+        # same escalation rule as the automatic collector: older generations once younger ones were collected enough
+        if count2 >= t2:
+            generation = 2
+        elif count1 >= t1:
+            generation = 1
+        else:
+            generation = 0
+        gc.collect(generation)
+        self.collections[generation] += 1
+        return generation
+
+    def restore(self) -> None:
+        if self.enabled:
+            gc.unfreeze()
+            gc.enable()
+            self.enabled = False
+
+
+class LoopLagMonitor:
+    """asyncio task measuring how late the event loop wakes a sleeping coroutine (the loop's scheduling lag)"""
+    def __init__(self, detector: HitchDetector, interval: float = 0.005):
+        self.detector = detector
+        self.interval = interval
+
+    async def run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.detector.loop_lag = max(0.0, time.perf_counter() - start - self.interval)
@@ -0,0 +1,85 @@
+"""Subinterpreters (one GIL each) across Python versions, and pipes to talk to them.
+
+Python 3.12 exposes subinterpreters as _xxsubinterpreters (a per-interpreter GIL needs isolated=True), 3.13 as
+_interpreters (isolated by default). Only create/run/destroy are used here, which both have.
+
+Objects can't be passed between interpreters, so they exchange bytes over plain OS pipes: a file descriptor is just an
+int, valid in every interpreter of the process (and in forked child processes and threads alike), and a blocking read
+releases the reader's GIL. Everything here is stdlib-only so it can be imported inside a subinterpreter.
+"""
+import os
+import struct
+from typing import Optional, Tuple
+
+try:
+    import _interpreters as _impl  # 3.13+
+
+    def create() -> int:
+        return _impl.create()
+except ImportError:
+    try:
+        import _xxsubinterpreters as _impl  # 3.12
+
+        def create() -> int:
+            return _impl.create(isolated=True)
+    except ImportError:
+        _impl = None
+
+        def create() -> int:
+            raise RuntimeError('subinterpreters need Python 3.12 or later')
+
+_LENGTH = struct.Struct('<I')
+
+
+def available() -> bool:
+    """Are subinterpreters with their own GIL available? (3.11 has _xxsubinterpreters too, but with a shared GIL)"""
+    import sys
+    return _impl is not None and sys.version_info >= (3, 12)
+
+
+def run(interp_id, script: str) -> None:
+    """Run script in the interpreter, blocking the calling thread until it finishes"""
+    error = _impl.run_string(interp_id, script)
+    if error is not None:  # 3.13 returns the uncaught exception instead of raising it
+        raise RuntimeError(f'subinterpreter failed: {error}')
+
+
+def destroy(interp_id) -> None:
+    _impl.destroy(interp_id)
+
+
+def start(script: str) -> Tuple[int, 'threading.Thread']:
+    """Create an interpreter and run script in it on a new thread. Returns (interpreter id, thread)."""
+    # imported here: on 3.12, destroying an interpreter that imported threading hangs, and workers import this module
+    import threading
+    interp_id = create()
+    thread = threading.Thread(target=run, args=(interp_id, script), daemon=True)
+    thread.start()
+    return interp_id, thread
+
+
+def send_bytes(fd: int, data: bytes) -> None:
+    """Write one length-prefixed message to fd"""
+    view = memoryview(_LENGTH.pack(len(data)) + data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _read_exactly(fd: int, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = os.read(fd, size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_bytes(fd: int) -> Optional[bytes]:
+    """Read one message written by send_bytes(). None when the writing end was closed."""
+    header = _read_exactly(fd, _LENGTH.size)
+    if header is None:
+        return None
+    return _read_exactly(fd, _LENGTH.unpack(header)[0])
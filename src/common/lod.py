@@ -0,0 +1,62 @@
+"""Level-of-detail update scheduling: only crowded bots are updated every frame.
+
+Each frame the shared SpatialGrid is rebuilt and every bot is put in a tier:
+- full: has a neighbour within `radius` (and is inside the focus rectangle, if one is set). Updated every frame.
+- reduced: alone in open space, or outside the focus rectangle. Updated every k-th frame (staggered by bot id so the
+  work is spread over the frames), with `step_scale` set to the frames since its last update so it still covers the
+  same distance and its frame counters still run at the same speed.
+
+Tiers are re-evaluated every frame, so a bot drops to full rate as soon as something comes near it. The radius should
+be larger than a bot plus the distance it can cover in k frames, so reduced bots can't skip into each other.
+
+A large, sparse world then costs roughly in proportion to its crowded areas.
+"""
+from typing import Optional, Tuple
+
+from common.spatial import SpatialGrid
+
+
+class LodScheduler:
+    def __init__(self, grid: SpatialGrid, radius: float = 40.0, k: int = 4):
+        self.grid = grid
+        self.radius = radius
+        self.k = k
+        self.focus: Optional[Tuple[float, float, float, float]] = None  # left, bottom, right, top
+        self.full = 0
+        self.reduced = 0
+        self.skipped = 0
+
+    def in_focus(self, sprite) -> bool:
+        if self.focus is None:
+            return True
+        left, bottom, right, top = self.focus
+        return left <= sprite.center_x <= right and bottom <= sprite.center_y <= top
+
+    def reset(self, sprites) -> None:
+        """Forget when each bot was last updated (e.g. the world went back to an earlier frame): the next update()
+        counts them all as updated the frame before"""
+        for sprite in sprites:
+            sprite.lod_last_update = None
+
+    def update(self, sprites, frame: int) -> None:
+        """Replacement for sprite_list.update() for frame number `frame`"""
+        self.grid.rebuild(sprites)
+        k = self.k
+        full = reduced = skipped = 0
+        for sprite in sprites:
+            last = getattr(sprite, 'lod_last_update', None)
+            if last is None:  # first frame under LOD
+                last = sprite.lod_last_update = frame - 1
+            elapsed = frame - last
+            if self.in_focus(sprite) and self.grid.has_neighbour(sprite, self.radius):
+                full += 1
+            elif (frame + sprite.id) % k == 0 or elapsed >= k:
+                reduced += 1
+            else:
+                skipped += 1
+                continue
+            sprite.step_scale = max(1, min(elapsed, k))
+            sprite.update()
+            sprite.step_scale = 1
+            sprite.lod_last_update = frame
+        self.full, self.reduced, self.skipped = full, reduced, skipped
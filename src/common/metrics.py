@@ -0,0 +1,68 @@
+"""Live simulation metrics over HTTP, in the Prometheus text format.
+
+The simulation sets gauges (set()) and counters (add()) as it runs; a background thread serves the latest values at
+http://host:port/metrics, so a run can be watched with curl, a browser or a Prometheus scrape without touching its
+frame loop beyond a few dict writes.
+
+    curl -s localhost:9100/metrics
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+
+class Metrics:
+    def __init__(self, prefix: str = 'crowd_'):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.values: Dict[str, Tuple[str, float, str]] = {}  # name -> (type, value, help)
+
+    def set(self, name: str, value: float, help_text: str = '') -> None:
+        with self.lock:
+            self.values[name] = ('gauge', value, help_text)
+
+    def add(self, name: str, amount: float = 1, help_text: str = '') -> None:
+        with self.lock:
+            kind, value, old_help = self.values.get(name, ('counter', 0, help_text))
+            self.values[name] = ('counter', value + amount, help_text or old_help)
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            items = sorted(self.values.items())
+        for name, (kind, value, help_text) in items:
+            full = self.prefix + name
+            if help_text:
+                lines.append(f'# HELP {full} {help_text}')
+            lines.append(f'# TYPE {full} {kind}')
+            lines.append(f'{full} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serves metrics.render() on a daemon thread. Port 0 picks a free port (see .port)."""
+    def __init__(self, metrics: Metrics, port: int, host: str = '127.0.0.1'):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # no line per scrape
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='metrics', daemon=True)
+        self.thread.start()
+        print(f'Serving metrics on http://{host}:{self.port}/metrics')
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,144 @@
+"""Wire format for streaming world state to remote viewers, and viewer commands back.
+
+Every message is framed as: payload length (u32) + message type (1 byte) + payload.
+
+- KEYFRAME: frame (u32), count (u32), then per bot: id (u32), kind (u8), x (i32), y (i32), angle (u8)
+- DELTA: frame (u32), changed/added/removed counts (3x u32), then
+    changed: id (u32), dx (i16), dy (i16), angle (u8), relative to the last state sent for that bot
+    added: same records as a keyframe (also used for bots that moved too far for an i16 delta)
+    removed: id (u32)
+- COMMAND: UTF-8 JSON object, e.g. {"cmd": "goal", "x": 10, "y": 20} (viewer -> server)
+
+Positions are quantized to 1/SCALE px and angles to 256 steps. A bot is only sent in a delta when its quantized state
+changed, so stationary or stuck bots (a large part of a typical crowd) cost nothing. A keyframe is sent every
+`keyframe_every` frames (and to newly connected or resyncing viewers), so a viewer can join at any time.
+"""
+import json
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+KEYFRAME = b'K'
+DELTA = b'D'
+COMMAND = b'C'
+
+SCALE = 4  # quantization steps per pixel
+
+_HEADER = struct.Struct('<Ic')
+_KEY_HEADER = struct.Struct('<II')
+_DELTA_HEADER = struct.Struct('<IIII')
+_FULL = struct.Struct('<IBiiB')
+_CHANGED = struct.Struct('<IhhB')
+_REMOVED = struct.Struct('<I')
+HEADER_SIZE = _HEADER.size
+
+QState = Tuple[int, int, int, int]  # kind, qx, qy, qangle
+
+
+def quantize(kind: int, x: float, y: float, angle: float) -> QState:
+    return kind, round(x * SCALE), round(y * SCALE), round(angle % 360 / 360 * 256) % 256
+
+
+def dequantize(q: QState) -> Tuple[int, float, float, float]:
+    kind, qx, qy, qa = q
+    return kind, qx / SCALE, qy / SCALE, qa * 360 / 256
+
+
+def frame_message(msg_type: bytes, payload: bytes) -> bytes:
+    return _HEADER.pack(len(payload), msg_type) + payload
+
+
+def command_message(cmd: str, **args) -> bytes:
+    return frame_message(COMMAND, json.dumps(dict(args, cmd=cmd)).encode())
+
+
+def parse_header(header: bytes) -> Tuple[int, bytes]:
+    """(payload length, message type) of the first _HEADER.size bytes of a message"""
+    return _HEADER.unpack(header)
+
+
+class StateEncoder:
+    """Turns per-frame bot states into keyframe/delta messages. One encoder serves all viewers."""
+    def __init__(self, keyframe_every: int = 60):
+        self.keyframe_every = keyframe_every
+        self.sent: Dict[int, QState] = {}  # what viewers that are in sync have been told
+        self.frame = 0
+
+    def keyframe(self) -> bytes:
+        """Keyframe of the last state sent. Also sent to a viewer joining (or resyncing) between regular keyframes."""
+        parts = [_KEY_HEADER.pack(self.frame, len(self.sent))]
+        parts.extend(_FULL.pack(bot_id, *q) for bot_id, q in self.sent.items())
+        return frame_message(KEYFRAME, b''.join(parts))
+
+    def encode(self, frame: int, states: Iterable[Tuple[int, int, float, float, float]]) -> bytes:
+        """states: (id, kind, x, y, angle) of every bot this frame. Returns the message for viewers in sync."""
+        self.frame = frame
+        current = {bot_id: quantize(kind, x, y, angle) for bot_id, kind, x, y, angle in states}
+        previous = self.sent
+        self.sent = current
+        if frame % self.keyframe_every == 0:
+            return self.keyframe()
+
+        changed: List[bytes] = []
+        added: List[bytes] = []
+        for bot_id, q in current.items():
+            old = previous.get(bot_id)
+            if old == q:
+                continue
+            if old is not None and old[0] == q[0]:
+                dx, dy = q[1] - old[1], q[2] - old[2]
+                if -32768 <= dx <= 32767 and -32768 <= dy <= 32767:
+                    changed.append(_CHANGED.pack(bot_id, dx, dy, q[3]))
+                    continue
+            added.append(_FULL.pack(bot_id, *q))
+        removed = [_REMOVED.pack(bot_id) for bot_id in previous.keys() - current.keys()]
+        header = _DELTA_HEADER.pack(frame, len(changed), len(added), len(removed))
+        return frame_message(DELTA, header + b''.join(changed) + b''.join(added) + b''.join(removed))
+
+
+class StateDecoder:
+    """Viewer side: applies keyframe/delta payloads. `bots` is id -> (kind, x, y, angle) in world units."""
+    def __init__(self):
+        self.state: Dict[int, QState] = {}
+        self.frame: Optional[int] = None  # None until the first keyframe arrives
+        self.keyframes = 0
+        self.deltas = 0
+
+    def apply(self, msg_type: bytes, payload: bytes) -> None:
+        if msg_type == KEYFRAME:
+            self.frame, count = _KEY_HEADER.unpack_from(payload)
+            offset = _KEY_HEADER.size
+            state = {}
+            for _ in range(count):
+                bot_id, *q = _FULL.unpack_from(payload, offset)
+                offset += _FULL.size
+                state[bot_id] = tuple(q)
+            self.state = state
+            self.keyframes += 1
+        elif msg_type == DELTA:
+            if self.frame is None:
+                return  # deltas are meaningless until the first keyframe
+            self.frame, n_changed, n_added, n_removed = _DELTA_HEADER.unpack_from(payload)
+            offset = _DELTA_HEADER.size
+            state = self.state
+            for _ in range(n_changed):
+                bot_id, dx, dy, qa = _CHANGED.unpack_from(payload, offset)
+                offset += _CHANGED.size
+                kind, qx, qy, _old_qa = state[bot_id]
+                state[bot_id] = (kind, qx + dx, qy + dy, qa)
+            for _ in range(n_added):
+                bot_id, *q = _FULL.unpack_from(payload, offset)
+                offset += _FULL.size
+                state[bot_id] = tuple(q)
+            for _ in range(n_removed):
+                bot_id, = _REMOVED.unpack_from(payload, offset)
+                offset += _REMOVED.size
+                del state[bot_id]
+            self.deltas += 1
+
+    @property
+    def bots(self) -> Dict[int, Tuple[int, float, float, float]]:
+        return {bot_id: dequantize(q) for bot_id, q in self.state.items()}
+
+
+def parse_command(payload: bytes) -> dict:
+    return json.loads(payload.decode())
@@ -0,0 +1,110 @@
+"""Bot pooling with batched spawn/despawn.
+
+Spawning allocates a new Sprite only when the pool has no free Bot of that kind, otherwise a dead one is reset and
+reused. Despawning just marks bots dead (a tombstone); the SpriteList is compacted once per frame by compact(), so
+removing k bots costs one O(N) pass instead of k calls to SpriteList.remove() (each O(N), and in arcade 2.2 each one
+also rebuilds the sprite index dict).
+
+Bots must provide reset(x, y) that restores all per-life state and sets `alive = True` (see crowd.bots.Bot).
+"""
+import collections
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import arcade
+
+
+def remove_dead(sprite_list: arcade.SpriteList) -> List[arcade.Sprite]:
+    """Remove every sprite with alive == False from sprite_list in one pass. Returns the removed sprites.
+
+    Works on SpriteList internals (arcade 2.2) so the index, GPU buffers and spatial hash stay consistent."""
+    survivors = []
+    removed = []
+    for sprite in sprite_list.sprite_list:
+        (survivors if sprite.alive else removed).append(sprite)
+    if not removed:
+        return removed
+    sprite_list.sprite_list[:] = survivors
+    sprite_list.sprite_idx = {sprite: idx for idx, sprite in enumerate(survivors)}
+    sprite_list.vao = None
+    for sprite in removed:
+        if sprite_list.use_spatial_hash:
+            sprite_list.spatial_hash.remove_object(sprite)
+        if sprite_list in sprite.sprite_lists:
+            sprite.sprite_lists.remove(sprite_list)
+    return removed
+
+
+def remove_sprite(sprite: arcade.Sprite) -> None:
+    """sprite.kill() without arcade 2.2's leak: SpriteList.remove() leaves the removed sprite as a key of the list's
+    index dict, so every sprite ever removed from a list stays alive (texture and all) as long as the list does."""
+    sprite_lists = list(sprite.sprite_lists)
+    sprite.remove_from_sprite_lists()
+    for sprite_list in sprite_lists:
+        sprite_list.sprite_idx.pop(sprite, None)
+
+
+class BotPool:
+    def __init__(self, bots: arcade.SpriteList):
+        self.bots = bots
+        self.free: Dict[Tuple[Callable, tuple], List[arcade.Sprite]] = collections.defaultdict(list)
+        self.tombstones = 0
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, factory: Callable, x: float, y: float, color) -> arcade.Sprite:
+        """A Bot of the given kind at (x, y), reused from the pool when possible (not yet added to the world)"""
+        free = self.free[(factory, color)]
+        if free:
+            bot = free.pop()
+            bot.reset(x, y)
+            self.reused += 1
+        else:
+            bot = factory(x, y, self.bots, color)
+            bot.pool_key = (factory, color)
+            self.created += 1
+        return bot
+
+    def spawn(self, factory: Callable, color, positions: Iterable[Tuple[float, float]]) -> List[arcade.Sprite]:
+        """Add one Bot per (x, y) position to the world. Returns the new bots."""
+        new_bots = [self.acquire(factory, x, y, color) for x, y in positions]
+        for bot in new_bots:
+            self.bots.append(bot)
+        return new_bots
+
+    def despawn(self, bots: Iterable[arcade.Sprite]) -> None:
+        """Mark bots dead. They leave the world at the next compact()."""
+        for bot in bots:
+            if bot.alive:
+                bot.alive = False
+                self.tombstones += 1
+
+    def compact(self) -> int:
+        """Remove dead bots from the world and return them to the pool. Call once per frame. Returns count removed."""
+        if not self.tombstones:
+            return 0
+        removed = remove_dead(self.bots)
+        for bot in removed:
+            key = getattr(bot, 'pool_key', None)
+            if key is not None:
+                self.free[key].append(bot)
+        self.tombstones = 0
+        return len(removed)
+
+    def replace(self, bots: List[arcade.Sprite]) -> None:
+        """Make the world hold exactly `bots`, in this order (e.g. to restore an earlier frame). Bots left out go back
+        to the pool; `bots` may mix bots already in the world with ones from acquire()."""
+        keep = set(bots)
+        self.despawn([bot for bot in self.bots if bot not in keep])
+        self.compact()
+        present = set(self.bots)
+        for bot in bots:
+            if bot not in present:
+                self.bots.append(bot)
+        if list(self.bots) != bots:  # same internals as remove_dead()
+            self.bots.sprite_list[:] = bots
+            self.bots.sprite_idx = {sprite: idx for idx, sprite in enumerate(bots)}
+            self.bots.vao = None
+
+    @property
+    def free_count(self) -> int:
+        return sum(len(free) for free in self.free.values())
@@ -0,0 +1,145 @@
+"""Rewind buffer: the last `capacity` frames of world state, to step backwards through and resume from.
+
+Every frame record() gets the state of every bot (id -> state, e.g. Bot.get_state()) and keeps only the bots whose state
+changed since the frame before, plus the ids of the bots that left. Callers that know which bots changed pass just those
+to record_changes() instead: a jammed crowd mostly stands still, and building the state of every bot every frame costs
+several times what the buffer itself does. Each segment of `keyframe_every` frames starts with a keyframe of every bot.
+Deltas and keyframes are stored marshalled and zlib compressed, at about 27 bytes per bot in either (positions are full
+precision floats, which hardly compress), so memory grows with how many bots move plus a keyframe every `keyframe_every`
+frames. With 10k bots of which 5% move every frame that is about 9 MiB per 600 frames: 55 MiB for a minute, 160 MiB for
+three. When the buffer holds more than `capacity` frames the oldest segment is dropped whole.
+
+A frame is rebuilt from the keyframe before it, or from the last frame rebuilt when that is on the way, by applying
+the deltas in between: stepping forward costs one delta, stepping back up to a segment's worth.
+
+    buffer = RewindBuffer(capacity=60 * 60)
+    buffer.record(frame, {b.id: b.get_state() for b in bots})   # after a frame
+    buffer.record_changes(frame + 1, changed, removed)          # after the next, given what changed
+    states = buffer.state_at(frame - 10)                        # id -> state, in the order they were recorded
+    buffer.truncate(frame - 10)                                 # resume from there: the later frames are gone
+
+States must be marshallable (Bot.get_state() tuples are). Dict order is kept: bots come back in the order they were
+recorded, which for a SpriteList is its update order.
+"""
+import collections
+import marshal
+import zlib
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+States = Dict[int, Any]
+
+
+def _pack(value) -> bytes:
+    return zlib.compress(marshal.dumps(value), 1)
+
+
+def _unpack(data: bytes):
+    return marshal.loads(zlib.decompress(data))
+
+
+class _Segment:
+    __slots__ = ('first', 'keyframe', 'deltas')
+
+    def __init__(self, first: int, keyframe: bytes):
+        self.first = first  # frame of the keyframe
+        self.keyframe = keyframe
+        self.deltas: List[bytes] = []  # deltas[i] goes from frame first + i to first + i + 1
+
+    @property
+    def last(self) -> int:
+        return self.first + len(self.deltas)
+
+
+class RewindBuffer:
+    def __init__(self, capacity: int = 3600, keyframe_every: int = 120):
+        self.capacity = capacity
+        self.keyframe_every = keyframe_every
+        self.segments: Deque[_Segment] = collections.deque()
+        self.latest: States = {}  # the newest frame, unpacked
+        self._cursor: Optional[Tuple[int, States]] = None  # the last frame state_at() rebuilt
+
+    def __len__(self) -> int:
+        return self.newest - self.oldest + 1 if self.segments else 0
+
+    @property
+    def oldest(self) -> int:
+        return self.segments[0].first
+
+    @property
+    def newest(self) -> int:
+        return self.segments[-1].last
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the stored keyframes and deltas"""
+        return sum(len(s.keyframe) + sum(map(len, s.deltas)) for s in self.segments)
+
+    def clear(self) -> None:
+        self.segments.clear()
+        self.latest = {}
+        self._cursor = None
+
+    def record(self, frame: int, states: States) -> None:
+        """The state of every bot after `frame`. Frames must follow each other; a gap starts the buffer afresh."""
+        if self.segments and frame != self.newest + 1:
+            self.clear()
+        if not self.segments:
+            self.segments.append(_Segment(frame, _pack(states)))
+            self.latest = dict(states)
+            return
+        removed = [bot_id for bot_id in self.latest if bot_id not in states]
+        self.record_changes(frame, states, removed)
+
+    def record_changes(self, frame: int, changed: States, removed: List[int]) -> None:
+        """The bots whose state may have changed after `frame` (new ones included) and the ids of the bots that left.
+        Costs in proportion to those, not to the number of bots. Must follow a recorded frame (record() comes first)."""
+        if not self.segments or frame != self.newest + 1:
+            raise ValueError(f'frame {frame} does not follow the recorded frames, record() all of it')
+        latest = self.latest
+        changed = {bot_id: state for bot_id, state in changed.items() if latest.get(bot_id) != state}
+        segment = self.segments[-1]
+        segment.deltas.append(_pack((changed, removed)))
+        for bot_id in removed:
+            del latest[bot_id]
+        latest.update(changed)  # the same order state_at() rebuilds: bots already there keep their place
+        if len(segment.deltas) >= self.keyframe_every:
+            self.segments.append(_Segment(frame, _pack(latest)))
+        while len(self.segments) > 1 and self.newest - self.segments[1].first + 1 >= self.capacity:
+            self.segments.popleft()
+
+    def _segment_of(self, frame: int) -> _Segment:
+        if not self.segments or not self.oldest <= frame <= self.newest:
+            raise IndexError(f'frame {frame} is not in the rewind buffer')
+        for segment in reversed(self.segments):
+            if segment.first <= frame:
+                return segment
+        raise AssertionError('unreachable')
+
+    def state_at(self, frame: int) -> States:
+        """id -> state of every bot after `frame` (a new dict, in recorded order). IndexError if it's not buffered."""
+        segment = self._segment_of(frame)
+        if frame == self.newest:
+            return dict(self.latest)
+        if self._cursor is not None and segment.first <= self._cursor[0] <= frame:
+            start, states = self._cursor[0], dict(self._cursor[1])
+        else:
+            start, states = segment.first, _unpack(segment.keyframe)
+        for f in range(start, frame):
+            changed, removed = _unpack(segment.deltas[f - segment.first])
+            for bot_id in removed:
+                del states[bot_id]
+            states.update(changed)  # bots already there keep their place, new ones go to the end
+        self._cursor = (frame, states)
+        return dict(states)
+
+    def truncate(self, frame: int) -> None:
+        """Forget the frames after `frame`, to record a different future from it"""
+        if frame >= self.newest:
+            return
+        states = self.state_at(frame)
+        while self.segments[-1].first > frame:
+            self.segments.pop()
+        segment = self.segments[-1]
+        del segment.deltas[frame - segment.first:]
+        self.latest = states
+        self._cursor = None
@@ -0,0 +1,157 @@
+"""Background sampling profiler that writes collapsed stacks for flamegraphs.
+
+A daemon thread wakes up at a fixed rate, grabs the current stack of every thread with sys._current_frames() and
+counts identical stacks. Unlike cProfile nothing hooks every function call, so frame timing stays close to normal.
+Works the same for a single threaded app (crowd), many threads (crowd_thread) and asyncio (crowd_async, where the
+stack of the running task is what gets sampled).
+
+The output is the "collapsed" format (`frame;frame;frame count` per line) read by flamegraph.pl, speedscope and
+https://www.speedscope.app, e.g. `flamegraph.pl profile.folded > profile.svg`.
+
+Run a module under the profiler (writes profile_<time>.folded on exit):
+
+    cd src/
+    python -m common.sampler crowd.crowd_sandbox
+"""
+import collections
+import os
+import runpy
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Leaf functions of threads that are blocked waiting rather than doing work. Skipped unless include_idle=True,
+# otherwise the ~100 bot threads of crowd_thread parked in Event.wait() would bury everything else.
+IDLE_FUNCTIONS = {
+    ('threading', 'wait'),
+    ('threading', 'Condition.wait'),
+    ('threading', 'Event.wait'),
+    ('threading', '_wait_for_tstate_lock'),
+    ('threading', 'Thread._wait_for_tstate_lock'),
+    ('selectors', 'select'),
+    ('selectors', 'EpollSelector.select'),
+    ('selectors', 'KqueueSelector.select'),
+    ('selectors', 'SelectSelector.select'),
+    ('queue', 'get'),
+    ('queue', 'Queue.get'),
+}
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, per_thread: bool = False, include_idle: bool = False):
+        """interval: seconds between samples. per_thread: start each stack with the thread's name."""
+        self.interval = interval
+        self.per_thread = per_thread
+        self.include_idle = include_idle
+        self.counts: collections.Counter = collections.Counter()
+        self.samples = 0
+        self._labels: Dict[object, Tuple[str, str]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.counts.clear()
+        self.samples = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        print(f'Sampling profiler started ({1 / self.interval:0.0f} Hz)')
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def toggle(self, path_prefix: str = 'profile') -> Optional[str]:
+        """Start profiling, or stop and write the results. Returns the path written, if any."""
+        if not self.running:
+            self.start()
+            return None
+        self.stop()
+        path = f'{path_prefix}_{time.strftime("%Y%m%d_%H%M%S")}.folded'
+        self.write(path)
+        self.print_summary()
+        print('Wrote', self.samples, 'samples to', path)
+        return path
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def _label(self, code) -> Tuple[str, str]:
+        label = self._labels.get(code)
+        if label is None:
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            label = (module, getattr(code, 'co_qualname', code.co_name))
+            self._labels[code] = label
+        return label
+
+    def sample(self) -> None:
+        """Take one sample of every thread except the profiler's own"""
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()} if self.per_thread else {}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if not stack or (not self.include_idle and stack[0] in IDLE_FUNCTIONS):
+                continue
+            stack.reverse()
+            if self.per_thread:
+                stack.insert(0, ('thread', names.get(ident, str(ident))))
+            self.counts[tuple(stack)] += 1
+        self.samples += 1
+
+    def collapsed(self):
+        """Lines in collapsed stack format: 'root;...;leaf count'"""
+        for stack, count in self.counts.most_common():
+            yield ';'.join(f'{module}:{func}' for module, func in stack) + f' {count}'
+
+    def write(self, path: str) -> None:
+        with open(path, 'w') as f:
+            for line in self.collapsed():
+                f.write(line + '\n')
+
+    def print_summary(self, top: int = 10) -> None:
+        """Print the functions that were most often on top of the stack (self time)"""
+        leaves: collections.Counter = collections.Counter()
+        for stack, count in self.counts.items():
+            leaves[stack[-1]] += count
+        total = sum(leaves.values()) or 1
+        for (module, func), count in leaves.most_common(top):
+            print('{:>6.1f}% {}:{}'.format(100.0 * count / total, module, func))
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Run a module under the sampling profiler')
+    parser.add_argument('module', help='module to run as __main__, e.g. crowd.crowd_sandbox')
+    parser.add_argument('--interval', type=float, default=0.005, help='seconds between samples')
+    parser.add_argument('--per-thread', action='store_true', help='keep stacks of each thread separate')
+    parser.add_argument('--include-idle', action='store_true', help='keep samples of threads that are just waiting')
+    parser.add_argument('--output', default='profile', help='output path prefix')
+    args, rest = parser.parse_known_args(argv)
+
+    profiler = SamplingProfiler(args.interval, args.per_thread, args.include_idle)
+    sys.argv = [args.module] + rest
+    profiler.start()
+    try:
+        runpy.run_module(args.module, run_name='__main__', alter_sys=True)
+    finally:
+        profiler.toggle(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Time-budgeted round-robin bot updates.
+
+Instead of updating every bot every frame however long that takes, BudgetScheduler updates bots in round-robin order
+until the frame's CPU budget is spent and picks up where it stopped on the next frame. Under overload (a burst of
+added bots) the frame rate stays smooth and the simulation slows down instead.
+
+Every bot is updated once per pass, so none can starve. How far behind a bot is (its staleness, in frames) is passed
+on as `step_scale` so it covers the distance it would have covered (capped at max_step_scale, beyond that the bot
+just loses time). `lag` is the published "simulation lag" metric: frames needed to get through one full pass.
+"""
+import time
+
+
+class BudgetScheduler:
+    def __init__(self, budget: float = 0.008, min_per_frame: int = 16, max_step_scale: int = 4, check_every: int = 8):
+        """budget: seconds of bot updates per frame. min_per_frame: bots updated even when over budget.
+        check_every: bots between clock reads (reading the clock for every bot costs more than small updates)."""
+        self.budget = budget
+        self.min_per_frame = min_per_frame
+        self.max_step_scale = max_step_scale
+        self.check_every = check_every
+        self.cursor = 0
+        self.updated = 0  # bots updated in the last frame
+        self.lag = 1.0  # frames per full pass over all bots, smoothed
+        self.max_staleness = 0
+
+    def reset(self, sprites) -> None:
+        """Start a new pass from the first bot and forget when each was last updated (e.g. the world went back to an
+        earlier frame)"""
+        self.cursor = 0
+        self.max_staleness = 0
+        for sprite in sprites:
+            sprite.sched_last_update = None
+
+    def update(self, sprites, frame: int) -> None:
+        """Replacement for sprite_list.update() for frame number `frame`"""
+        count = len(sprites)
+        if count == 0:
+            return
+        end_time = time.perf_counter() + self.budget
+        cursor = self.cursor % count
+        max_scale = self.max_step_scale
+        updated = 0
+        max_staleness = 0
+        while updated < count:
+            sprite = sprites[cursor]
+            last = getattr(sprite, 'sched_last_update', None)
+            staleness = frame - last if last is not None else 1
+            if staleness > max_staleness:
+                max_staleness = staleness
+            sprite.step_scale = max(1, min(staleness, max_scale))
+            sprite.update()
+            sprite.step_scale = 1
+            sprite.sched_last_update = frame
+            updated += 1
+            cursor += 1
+            if cursor >= count:
+                cursor = 0
+            if updated >= self.min_per_frame and updated % self.check_every == 0 and time.perf_counter() > end_time:
+                break
+        self.cursor = cursor
+        self.updated = updated
+        self.max_staleness = max_staleness
+        self.lag += 0.1 * (count / updated - self.lag)
@@ -0,0 +1,85 @@
+"""Sharded counters: each worker increments its own slot without a lock, the total is summed when it is read.
+
+The "central counter" pattern (one lock around every increment of one shared value) serializes all workers on the lock.
+With sharding, writers never contend because no two workers write the same slot. Reads are the expensive (and
+slightly stale) side, which suits counters that are written constantly and read now and then (stats, frame counts).
+"""
+import multiprocessing
+import threading
+from typing import List
+
+
+class ShardedCounter:
+    """Counter for threads. Each thread gets its own slot the first time it increments.
+
+    A slot is only ever written by the thread that owns it, so incr() needs no lock. The lock is only taken once per
+    thread to register a new slot and while summing the slots on read."""
+    def __init__(self):
+        self._local = threading.local()
+        self._slots: List[List[int]] = []
+        self._lock = threading.Lock()
+
+    def _slot(self) -> List[int]:
+        slot = getattr(self._local, 'slot', None)
+        if slot is None:
+            slot = [0]
+            with self._lock:
+                self._slots.append(slot)
+            self._local.slot = slot
+        return slot
+
+    def incr(self, n: int = 1) -> None:
+        self._slot()[0] += n
+
+    @property
+    def value(self) -> int:
+        with self._lock:
+            return sum(slot[0] for slot in self._slots)
+
+    @property
+    def shard_count(self) -> int:
+        return len(self._slots)
+
+
+class Shard:
+    """Writer for one slot of a ProcessShardedCounter. Owned by exactly one worker.
+
+    With flush_every > 1 increments are batched in a plain local int and only written to shared memory every
+    flush_every increments (call flush() when the worker finishes)."""
+    def __init__(self, array, index: int, flush_every: int = 1):
+        self._array = array
+        self._index = index
+        self._flush_every = flush_every
+        self._pending = 0
+
+    def incr(self, n: int = 1) -> None:
+        self._pending += n
+        if self._pending >= self._flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            self._array[self._index] += self._pending
+            self._pending = 0
+
+
+class ProcessShardedCounter:
+    """Counter for processes, with one slot per worker in shared memory.
+
+    Each worker must use its own shard (see shard()). Slots are spaced a cache line apart so workers on different
+    cores don't invalidate each other's cache line on every write (false sharing). Since each slot has a single
+    writer, the array is created without a lock."""
+    STRIDE = 8  # 8 x 8 byte slots = 64 bytes, a typical cache line
+
+    def __init__(self, shard_count: int):
+        self.shard_count = shard_count
+        self._array = multiprocessing.Array('q', shard_count * self.STRIDE, lock=False)
+
+    def shard(self, index: int, flush_every: int = 1) -> Shard:
+        if not 0 <= index < self.shard_count:
+            raise IndexError(f'Shard index {index} out of range for {self.shard_count} shards')
+        return Shard(self._array, index * self.STRIDE, flush_every)
+
+    @property
+    def value(self) -> int:
+        return sum(self._array[i * self.STRIDE] for i in range(self.shard_count))
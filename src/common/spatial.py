@@ -0,0 +1,122 @@
+"""Uniform grid of the bots' positions, rebuilt once per frame and shared by everything that asks "who is near here?".
+
+Rebuilding is one O(N) pass. A query only looks at the cells overlapping its area, so asking it once per bot keeps
+the whole frame near O(N) instead of every bot scanning every other bot.
+
+Positions are those at rebuild() time; bots that move during the frame are found by padding queries with how far a
+bot can move in one frame.
+"""
+import collections
+import heapq
+import math
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class SpatialGrid:
+    def __init__(self, cell_size: float = 32.0):
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], List] = collections.defaultdict(list)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def rebuild(self, sprites) -> None:
+        cells: Dict[Tuple[int, int], List] = collections.defaultdict(list)
+        size = self.cell_size
+        floor = math.floor
+        for sprite in sprites:
+            cells[(int(floor(sprite.center_x / size)), int(floor(sprite.center_y / size)))].append(sprite)
+        self.cells = cells
+
+    def query_box(self, left: float, bottom: float, right: float, top: float) -> Iterator:
+        """Every sprite in a cell overlapping the box (a superset of the sprites inside the box)"""
+        col0, row0 = self._cell(left, bottom)
+        col1, row1 = self._cell(right, top)
+        cells = self.cells
+        for col in range(col0, col1 + 1):
+            for row in range(row0, row1 + 1):
+                cell = cells.get((col, row))
+                if cell:
+                    yield from cell
+
+    def within(self, x: float, y: float, radius: float, exclude=None) -> List:
+        """Sprites whose center is within radius of (x, y)"""
+        r2 = radius * radius
+        result = []
+        for other in self.query_box(x - radius, y - radius, x + radius, y + radius):
+            if other is exclude:
+                continue
+            dx = other.center_x - x
+            dy = other.center_y - y
+            if dx * dx + dy * dy <= r2:
+                result.append(other)
+        return result
+
+    def has_neighbour(self, sprite, radius: float) -> bool:
+        """Is any other sprite's center within radius of this sprite's center?"""
+        x, y = sprite.center_x, sprite.center_y
+        r2 = radius * radius
+        for other in self.query_box(x - radius, y - radius, x + radius, y + radius):
+            if other is not sprite:
+                dx = other.center_x - x
+                dy = other.center_y - y
+                if dx * dx + dy * dy <= r2:
+                    return True
+        return False
+
+    def nearest(self, x: float, y: float, k: int, exclude=None, max_radius: Optional[float] = None) -> List:
+        """Up to k sprites closest to (x, y), nearest first, optionally only those within max_radius.
+
+        Searches rings of cells outward from (x, y) and stops once the next ring can't hold anything closer than the
+        k-th sprite found, so the cost depends on the local density, not on the number of sprites."""
+        size = self.cell_size
+        cells = self.cells
+        if not cells:
+            return []
+        col0, row0 = self._cell(x, y)
+        limit2 = max_radius * max_radius if max_radius is not None else math.inf
+        max_ring = int(max_radius // size) + 1 if max_radius is not None else None
+        found: List[Tuple[float, int, object]] = []  # max-heap (negated distance) of the best k so far
+        ring = 0
+        remaining = len(cells)
+        while remaining > 0:
+            for col in range(col0 - ring, col0 + ring + 1):
+                for row in range(row0 - ring, row0 + ring + 1):
+                    if ring and col0 - ring < col < col0 + ring and row0 - ring < row < row0 + ring:
+                        continue  # inside the ring, already searched
+                    cell = cells.get((col, row))
+                    if not cell:
+                        continue
+                    remaining -= 1
+                    for other in cell:
+                        if other is exclude:
+                            continue
+                        dx = other.center_x - x
+                        dy = other.center_y - y
+                        d2 = dx * dx + dy * dy
+                        if d2 > limit2:
+                            continue
+                        if len(found) < k:
+                            heapq.heappush(found, (-d2, id(other), other))
+                        elif d2 < -found[0][0]:
+                            heapq.heapreplace(found, (-d2, id(other), other))
+            # anything in the next ring is at least `ring * size` away
+            if len(found) == k and (ring * size) ** 2 >= -found[0][0]:
+                break
+            if max_ring is not None and ring >= max_ring:
+                break
+            ring += 1
+        return [other for _, _, other in sorted(found, reverse=True)]
+
+
+def attach_grid(bots, grid: Optional[SpatialGrid] = None) -> SpatialGrid:
+    """Keep `grid` (a new one by default) on the world's bot list `bots` as its neighbour grid. Its owner rebuilds it
+    once per frame, before the bots update; each world has its own, like its ContactEvents."""
+    grid = grid if grid is not None else SpatialGrid()
+    bots.neighbourhood = grid
+    return grid
+
+
+def grid_of(bots) -> Optional[SpatialGrid]:
+    """The neighbour grid attached to the bot list `bots`, None when its owner keeps none"""
+    return getattr(bots, 'neighbourhood', None)
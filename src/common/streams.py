@@ -0,0 +1,91 @@
+"""Counter-based random streams: a random number is a pure function of (seed, bot id, counter, draw).
+
+random.randint() from inside update() makes a bot's behaviour depend on how many numbers every bot updated before it
+drew, so the same seeded run can't be reproduced once bots are updated in another order: on threads, on world strips,
+or all at once with numpy. Here each bot owns a stream: `counter` is something the bot counts itself (e.g. how many
+times it has turned) and `draw` tells apart the numbers it needs at that count, and the four are hashed together with
+the SplitMix64 finalizer. No state is kept, so any engine, updating bots in any order, draws the same numbers, and a
+whole population can draw at once (randints(), uniforms()).
+
+The scalar functions are stdlib only, so crowd_interp's kernel can use them in subinterpreters; the batch functions
+need numpy and give exactly the scalar results.
+
+    streams.seed(12345)                                  # next to random.seed(12345)
+    angle = streams.randint(bot.id, bot.walks, 0, 360)
+    angles = streams.randints(ids, walks, 0, 360)        # numpy arrays in, numpy array out
+"""
+from typing import Optional
+
+_MASK = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+_M1 = 0xBF58476D1CE4E5B9
+_M2 = 0x94D049BB133111EB
+_UNIT = 2.0 ** -53
+
+SEED = 0
+
+
+def seed(value: int) -> None:
+    """Seed every bot's stream (the streams are also independent of the random module's state)"""
+    global SEED
+    SEED = value
+
+
+def _mix(z: int) -> int:
+    z = ((z ^ (z >> 30)) * _M1) & _MASK
+    z = ((z ^ (z >> 27)) * _M2) & _MASK
+    return z ^ (z >> 31)
+
+
+def bits(bot_id: int, counter: int, draw: int = 0, seed: Optional[int] = None) -> int:
+    """64 random bits of (seed, bot_id, counter, draw)"""
+    h = _mix(((SEED if seed is None else seed) * _GOLDEN) & _MASK)
+    h = _mix(((h ^ (bot_id & _MASK)) + _GOLDEN) & _MASK)
+    h = _mix(((h ^ (counter & _MASK)) + _GOLDEN) & _MASK)
+    return _mix((h + draw * _GOLDEN) & _MASK)
+
+
+def random(bot_id: int, counter: int, draw: int = 0, seed: Optional[int] = None) -> float:
+    """Float in [0, 1)"""
+    return (bits(bot_id, counter, draw, seed) >> 11) * _UNIT
+
+
+def randint(bot_id: int, counter: int, lo: int, hi: int, draw: int = 0, seed: Optional[int] = None) -> int:
+    """Integer in [lo, hi], both included, like random.randint()"""
+    return lo + int(random(bot_id, counter, draw, seed) * (hi - lo + 1))
+
+
+def uniform(bot_id: int, counter: int, a: float, b: float, draw: int = 0, seed: Optional[int] = None) -> float:
+    return a + (b - a) * random(bot_id, counter, draw, seed)
+
+
+def _bits_batch(bot_ids, counters, draw: int, seed: Optional[int]):
+    import numpy as np  # only the batch functions need numpy (not available in subinterpreters)
+
+    def mix(z):
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(_M1)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(_M2)
+        return z ^ (z >> np.uint64(31))
+
+    golden = np.uint64(_GOLDEN)
+    ids = np.asarray(bot_ids, dtype=np.int64).astype(np.uint64)
+    counts = np.asarray(counters, dtype=np.int64).astype(np.uint64)
+    h = mix(np.full(ids.shape, ((SEED if seed is None else seed) * _GOLDEN) & _MASK, dtype=np.uint64))
+    h = mix((h ^ ids) + golden)
+    h = mix((h ^ counts) + golden)
+    return mix(h + np.uint64((draw * _GOLDEN) & _MASK))
+
+
+def randoms(bot_ids, counters, draw: int = 0, seed: Optional[int] = None):
+    """random() of many bots at once: float64 array in the shape of bot_ids (counters: an array or one counter)"""
+    import numpy as np
+    return (_bits_batch(bot_ids, counters, draw, seed) >> np.uint64(11)).astype(np.float64) * _UNIT
+
+
+def randints(bot_ids, counters, lo: int, hi: int, draw: int = 0, seed: Optional[int] = None):
+    import numpy as np
+    return lo + np.floor(randoms(bot_ids, counters, draw, seed) * (hi - lo + 1)).astype(np.int64)
+
+
+def uniforms(bot_ids, counters, a: float, b: float, draw: int = 0, seed: Optional[int] = None):
+    return a + (b - a) * randoms(bot_ids, counters, draw, seed)
@@ -48,6 +48,13 @@ class Timer(ContextDecorator):
         self.last_elapsed = elapsed_time
         return elapsed_time
 
+    def elapsed(self) -> float:
+        """Time since the running timer was started, without stopping it"""
+        if self._start_time is None:
+            raise TimerError(f"Timer is not running. Use .start() to start it")
+
+        return time.perf_counter() - self._start_time
+
     def __enter__(self) -> "Timer":
         """Start a new timer as a context manager"""
         self.start()
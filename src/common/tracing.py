@@ -0,0 +1,156 @@
+"""Span tracing for a window of frames, exported as Chrome trace-event JSON.
+
+Open the written file in chrome://tracing or https://ui.perfetto.dev to see, frame by frame, which bots and which
+phases (move, collision query, behaviour logic, draw) the frame time went to.
+
+Tracing is meant to cost nothing when it is off: methods are only wrapped (instrument()) while a capture is running
+and are restored afterwards, and the traced update loop is only used while capturing. Callers branch on `active`.
+"""
+import collections
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class Tracer:
+    def __init__(self, path_prefix: str = 'trace'):
+        self.path_prefix = path_prefix
+        self.active = False
+        self.frames_left = 0
+        self.frame = 0
+        self.events: List[Tuple[str, str, int, int, int]] = []  # (name, category, start ns, duration ns, thread id)
+        self._frame_start = 0
+        self._patched: List[Tuple[type, str, Any]] = []
+        self._instrument_requests: List[Tuple[type, str, str]] = []
+
+    def instrument(self, cls: type, method_name: str, category: str) -> None:
+        """Register a method to wrap in a span (named by the instance's class) while a capture is running"""
+        self._instrument_requests.append((cls, method_name, category))
+
+    def _patch(self) -> None:
+        for cls, method_name, category in self._instrument_requests:
+            orig = cls.__dict__[method_name]
+            record = self.record
+
+            @functools.wraps(orig)
+            def wrapper(obj, *args, _orig=orig, _category=category, **kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return _orig(obj, *args, **kwargs)
+                finally:
+                    record(type(obj).__name__, _category, start)
+
+            setattr(cls, method_name, wrapper)
+            self._patched.append((cls, method_name, orig))
+
+    def _unpatch(self) -> None:
+        for cls, method_name, orig in reversed(self._patched):
+            setattr(cls, method_name, orig)
+        self._patched = []
+
+    def start(self, frames: int) -> None:
+        """Capture the next `frames` frames. end_frame() stops the capture and writes the file when they are done."""
+        if self.active:
+            return
+        self.events = []
+        self.frame = 0
+        self.frames_left = frames
+        self.active = True
+        self._patch()
+        self._frame_start = time.perf_counter_ns()
+        print(f'Tracing {frames} frames')
+
+    def stop(self) -> Optional[str]:
+        """Stop capturing, restore instrumented methods and write the trace. Returns path of the written file."""
+        if not self.active:
+            return None
+        self.active = False
+        self._unpatch()
+        path = f'{self.path_prefix}_{time.strftime("%Y%m%d_%H%M%S")}.json'
+        self.write(path)
+        self.print_summary()
+        print('Wrote trace', path)
+        return path
+
+    def record(self, name: str, category: str, start_ns: int) -> None:
+        """Record a span that started at start_ns (a time.perf_counter_ns() value) and ends now"""
+        self.events.append((name, category, start_ns, time.perf_counter_ns() - start_ns, threading.get_ident()))
+
+    @contextmanager
+    def _span(self, name, category):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, category, start)
+
+    def span(self, name: str, category: str):
+        """Context manager that records a span while capturing and does nothing otherwise"""
+        if not self.active:
+            return nullcontext()
+        return self._span(name, category)
+
+    def update_sprites(self, sprites) -> None:
+        """Traced replacement for sprite_list.update(): one 'update' span per sprite, named by its class"""
+        record = self.record
+        perf_counter_ns = time.perf_counter_ns
+        for sprite in sprites:
+            start = perf_counter_ns()
+            sprite.update()
+            record(type(sprite).__name__, 'update', start)
+
+    def end_frame(self) -> None:
+        if not self.active:
+            return
+        self.record(f'frame {self.frame}', 'frame', self._frame_start)
+        self.frame += 1
+        self.frames_left -= 1
+        if self.frames_left <= 0:
+            self.stop()
+        else:
+            self._frame_start = time.perf_counter_ns()
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        events = [{'name': name, 'cat': category, 'ph': 'X', 'ts': start / 1000.0, 'dur': dur / 1000.0,
+                   'pid': pid, 'tid': tid} for name, category, start, dur, tid in self.events]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def totals(self) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """(name, category) -> (count, total ns)"""
+        totals: Dict[Tuple[str, str], List[int]] = collections.defaultdict(lambda: [0, 0])
+        for name, category, start, dur, tid in self.events:
+            if category == 'frame':
+                name = 'frame'
+            t = totals[(name, category)]
+            t[0] += 1
+            t[1] += dur
+        return {k: (v[0], v[1]) for k, v in totals.items()}
+
+    def print_summary(self) -> None:
+        """Per-class time per phase. 'logic' is update time not spent in the nested move/collision spans."""
+        totals = self.totals()
+        frames = max(self.frame, 1)
+        print('{:<16} {:>8} {:>10} {:>10} {:>10} {:>10}'.format('class', 'updates', 'update ms', 'move ms',
+                                                                  'collide ms', 'logic ms'))
+        names = sorted({name for name, category in totals if category == 'update'},
+                       key=lambda n: -totals[(n, 'update')][1])
+        for name in names:
+            count, update = totals[(name, 'update')]
+            move = totals.get((name, 'move'), (0, 0))[1]
+            collide = totals.get((name, 'collision'), (0, 0))[1]
+            print('{:<16} {:>8} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}'.format(
+                name, count // frames, update / 1e6 / frames, move / 1e6 / frames, collide / 1e6 / frames,
+                (update - move - collide) / 1e6 / frames))
+        for (name, category), (count, total) in sorted(totals.items()):
+            if category not in ('update', 'move', 'collision'):
+                print(f'{name} ({category}): {total / 1e6 / frames:0.3f} ms/frame')
+        print('(per frame averages over', frames, 'frames)')
@@ -0,0 +1,180 @@
+"""Columnar, memory-mapped store of every bot's position and angle, frame by frame.
+
+A recording is a directory holding one flat binary file per column plus a frame index:
+
+    id.i4  kind.u1  x.f4  y.f4  angle.f4   one value per bot per frame, frames stored back to back
+    index.i64                              row offset just past the end of each frame
+    meta.json                              kind names (kind column is an index into this list)
+
+Writing is a plain append per column, so recording costs a few array copies per frame. Reading memory-maps the
+files: frame N is found in O(1) through the index and every query returns NumPy views into the mapped files, so hours
+of simulation can be scrubbed through or analysed without being loaded into RAM.
+
+A recording can be read while it is written: every `flush_every` frames the writer flushes the columns and only then
+writes their index entries, meta.json is rewritten as soon as a kind is added, and the reader only counts the frames
+every column fully holds. TrajectoryReader.reload() picks up the frames flushed since.
+"""
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+COLUMNS = {
+    'id': np.int32,
+    'kind': np.uint8,
+    'x': np.float32,
+    'y': np.float32,
+    'angle': np.float32,
+}
+INDEX_FILE = 'index.i64'
+META_FILE = 'meta.json'
+
+
+def _column_file(name: str) -> str:
+    return f'{name}.{np.dtype(COLUMNS[name]).str[1:]}'
+
+
+class TrajectoryWriter:
+    def __init__(self, path: str, flush_every: int = 60):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.flush_every = flush_every
+        self.kinds: List[str] = []
+        self._kind_index: Dict[str, int] = {}
+        self._files = {name: open(os.path.join(path, _column_file(name)), 'wb') for name in COLUMNS}
+        self._index = open(os.path.join(path, INDEX_FILE), 'wb')
+        self._pending: List[int] = []  # index entries of frames whose columns may not be flushed yet
+        self.rows = 0
+        self.frames = 0
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        # write then rename, so a reader never sees half a file
+        tmp = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'kinds': self.kinds, 'columns': list(COLUMNS)}, f)
+        os.replace(tmp, os.path.join(self.path, META_FILE))
+
+    def kind_of(self, name: str) -> int:
+        kind = self._kind_index.get(name)
+        if kind is None:
+            kind = len(self.kinds)
+            self.kinds.append(name)
+            self._kind_index[name] = kind
+            self._write_meta()
+        return kind
+
+    def append(self, ids, kinds, xs, ys, angles) -> None:
+        """Append one frame given as equal length sequences (or arrays) of each column"""
+        columns = {'id': ids, 'kind': kinds, 'x': xs, 'y': ys, 'angle': angles}
+        arrays = {name: np.asarray(values, dtype=COLUMNS[name]) for name, values in columns.items()}
+        count = len(arrays['id'])
+        for name, arr in arrays.items():
+            if len(arr) != count:
+                raise ValueError(f'Column {name} has {len(arr)} values, expected {count}')
+        for name, arr in arrays.items():
+            self._files[name].write(arr.tobytes())
+        self.rows += count
+        self._pending.append(self.rows)
+        self.frames += 1
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def append_sprites(self, sprites: Iterable) -> None:
+        """Append one frame from a list of bots (anything with id, center_x, center_y and angle)"""
+        sprites = list(sprites)
+        kind_of = self.kind_of
+        self.append([getattr(s, 'id', -1) for s in sprites],
+                     [kind_of(type(s).__name__) for s in sprites],
+                     [s.center_x for s in sprites],
+                     [s.center_y for s in sprites],
+                     [s.angle for s in sprites])
+
+    def flush(self) -> None:
+        """Make the frames appended so far visible to readers: columns first, then their index entries"""
+        for f in self._files.values():
+            f.flush()
+        if self._pending:
+            self._index.write(np.array(self._pending, dtype=np.int64).tobytes())
+            self._pending.clear()
+        self._index.flush()
+
+    def close(self) -> None:
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._index.close()
+
+    def __enter__(self) -> 'TrajectoryWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _map(path: str, dtype) -> np.ndarray:
+    """Read-only memory map of the whole values in a file (np.memmap refuses empty files and partial values)"""
+    count = os.path.getsize(path) // np.dtype(dtype).itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+
+class TrajectoryReader:
+    def __init__(self, path: str):
+        self.path = path
+        self.kinds: List[str] = []
+        self.columns: Dict[str, np.ndarray] = {}
+        self.index: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.frames = 0
+        self.reload()
+
+    def reload(self) -> None:
+        """Re-map the files, e.g. to see frames a live recording has flushed since"""
+        with open(os.path.join(self.path, META_FILE)) as f:
+            self.kinds = json.load(f)['kinds']
+        self.index = _map(os.path.join(self.path, INDEX_FILE), np.int64)
+        self.columns = {name: _map(os.path.join(self.path, _column_file(name)), dtype)
+                        for name, dtype in COLUMNS.items()}
+        # a live recording: only the frames every column holds completely
+        rows = min(len(col) for col in self.columns.values())
+        self.frames = int(np.searchsorted(self.index, rows, side='right'))
+
+    def __len__(self) -> int:
+        return self.frames
+
+    def _start(self, frame: int) -> int:
+        return int(self.index[frame - 1]) if frame > 0 else 0
+
+    def rows(self, start: int, stop: Optional[int] = None) -> slice:
+        """Row slice covering frames [start, stop)"""
+        if stop is None:
+            stop = start + 1
+        if not 0 <= start < stop <= len(self):
+            raise IndexError(f'Frames [{start}, {stop}) out of range for {len(self)} frames')
+        return slice(self._start(start), int(self.index[stop - 1]))
+
+    def frame(self, n: int) -> Dict[str, np.ndarray]:
+        """All columns of frame n, as views into the mapped files"""
+        if n < 0:
+            n += len(self)
+        rows = self.rows(n)
+        return {name: col[rows] for name, col in self.columns.items()}
+
+    def frame_range(self, start: int, stop: int) -> Dict[str, np.ndarray]:
+        """All columns for frames [start, stop) as views, plus 'offsets': where each frame starts in those views"""
+        rows = self.rows(start, stop)
+        result = {name: col[rows] for name, col in self.columns.items()}
+        result['offsets'] = np.concatenate(([rows.start], self.index[start:stop - 1])) - rows.start
+        return result
+
+    def track(self, bot_id: int, start: int = 0, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Path of one bot over frames [start, stop). Returns copies (x, y, angle and the frame of each row)."""
+        if stop is None:
+            stop = len(self)
+        data = self.frame_range(start, stop)
+        counts = np.diff(np.append(data['offsets'], len(data['id'])))
+        frames = np.repeat(np.arange(start, stop), counts)
+        mask = data['id'] == bot_id
+        return {'frame': frames[mask], 'x': data['x'][mask], 'y': data['y'][mask], 'angle': data['angle'][mask]}
@@ -0,0 +1,252 @@
+"""
+SUMMARY: One launcher for every crowd engine, with the performance knobs as command line options.
+
+    cd src/
+    python -m crowd                                             # the sync sandbox, as crowd.crowd_sandbox
+    python -m crowd --engine thread --cell-locks --sleep 0.02
+    python -m crowd --engine async --scenario random --bots 600 --width 1200 --height 800
+    python -m crowd --engine interp --workers 4 --headless --frames 2000 --profile
+    python -m crowd --engine sync --headless --frames 0 --metrics-port 9100   # runs until Ctrl-C
+
+Engines:
+    sync       crowd.crowd_sandbox (original implementation)
+    thread     crowd_thread.crowd_sandbox (one thread per bot)
+    async      crowd_async.crowd_sandbox (one asyncio task per bot)
+    multiproc  crowd_multiproc.crowd_sandbox (abandoned, window only, ignores the scenario options)
+    interp     crowd_interp (world strips on --workers subinterpreters, Python 3.12+, threads otherwise)
+    tiles      crowd_tiles (world tiles on --workers processes)
+
+--headless runs --frames frames without a window (the same engines crowd_compare.equivalence checks) and prints
+frames/s and frame time percentiles. --profile runs the sampling profiler (common/sampler.py) for the whole run and
+writes profile_<time>.folded. --metrics-port serves live frame counts and times in the Prometheus text format
+(common/metrics.py). --soak replaces the frame timings with crowd_compare/soak.py: bots are deleted and spawned every
+frame and the run fails (exit status 1) if traced memory or the task/thread count keeps growing.
+
+    python -m crowd --engine thread --headless --soak --frames 0 --churn 10 --snapshot-every 1000
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Callable, List, Optional
+
+from common import streams
+from common.metrics import Metrics, MetricsServer
+from common.sampler import SamplingProfiler
+from crowd.world import default_states, random_states
+
+ENGINES = ('sync', 'thread', 'async', 'multiproc', 'interp', 'tiles')
+HEADLESS = {'sync': 'crowd', 'thread': 'crowd_thread', 'async': 'crowd_async', 'interp': 'crowd_interp'}
+
+
+def scenario_states(args) -> Optional[List[tuple]]:
+    """Bot.get_state() tuples of the chosen scenario, None for each sandbox's own default scenario"""
+    if args.scenario == 'random':
+        return random_states(args.width, args.height, args.bots, args.seed)
+    return None
+
+
+def run_frames(step: Callable[[], None], frames: int, bot_count: int, metrics: Optional[Metrics]) -> List[float]:
+    """Call step() `frames` times (0: until Ctrl-C). Returns each frame's time in seconds."""
+    times = []
+    report_at = time.perf_counter() + 1.0
+    reported = 0
+    try:
+        while frames <= 0 or len(times) < frames:
+            start = time.perf_counter()
+            step()
+            end = time.perf_counter()
+            times.append(end - start)
+            if metrics is not None:
+                metrics.add('frames_total', 1, 'frames simulated')
+                metrics.set('frame_seconds', times[-1], 'time of the last frame')
+            if end >= report_at:
+                fps = (len(times) - reported) / (end - report_at + 1.0)
+                print(f'frame {len(times)}: {fps:0.1f} frames/s')
+                if metrics is not None:
+                    metrics.set('fps', fps, 'frames per second over the last second')
+                    metrics.set('bots', bot_count, 'bots in the world')
+                reported = len(times)
+                report_at = end + 1.0
+    except KeyboardInterrupt:
+        pass
+    return times
+
+
+def print_summary(engine: str, times: List[float], bot_count: int) -> None:
+    if not times:
+        return
+    total = sum(times)
+    ordered = sorted(times)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f'{engine}: {len(times)} frames of {bot_count} bots in {total:0.2f}s, {len(times) / total:0.1f} frames/s, '
+          f'frame ms mean {1000 * statistics.mean(times):0.2f} p99 {1000 * p99:0.2f} max {1000 * ordered[-1]:0.2f}')
+
+
+def run_headless(args, metrics: Optional[Metrics]) -> None:
+    states = scenario_states(args) or default_states()
+    if args.engine == 'tiles':
+        from crowd_tiles.crowd_sandbox import TiledWorld, check_conservation
+        from crowd_tiles.tiles import TileLayout
+        if args.frames <= 0:
+            raise SystemExit('the tiles engine needs --frames')
+        world = TiledWorld(TileLayout(args.width, args.height, args.workers, 1), states, args.frames, seed=args.seed)
+        world.start()
+
+        def step():
+            snapshot, counts = world.next_frame()
+            check_conservation(snapshot, len(states))
+
+        times = run_frames(step, args.frames, len(states), metrics)
+        world.join()
+    elif args.soak:
+        from crowd_compare.soak import run_soak
+        result = run_soak(HEADLESS[args.engine], states, args.frames, args.churn, args.snapshot_every, args.seed,
+                          args.workers, args.width, args.height)
+        print(f'{args.engine}: {result.frames} frames, {result.spawned} bots spawned, {result.deleted} deleted')
+        failures = result.failures(args.max_growth_kb * 1024)
+        if failures:
+            print('\n'.join(['growth since the first sample:'] + result.top_growth))
+            raise SystemExit('soak failed: ' + '; '.join(failures))
+        print('soak passed')
+        return
+    else:
+        from crowd_compare.engines import ENGINES as ENGINE_CLASSES
+        engine = ENGINE_CLASSES[HEADLESS[args.engine]](states, args.seed, args.workers)
+        try:
+            times = run_frames(engine.step, args.frames, len(states), metrics)
+        finally:
+            engine.close()
+    print_summary(args.engine, times, len(states))
+
+
+def publish_window_metrics(game, metrics: Metrics) -> None:
+    """Once a second, copy the sandbox's frame counts and update times into metrics"""
+    import arcade
+    seen = [len(game.times_update)]
+
+    def publish(delta_time: float):
+        new = game.times_update[seen[0]:]
+        seen[0] = len(game.times_update)
+        metrics.add('frames_total', len(new), 'frames simulated')
+        metrics.set('fps', len(new) / delta_time if delta_time > 0 else 0.0, 'frames per second over the last second')
+        metrics.set('bots', len(game.bots), 'bots in the world')
+        if new:
+            metrics.set('frame_seconds', max(new), 'slowest update of the last second')
+
+    arcade.schedule(publish, 1.0)
+
+
+def run_window(args, metrics: Optional[Metrics]) -> None:
+    import arcade
+    states = scenario_states(args)
+    options = dict(width=int(args.width), height=int(args.height), fps_window=args.fps_window, sleep=args.sleep,
+                   states=states)
+
+    def prepare(game):
+        game.set_location(600, 50)
+        if args.profile:
+            game.profiler.start()  # the sandbox writes it out when the window closes
+        if metrics is not None:
+            publish_window_metrics(game, metrics)
+        return game
+
+    if args.engine == 'sync':
+        from crowd import crowd_sandbox
+        prepare(crowd_sandbox.MyGame(gc_freeze=args.gc_freeze, hitch_log=args.hitch_log, **options))
+        arcade.run()
+    elif args.engine == 'thread':
+        from crowd_thread import crowd_sandbox
+        prepare(crowd_sandbox.MyGame(cell_locks=args.cell_locks, **options))
+        arcade.run()
+    elif args.engine == 'async':
+        import asyncio
+        from crowd_async import crowd_sandbox
+        asyncio.run(crowd_sandbox.run_event_loop(
+            lambda: prepare(crowd_sandbox.MyGame(hitch_log=args.hitch_log, **options))))
+    else:
+        # these windows only draw: profile them from the outside, and they have no frame timings to publish
+        if metrics is not None:
+            raise SystemExit(f'--metrics-port needs --headless with the {args.engine} engine')
+        profiler = SamplingProfiler()
+        if args.profile:
+            profiler.start()
+        try:
+            if args.engine == 'multiproc':
+                from crowd_multiproc import crowd_sandbox
+                crowd_sandbox.MyGame().set_location(600, 50)
+                arcade.run()
+            elif args.engine == 'interp':
+                from crowd_interp import crowd_sandbox, kernel
+                from common import interp
+                executor = 'interp' if interp.available() else 'thread'
+                pw = crowd_sandbox.PartitionedWorld([kernel.from_state(s) for s in states or default_states()],
+                                                    args.width, args.workers, executor, seed=args.seed)
+                crowd_sandbox.run_view(pw, int(args.width), int(args.height))
+            elif args.engine == 'tiles':
+                from crowd_tiles.crowd_sandbox import TiledWorld, run_view
+                from crowd_tiles.tiles import TileLayout
+                world = TiledWorld(TileLayout(args.width, args.height, args.workers, 1), states or default_states(),
+                                   args.frames if args.frames > 0 else 1_000_000, seed=args.seed)
+                run_view(world)
+        finally:
+            if profiler.running:
+                profiler.toggle()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m crowd', description='Run any crowd engine')
+    parser.add_argument('--engine', choices=ENGINES, default='sync')
+    parser.add_argument('--scenario', choices=('default', 'random'), default='default',
+                        help='default: the standard starting bots; random: --bots bots of mixed kinds')
+    parser.add_argument('--bots', type=int, default=200, help='bot count of the random scenario')
+    parser.add_argument('--width', type=float, default=800, help='window and world width')
+    parser.add_argument('--height', type=float, default=600, help='window and world height')
+    parser.add_argument('--seed', type=int, default=12345, help='seed of the scenario and of the bots\' randomness')
+    parser.add_argument('--headless', action='store_true', help='no window, just step the simulation')
+    parser.add_argument('--frames', type=int, default=600, help='frames to run headless, 0 to run until Ctrl-C')
+    parser.add_argument('--workers', type=int, default=2, help='strips (interp) or tiles (tiles) of the world')
+    parser.add_argument('--sleep', type=float, default=None, help='seconds to sleep every frame (keys 0-3 in the window)')
+    parser.add_argument('--fps-window', type=int, default=120, help='frames per printed frames/s measurement')
+    parser.add_argument('--cell-locks', action='store_true', help='thread engine: lock only the cells around a bot')
+    parser.add_argument('--gc-freeze', action='store_true', help='sync engine: gc.freeze() the starting objects')
+    parser.add_argument('--hitch-log', default=None, help='sync and async engines: append slow frames to this file')
+    parser.add_argument('--profile', action='store_true', help='sample the whole run, write profile_<time>.folded')
+    parser.add_argument('--metrics-port', type=int, default=None, help='serve Prometheus metrics on this port')
+    parser.add_argument('--soak', action='store_true',
+                        help='headless: delete and spawn --churn bots every frame, fail if memory or tasks/threads grow')
+    parser.add_argument('--churn', type=int, default=5, help='soak: bots deleted and spawned per frame')
+    parser.add_argument('--snapshot-every', type=int, default=500, help='soak: frames between memory samples')
+    parser.add_argument('--max-growth-kb', type=int, default=512, help='soak: allowed traced memory growth')
+    args = parser.parse_args(argv)
+    if args.engine == 'multiproc' and args.headless:
+        parser.error('the multiproc engine only runs in a window')
+    if args.soak and (not args.headless or args.engine not in HEADLESS):
+        parser.error('--soak needs --headless and one of the engines ' + ', '.join(HEADLESS))
+
+    random.seed(args.seed)  # repeatable randomness
+    streams.seed(args.seed)
+    metrics = server = None
+    if args.metrics_port is not None:
+        metrics = Metrics()
+        metrics.set('info', 1, f'engine {args.engine}')
+        server = MetricsServer(metrics, args.metrics_port)
+    try:
+        if args.headless:
+            profiler = SamplingProfiler()
+            if args.profile:
+                profiler.start()
+            try:
+                run_headless(args, metrics)
+            finally:
+                if profiler.running:
+                    profiler.toggle()
+        else:
+            run_window(args, metrics)
+    finally:
+        if server is not None:
+            server.close()
+
+
+if __name__ == '__main__':
+    main()
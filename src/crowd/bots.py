@@ -1,36 +1,67 @@
 """Various Bot implementations, each Bot following its own distinct logic"""
+import functools
 import math
-import random
+from typing import Optional, Tuple
 
 import arcade
 from arcade.utils import _Vec2
 
-from common import utl
+from common import collision, streams, utl
+from common.contacts import END, ContactCache, ContactEvents, events_of
+from common.flowfield import FlowField
+from common.spatial import grid_of
+
+
+@functools.lru_cache(maxsize=None)
+def square_texture(color) -> arcade.Texture:
+    """Bots of the same color share one texture instead of each rendering its own image"""
+    return arcade.make_soft_square_texture(10, color, 255, 255)
 
 
 class Bot(arcade.Sprite):
     """Simple bot that moves in the direction of its given angle"""
+    contacts: Optional[ContactCache] = None  # when set, collision queries try last frame's contacts first
+    events: ContactEvents  # blocked moves in this world, dispatched by its owner once per frame (see contact_events())
+    STATE_FIELDS: Tuple[str, ...] = ()  # per-kind behaviour state, beyond position and angle (see get_state())
+
     def __init__(self, x, y, bots, color):
         super().__init__()
-        self.debug = False
         self.bots = bots
+        self.events = contact_events(bots)
+        self.append_texture(square_texture(color))
+        self.set_texture(0)
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        """Set up all per-life state. Called on creation and again when a pooled Bot is reused."""
+        self.debug = False
+        self.alive = True
         self.center_x = x
         self.center_y = y
         self.angle = 0.0
         self.orig_x: float = 0
         self.orig_y: float = 0
-        square_texture = arcade.make_soft_square_texture(10, color, 255, 255)
-        self.append_texture(square_texture)
-        self.set_texture(0)
+        self.step_scale = 1  # frames this update stands for (more than 1 when updated at reduced rate, see common.lod)
+        self.flow: Optional[FlowField] = None  # when set, steers around obstacles toward the goal instead
+        self.changed = True  # get_state() may differ from when it was last recorded (see crowd.world.changes_since())
+
+    def get_state(self) -> tuple:
+        """Compact, picklable state of this Bot: (kind, id, x, y, angle, behaviour fields). See from_state()."""
+        return (type(self).__name__, self.id, self.center_x, self.center_y, self.angle,
+                {name: getattr(self, name) for name in self.STATE_FIELDS})
 
     def pos(self) -> _Vec2:
         """Convenience method to return current sprite position as a Vector"""
         return _Vec2(self.center_x, self.center_y)
 
-    def set_goal(self, goal: _Vec2) -> None:
+    def set_goal(self, goal: _Vec2, flow: Optional[FlowField] = None) -> None:
+        """Head for goal. With a flow field (built for the same goal) the heading is re-read from it every frame."""
         self.angle = utl.angle_between(self.pos(), goal)
+        self.flow = flow
+        self.changed = True
 
     def step_forward(self, dist):
+        dist *= self.step_scale
         self.center_x += math.cos(self.radians) * dist
         self.center_y += math.sin(self.radians) * dist
 
@@ -42,13 +73,33 @@ class Bot(arcade.Sprite):
         self.center_x = self.orig_x
         self.center_y = self.orig_y
 
+    def blocker(self):
+        """The Bot this Bot currently overlaps, or None"""
+        if self.contacts is not None:
+            return self.contacts.first(self, self.bots)
+        return collision.first_collision(self, self.bots)
+
+    def collides(self) -> bool:
+        """Does this Bot currently overlap any other Bot? Reports the contact to self.events when it does."""
+        other = self.blocker()
+        if other is None:
+            return False
+        self.events.hit(self, other)
+        return True
+
     def update(self):
         super().update()
+        if self.flow is not None:
+            angle = self.flow.angle_at(self.center_x, self.center_y)
+            if angle is not None and angle != self.angle:
+                self.angle = angle
+                self.changed = True
         self.save_pos()
         self.step_forward(2.0)
-        overlaps = self.collides_with_list(self.bots)
-        if len(overlaps) > 0:  # if movement would have this Sprite overlap another Sprite, cancel movement
+        if self.collides():  # if movement would have this Sprite overlap another Sprite, cancel movement
             self.restore_pos()
+        else:
+            self.changed = True
 
 
 class StationaryBot(Bot):
@@ -59,13 +110,16 @@ class StationaryBot(Bot):
 
 class OctWalkBot(Bot):
     """Bot walks in an octagon path"""
-    def __init__(self, x, y, bots, color):
-        super().__init__(x, y, bots, color)
+    STATE_FIELDS = ('frame_count',)
+
+    def reset(self, x, y):
+        super().reset(x, y)
         self.frame_count = 0
 
     def update(self):
         super().update()
-        self.frame_count += 1
+        self.frame_count += self.step_scale
+        self.changed = True
         if self.frame_count > 20:
             self.frame_count = 0
             self.angle += 45
@@ -73,17 +127,22 @@ class OctWalkBot(Bot):
 
 class RandomWalkBot(Bot):
     """Bot walks in random directions for random lengths of time"""
-    def __init__(self, x, y, bots, color):
-        super().__init__(x, y, bots, color)
+    STATE_FIELDS = ('frame_count', 'next_change_frame', 'walks')
+
+    def reset(self, x, y):
+        super().reset(x, y)
         self.frame_count = 0
         self.next_change_frame = 0
+        self.walks = 0  # turns so far: the counter of this bot's random stream (see common.streams)
 
     def update(self):
-        self.frame_count += 1
+        self.frame_count += self.step_scale
+        self.changed = True
         if self.frame_count > self.next_change_frame:
             self.frame_count = 0
-            self.next_change_frame = random.randint(10, 20)
-            self.angle = random.randint(0, 360)
+            self.next_change_frame = streams.randint(self.id, self.walks, 10, 20)
+            self.angle = streams.randint(self.id, self.walks, 0, 360, draw=1)
+            self.walks += 1
         super().update()
 
 
@@ -92,27 +151,38 @@ class BounceBot(Bot):
     def update(self):
         self.save_pos()
         self.step_forward(2.0)
-        overlaps = self.collides_with_list(self.bots)
-        if len(overlaps) > 0:  # if movement would have this Sprite overlap another Sprite, cancel movement and reflect
+        if self.collides():  # if movement would have this Sprite overlap another Sprite, cancel movement
             self.restore_pos()
-            self.angle += 180
+        else:
+            self.changed = True
+
+    @staticmethod
+    def on_contacts(events) -> None:
+        for e in events:
+            if e.kind != END:  # reflect
+                e.bot.angle += 180
+                e.bot.changed = True
 
 
 class RunAwayBot(Bot):
     """Moves slowly. When it gets bumped, it runs away quickly then stops. After a time it moves again."""
-    def __init__(self, x, y, bots, color):
-        super().__init__(x, y, bots, color)
+    STATE_FIELDS = ('state', 'frame_count')
+
+    def reset(self, x, y):
+        super().reset(x, y)
         self.state = 'normal'
         self.frame_count = 0
         self.angle = 180
 
     def update(self):
         self.save_pos()
+        if self.state != "normal":
+            self.changed = True  # counting down
         if self.state == "bumped" and self.frame_count <= 0:
             self.state = "waiting"
             self.frame_count = 60
         elif self.state == "waiting":
-            self.frame_count -= 1
+            self.frame_count -= self.step_scale
             if self.frame_count <= 0:
                 self.state = "normal"
                 self.angle += 180
@@ -121,10 +191,137 @@ class RunAwayBot(Bot):
                 self.step_forward(1.0)
             elif self.state == "bumped":
                 self.step_forward(5.0)
-                self.frame_count -= 1
-        overlaps = self.collides_with_list(self.bots)
-        if len(overlaps) > 0:  # if movement would have this Sprite overlap another Sprite, cancel movement and reflect
+                self.frame_count -= self.step_scale
+        if self.collides():  # if movement would have this Sprite overlap another Sprite, cancel movement
+            self.restore_pos()
+        else:
+            self.changed = True
+
+    @staticmethod
+    def on_contacts(events) -> None:
+        for e in events:
+            if e.kind != END:  # bumped: reflect and run
+                e.bot.angle += 180
+                e.bot.state = 'bumped'
+                e.bot.frame_count = 15
+                e.bot.changed = True
+
+
+class FlockBot(Bot):
+    """Flocks with the nearest other FlockBots: keeps its distance (separation), matches their heading (alignment) and
+    steers toward their center (cohesion). Walks straight on when its world keeps no neighbour grid (see
+    common.spatial.attach_grid())."""
+    NEIGHBOURS = 6
+    VIEW_RADIUS = 60.0
+    SEPARATION_RADIUS = 18.0
+    MAX_TURN = 8.0  # degrees per frame
+    STATE_FIELDS = ('jostles',)
+
+    def reset(self, x, y):
+        super().reset(x, y)
+        self.jostles = 0  # counter of this bot's random stream
+
+    def flockmates(self) -> list:
+        grid = grid_of(self.bots)
+        if grid is None:
+            return []
+        # ask for a few extra: not all neighbours are FlockBots
+        near = grid.nearest(self.center_x, self.center_y, self.NEIGHBOURS * 2, exclude=self,
+                            max_radius=self.VIEW_RADIUS)
+        return [b for b in near if type(b) is FlockBot][:self.NEIGHBOURS]
+
+    def steer(self) -> None:
+        mates = self.flockmates()
+        if not mates:
+            return
+        x, y = self.center_x, self.center_y
+        sep_x = sep_y = align_x = align_y = center_x = center_y = 0.0
+        for b in mates:
+            dx, dy = x - b.center_x, y - b.center_y
+            d2 = dx * dx + dy * dy
+            if 0 < d2 < self.SEPARATION_RADIUS ** 2:
+                sep_x += dx / d2
+                sep_y += dy / d2
+            align_x += math.cos(b.radians)
+            align_y += math.sin(b.radians)
+            center_x += b.center_x
+            center_y += b.center_y
+        n = len(mates)
+        coh_x, coh_y = center_x / n - x, center_y / n - y
+        coh_len = math.hypot(coh_x, coh_y) or 1.0
+        want_x = 15.0 * sep_x + align_x / n + 0.5 * coh_x / coh_len
+        want_y = 15.0 * sep_y + align_y / n + 0.5 * coh_y / coh_len
+        if want_x == 0 and want_y == 0:
+            return
+        turn = (math.degrees(math.atan2(want_y, want_x)) - self.angle + 180) % 360 - 180
+        limit = self.MAX_TURN * self.step_scale
+        self.angle += max(-limit, min(limit, turn))
+        self.changed = True
+
+    def blocker(self):
+        grid = grid_of(self.bots)
+        if grid is None or self.contacts is not None:
+            return super().blocker()
+        # grid cells hold positions from the start of the frame, pad the box by a bot plus a frame of movement
+        pad = 20.0 + 2.0 * self.step_scale
+        x, y = self.center_x, self.center_y
+        return collision.first_collision(self, list(grid.query_box(x - pad, y - pad, x + pad, y + pad)))
+
+    def update(self):
+        self.steer()
+        self.save_pos()
+        self.step_forward(1.5)
+        if self.collides():
             self.restore_pos()
-            self.angle += 180
-            self.state = 'bumped'
-            self.frame_count = 15
+        else:
+            self.changed = True
+
+    @staticmethod
+    def on_contacts(events) -> None:
+        blocked = [e.bot for e in events if e.kind != END]
+        if not blocked:
+            return
+        counters = []
+        for b in blocked:
+            counters.append(b.jostles)
+            b.jostles += 1
+        # the frame's whole batch in one vectorized draw, the same numbers as drawing one by one (common.streams)
+        for b, turn in zip(blocked, streams.uniforms([b.id for b in blocked], counters, -30, 30).tolist()):
+            b.angle += turn  # jostle out of the jam
+            b.changed = True
+
+
+def subscribe_reactions(events: ContactEvents) -> ContactEvents:
+    """Subscribe the kinds that react to being blocked"""
+    for cls in (BounceBot, RunAwayBot, FlockBot):
+        events.subscribe(cls, cls.on_contacts)
+    return events
+
+
+def contact_events(bots) -> ContactEvents:
+    """The ContactEvents of the world whose bot list is `bots` (see common.contacts.events_of())"""
+    return events_of(bots, subscribe_reactions)
+
+
+KINDS = {cls.__name__: cls for cls in (Bot, StationaryBot, OctWalkBot, RandomWalkBot, BounceBot, RunAwayBot,
+                                       FlockBot)}
+KIND_COLORS = {
+    'Bot': arcade.color.RED,
+    'StationaryBot': arcade.color.DARK_GRAY,
+    'OctWalkBot': arcade.color.YELLOW,
+    'RandomWalkBot': arcade.color.GREEN,
+    'BounceBot': arcade.color.BLUE,
+    'RunAwayBot': arcade.color.PURPLE,
+    'FlockBot': arcade.color.ORANGE,
+}
+
+
+def from_state(state: tuple, bots) -> Bot:
+    """Recreate a Bot from Bot.get_state() (e.g. in another process)"""
+    kind, bot_id, x, y, angle, fields = state
+    b = KINDS[kind](x, y, bots, KIND_COLORS[kind])
+    b.id = bot_id
+    b.angle = angle
+    for name, value in fields.items():
+        setattr(b, name, value)
+    return b
@@ -13,15 +13,28 @@ from typing import Optional
 import arcade
 from arcade.utils import _Vec2
 
-from crowd import bots
+from crowd import bots, world
 from common.fpsscanner import FpsScanner
-from common import utl
+from common import streams, utl
+from common.contacts import ContactCache
+from common.flowfield import FlowFieldCache
 from common.fpscounter import FpsCounter
+from common.heatmap import FlowGrid, draw_overlay
+from common.hitch import GcScheduler, HitchDetector
+from common.lod import LodScheduler
+from common.pool import BotPool
+from common.rewind import RewindBuffer
+from common.sampler import SamplingProfiler
+from common.scheduler import BudgetScheduler
+from common.spatial import attach_grid
 from common.timer import Timer
+from common.tracing import Tracer
+from common.trajectory import TrajectoryWriter
 
 
 class MyGame(arcade.Window):
-    def __init__(self):
+    def __init__(self, gc_freeze: bool = False, width: int = 800, height: int = 600, fps_window: int = 120,
+                 sleep: Optional[float] = None, states: Optional[list] = None, hitch_log: Optional[str] = None):
         self.times_init = []
         self.times_draw = []
         self.times_update = []
@@ -30,15 +43,30 @@ class MyGame(arcade.Window):
 
         with Timer() as init_timer:
             self.cnt = 0
-            super().__init__(800, 600, sys.argv[0])  # update_rate=1/60
+            super().__init__(width, height, sys.argv[0])  # update_rate=1/60
             self.paused = False
             self.frame_advance = False
-            self.sleep: Optional[float] = None
+            self.sleep: Optional[float] = sleep
             self.click_mode = 'goal'
             self.clicked_bot = None
             self.scanner = FpsScanner()
-            self.fps = FpsCounter(120)
+            self.fps = FpsCounter(fps_window)
+            self.profiler = SamplingProfiler()
+            self.tracer = Tracer()
+            self.tracer.instrument(bots.Bot, 'step_forward', 'move')
+            self.tracer.instrument(bots.Bot, 'collides', 'collision')
             self.bots = arcade.SpriteList()
+            self.pool = BotPool(self.bots)
+            self.events = bots.contact_events(self.bots)
+            self.hitches = HitchDetector(log_path=hitch_log)
+            self.gc_scheduler = GcScheduler()
+            self.frame_spawned = 0
+            self.frame_deleted = 0
+            self.frame = 0
+            self.grid = attach_grid(self.bots)  # rebuilt at the start of every frame, see update()
+            self.lod: Optional[LodScheduler] = None
+            self.budget: Optional[BudgetScheduler] = None
+            self.navigator: Optional[FlowFieldCache] = None
             self.bot_factories = utl.Cycler((
                 (arcade.color.RED, bots.Bot),
                 (arcade.color.DARK_GRAY, bots.StationaryBot),
@@ -46,58 +74,150 @@ class MyGame(arcade.Window):
                 (arcade.color.GREEN, bots.RandomWalkBot),
                 (arcade.color.BLUE, bots.BounceBot),
                 (arcade.color.PURPLE, bots.RunAwayBot),
+                (arcade.color.ORANGE, bots.FlockBot),
             ))
 
-            goal = _Vec2(700, 300)
-            seq = 0
-            for x in range(50, 150, 25):
-                for y in range(50, 550, 25):
-                    b = bots.Bot(x, y, self.bots, arcade.color.RED)
-                    b.id = seq
-                    seq += 1
-                    b.set_goal(goal)
-                    self.bots.append(b)
-            self.bots[9].angle = 355
-
-            self.bots.append(bots.OctWalkBot(400, 300, self.bots, arcade.color.YELLOW))
-            self.bots.append(bots.RunAwayBot(500, 350, self.bots, arcade.color.PURPLE))
-            self.bots.append(bots.RunAwayBot(475, 340, self.bots, arcade.color.PURPLE))
-
-            for x in range(550, 650, 25):
-                for y in range(450, 550, 25):
-                    self.bots.append(bots.RandomWalkBot(x, y, self.bots, arcade.color.GREEN))
-
-            for x in (500, 600, 625, 650, 700):
-                b = bots.BounceBot(x, 300, self.bots, arcade.color.BLUE)
-                b.angle = 180
-                self.bots.append(b)
-
-            for y in range(200, 400, 20):
-                self.bots.append(bots.StationaryBot(723, y, self.bots, arcade.color.DARK_GRAY))
+            self.next_id = 0
+            self.recorder: Optional[TrajectoryWriter] = None
+            self.rewind: Optional[RewindBuffer] = None
+            self.heatmap: Optional[FlowGrid] = None
+
+            if states is None:
+                world.populate_default(self)
+            else:  # Bot.get_state() tuples, e.g. crowd.world.random_states()
+                for state in states:
+                    self.bots.append(bots.from_state(state, self.bots))
+                self.next_id = max((b.id for b in self.bots), default=-1) + 1
 
             print(f'There are {len(self.bots)} starting Bots')
+            if gc_freeze:
+                self.gc_scheduler.freeze_after_init()
 
         self.times_init.append(init_timer.last_elapsed)
 
+    def add_bot(self, b: bots.Bot) -> None:
+        """Give the bot a unique id and add it to the world"""
+        b.id = self.next_id
+        self.next_id += 1
+        self.bots.append(b)
+
+    def spawn_bots(self, factory, color, positions) -> None:
+        """Batched add of (possibly recycled) bots, each with a new unique id"""
+        for b in self.pool.spawn(factory, color, positions):
+            b.id = self.next_id
+            self.next_id += 1
+            self.frame_spawned += 1
+
+    def toggle_recording(self):
+        if self.recorder is None:
+            path = 'trajectory_' + time.strftime('%Y%m%d_%H%M%S')
+            self.recorder = TrajectoryWriter(path)
+            print('Recording trajectories to', path)
+        else:
+            self.recorder.close()
+            print('Recorded', self.recorder.frames, 'frames to', self.recorder.path)
+            self.recorder = None
+
+    def toggle_rewind(self, seconds: float = 60.0):
+        if self.rewind is None:
+            self.rewind = RewindBuffer(capacity=int(seconds * 60))
+            self.record_rewind()
+            print(f'Rewind buffer on: the last {seconds:0.0f}s, LEFT/RIGHT step a frame, with Shift a second')
+        else:
+            self.rewind = None
+            print('Rewind buffer off')
+
+    def record_rewind(self):
+        if len(self.rewind):
+            self.rewind.record_changes(self.frame, *world.changes_since(self.bots, self.rewind.latest))
+        else:
+            self.rewind.record(self.frame, {b.id: b.get_state() for b in self.bots if b.alive})
+
+    def step_rewind(self, frames: int):
+        """Pause and show the buffered frame `frames` away from the one shown (negative: back). Resuming (P or SPACE)
+        continues the simulation from there and forgets the frames after it."""
+        if self.rewind is None:
+            print('Rewind buffer is off (W)')
+            return
+        self.paused = True
+        frame = min(max(self.frame + frames, self.rewind.oldest), self.rewind.newest)
+        world.restore_states(self.pool, self.rewind.state_at(frame))
+        self.events.reset()  # last frame's contacts were those of the frame left behind
+        # nor are the schedulers' last-update frames ours any more: they start afresh from here
+        if self.lod is not None:
+            self.lod.reset(self.bots)
+        if self.budget is not None:
+            self.budget.reset(self.bots)
+        self.frame = frame
+        print(f'Frame {frame}, {self.rewind.newest - frame} of {len(self.rewind) - 1} buffered frames back')
+
     def on_draw(self):
         with Timer(logger=None) as draw_timer:
             arcade.start_render()
             self.scanner.draw()
-            self.bots.draw()
+            if self.heatmap is not None:
+                draw_overlay(self.heatmap)
+            with self.tracer.span('draw', 'draw'):
+                self.bots.draw()
+            if self.lod is not None and self.lod.focus is not None:
+                left, bottom, right, top = self.lod.focus
+                arcade.draw_lrtb_rectangle_outline(left, right, top, bottom, arcade.color.WHITE)
         self.times_draw.append(draw_timer.last_elapsed)
 
     def update(self, delta_time: float):
         with Timer(logger=None) as update_timer:
+            self.pool.compact()  # bots deleted since last frame leave the world here, in one pass
             self.fps.tick()
             if self.fps.is_ready():
                 print('FPS', self.fps.get_fps())
+                if self.lod is not None:
+                    print('LOD full', self.lod.full, 'reduced', self.lod.reduced, 'skipped', self.lod.skipped)
+                if bots.Bot.contacts is not None:
+                    contacts = bots.Bot.contacts
+                    print('contacts', len(contacts.pairs), 'cache hits', contacts.cache_hits, 'full scans',
+                          contacts.full_scans)
+                    contacts.reset_stats()
+                if self.rewind is not None:
+                    print('rewind {} frames in {:0.1f} MiB'.format(len(self.rewind), self.rewind.nbytes / 2 ** 20))
+                if self.budget is not None:
+                    print('simulation lag {:0.2f} frames, {} bots/frame, max staleness {}'.format(
+                        self.budget.lag, self.budget.updated, self.budget.max_staleness))
+            slept = None  # the preset sleep, only on frames that ran (a paused frame doesn't sleep)
             if not self.paused or self.frame_advance:
                 if self.frame_advance:
                     self.frame_advance = False
+                if self.rewind is not None and self.frame < self.rewind.newest:
+                    self.rewind.truncate(self.frame)  # resuming from a rewound frame: a new future from here
                 if self.sleep is not None:
                     time.sleep(self.sleep)
+                    slept = self.sleep
                 self.scanner.update()
-                self.bots.update()
+                if self.lod is None:  # LOD rebuilds the grid itself
+                    self.grid.rebuild(self.bots)
+                if self.tracer.active:
+                    self.tracer.update_sprites(self.bots)
+                elif self.lod is not None:
+                    self.lod.update(self.bots, self.frame)
+                elif self.budget is not None:
+                    self.budget.update(self.bots, self.frame)
+                else:
+                    self.bots.update()
+                self.events.end_frame()  # reactions to this frame's blocked moves, one batch per bot class
+                self.frame += 1
+                if bots.Bot.contacts is not None:
+                    bots.Bot.contacts.end_frame()
+                self.tracer.end_frame()
+                if self.rewind is not None:
+                    self.record_rewind()
+                if self.recorder is not None:
+                    self.recorder.append_sprites(self.bots)
+                if self.heatmap is not None:
+                    self.heatmap.accumulate_sprites(self.bots)
+            self.hitches.end_frame(len(self.bots), self.frame_spawned, self.frame_deleted, sleep=slept)
+            self.frame_spawned = 0
+            self.frame_deleted = 0
+            last_draw = self.times_draw[-1] if self.times_draw else 0.0
+            self.gc_scheduler.idle(1 / 60 - update_timer.elapsed() - last_draw)
         self.times_update.append(update_timer.last_elapsed)
 
     def on_key_press(self, symbol: int, modifiers: int):
@@ -115,6 +235,57 @@ class MyGame(arcade.Window):
             self.sleep = 0.1
         elif symbol == arcade.key.KEY_3:
             self.sleep = 1.0
+        # rewind: W keeps the last minute of frames, LEFT/RIGHT step through them (Shift: a second at a time)
+        elif symbol == arcade.key.W:
+            self.toggle_rewind()
+        elif symbol in (arcade.key.LEFT, arcade.key.RIGHT):
+            frames = 60 if modifiers & arcade.key.MOD_SHIFT else 1
+            self.step_rewind(frames if symbol == arcade.key.RIGHT else -frames)
+        # trajectory recording (replay with `python -m crowd.replay <dir>`)
+        elif symbol == arcade.key.R:
+            self.toggle_recording()
+        # crowd density/flow heatmap overlay (Shift+H exports the grids)
+        elif symbol == arcade.key.H:
+            if modifiers & arcade.key.MOD_SHIFT:
+                if self.heatmap is not None:
+                    path = 'heatmap_' + time.strftime('%Y%m%d_%H%M%S') + '.npz'
+                    self.heatmap.export(path)
+                    print('Exported heatmap to', path)
+            elif self.heatmap is None:
+                self.heatmap = FlowGrid(self.width, self.height)
+            else:
+                self.heatmap = None
+        # level of detail: isolated bots (or bots outside the focus rectangle) update every few frames
+        elif symbol == arcade.key.L:
+            self.lod = LodScheduler(self.grid) if self.lod is None else None
+            print('LOD', 'on' if self.lod else 'off')
+        # per-frame time budget for bot updates (round-robin, unfinished bots carry over to the next frame)
+        elif symbol == arcade.key.B:
+            self.budget = BudgetScheduler() if self.budget is None else None
+            print('Update budget', 'on' if self.budget else 'off')
+        # contact cache: re-test last frame's contacts before scanning all bots
+        elif symbol == arcade.key.C:
+            bots.Bot.contacts = ContactCache() if bots.Bot.contacts is None else None
+            print('Contact cache', 'on' if bots.Bot.contacts else 'off')
+        # flow field navigation: goal clicks route bots around StationaryBots (fields cached per goal cell)
+        elif symbol == arcade.key.N:
+            self.navigator = FlowFieldCache(self.width, self.height) if self.navigator is None else None
+            print('Flow field navigation', 'on' if self.navigator else 'off')
+        elif symbol == arcade.key.O:
+            if modifiers & arcade.key.MOD_SHIFT:
+                if self.lod is not None:
+                    self.lod.focus = None
+            else:
+                self.click_mode = 'focus'
+        # sampling profiler (writes collapsed stacks for a flamegraph when toggled off)
+        elif symbol == arcade.key.F:
+            self.profiler.toggle()
+        # tracing
+        elif symbol == arcade.key.T:
+            if self.tracer.active:
+                self.tracer.stop()
+            else:
+                self.tracer.start(300)  # about 5 seconds at 60 fps
         # click mode
         elif symbol == arcade.key.A:
             self.click_mode = 'add'
@@ -151,6 +322,12 @@ class MyGame(arcade.Window):
         self._times_summary('draw  ', self.times_draw)
         self._times_summary('update', self.times_update)
         print('total', self.total_timer.stop())
+        if self.profiler.running:
+            self.profiler.toggle()
+        if self.recorder is not None:
+            self.toggle_recording()
+        print('hitches', self.hitches.hitches, 'gc collections in idle time', self.gc_scheduler.collections)
+        self.hitches.close()
 
     def on_mouse_press(self, x: float, y: float, button: int, modifiers: int):
         super().on_mouse_press(x, y, button, modifiers)
@@ -160,26 +337,34 @@ class MyGame(arcade.Window):
                 print('changing goal')
                 # change goal
                 goal = _Vec2(x, y)
+                flow = None
+                if self.click_mode == 'goal':
+                    flow = world.goal_flow(self.navigator, self.bots, x, y)
                 for bot in [b for b in self.bots if type(b) is bots.Bot]:
-                    bot.set_goal(goal)
+                    bot.set_goal(goal, flow)
                     if self.click_mode == 'goal_reverse':
                         bot.angle += 180
             elif self.click_mode == 'add':
                 print('adding bot....')
-                # add new bot
+                # add new bot (Shift+click adds a 5x5 block of them in one batch)
                 clr, bot_factory = self.bot_factories.get()
-                b = bot_factory(x, y, self.bots, clr)
-                b.id = 999999
-                self.bots.append(b)
+                if modifiers & arcade.key.MOD_SHIFT:
+                    positions = [(x + dx, y + dy) for dx in range(-50, 51, 25) for dy in range(-50, 51, 25)]
+                else:
+                    positions = [(x, y)]
+                self.spawn_bots(bot_factory, clr, positions)
             elif self.click_mode == 'delete':
                 touched = arcade.get_sprites_at_point((x, y), self.bots)
                 print('Removing', len(touched), 'Bots')
-                for b in touched:
-                    self.bots.remove(b)
+                self.pool.despawn(touched)
+                self.frame_deleted += len(touched)
             elif self.click_mode == 'move':
                 touched = arcade.get_sprites_at_point((x, y), self.bots)
                 if len(touched) > 0:
                     self.clicked_bot = touched[0]
+            elif self.click_mode == 'focus':
+                if self.lod is not None:
+                    self.lod.focus = (x - 150, y - 150, x + 150, y + 150)
         else:
             # set debugging flag on a bot
             touched = arcade.get_sprites_at_point((x, y), self.bots)
@@ -191,10 +376,12 @@ class MyGame(arcade.Window):
         if self.clicked_bot is not None:
             self.clicked_bot.center_x = x
             self.clicked_bot.center_y = y
+            self.clicked_bot.changed = True
 
 
 if __name__ == '__main__':
     random.seed(12345)  # repeatable randomness
-    game = MyGame()
+    streams.seed(12345)
+    game = MyGame(gc_freeze='--gc-freeze' in sys.argv, hitch_log='hitches.jsonl' if '--hitch-log' in sys.argv else None)
     game.set_location(600, 50)
     arcade.run()
@@ -0,0 +1,74 @@
+"""
+SUMMARY: Scrub/replay viewer for trajectories recorded from crowd_sandbox (R key).
+
+Only the frame on screen is read from the memory-mapped recording, so recordings far bigger than RAM play fine.
+
+Controls: SPACE play/pause, LEFT/RIGHT step one frame (hold SHIFT for 60), HOME/END jump to start/end,
+drag mouse to scrub, L reload (pick up frames of a recording still in progress), ESCAPE quit.
+
+    cd src/
+    python -m crowd.replay trajectory_20200101_120000
+"""
+import sys
+
+import arcade
+
+from common.trajectory import TrajectoryReader
+from crowd.bots import KIND_COLORS
+
+
+class ReplayWindow(arcade.Window):
+    def __init__(self, path):
+        super().__init__(800, 600, path)
+        self.reader = TrajectoryReader(path)
+        self.frame = 0
+        self.playing = True
+        print(f'{len(self.reader)} frames, kinds: {self.reader.kinds}')
+
+    def on_draw(self):
+        arcade.start_render()
+        if len(self.reader) == 0:
+            return
+        data = self.reader.frame(self.frame)
+        for kind, name in enumerate(self.reader.kinds):
+            mask = data['kind'] == kind
+            if mask.any():
+                points = list(zip(data['x'][mask].tolist(), data['y'][mask].tolist()))
+                arcade.draw_points(points, KIND_COLORS.get(name, arcade.color.WHITE), 10)
+        arcade.draw_text(f'frame {self.frame} / {len(self.reader) - 1}', 10, 580, arcade.color.WHITE, 12)
+
+    def update(self, delta_time: float):
+        if self.playing and self.frame < len(self.reader) - 1:
+            self.frame += 1
+
+    def seek(self, frame):
+        self.frame = max(0, min(frame, len(self.reader) - 1))
+
+    def on_key_press(self, symbol: int, modifiers: int):
+        step = 60 if modifiers & arcade.key.MOD_SHIFT else 1
+        if symbol == arcade.key.SPACE:
+            self.playing = not self.playing
+        elif symbol == arcade.key.LEFT:
+            self.playing = False
+            self.seek(self.frame - step)
+        elif symbol == arcade.key.RIGHT:
+            self.playing = False
+            self.seek(self.frame + step)
+        elif symbol == arcade.key.HOME:
+            self.seek(0)
+        elif symbol == arcade.key.END:
+            self.seek(len(self.reader) - 1)
+        elif symbol == arcade.key.L:
+            self.reader.reload()
+            print(f'{len(self.reader)} frames')
+        elif symbol == arcade.key.ESCAPE:
+            self.close()
+
+    def on_mouse_drag(self, x: float, y: float, dx: float, dy: float, buttons: int, modifiers: int):
+        self.playing = False
+        self.seek(int(x / self.width * len(self.reader)))
+
+
+if __name__ == '__main__':
+    window = ReplayWindow(sys.argv[1])
+    arcade.run()
@@ -0,0 +1,187 @@
+"""
+SUMMARY: Headless crowd simulation streaming its state to any number of viewers over TCP (see common/netstate.py).
+
+The simulation no longer waits for rendering: it steps at --fps (0: as fast as it can) and every viewer gets a
+keyframe/delta stream of the bots. Viewers send commands back on the same connection (goal, add, delete, move), which
+are applied at the start of the next frame. A command that doesn't parse or doesn't make sense (an unknown kind, a
+missing or non-numeric coordinate) is logged and dropped: no viewer can stop the simulation for the others.
+
+A viewer whose connection can't keep up (more than --max-buffer bytes queued) is skipped instead of slowing the
+simulation down, and is sent a keyframe to resync once its backlog has drained.
+
+    cd src/
+    python -m crowd.server --port 8765
+    python -m crowd.viewer --port 8765              # arcade window
+    python -m crowd.viewer --port 8765 --stand-in   # headless protocol check
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List, Optional
+
+from common import netstate, streams
+from common.flowfield import FlowFieldCache
+from crowd import bots
+from crowd.world import World, populate_default
+
+KIND_NAMES = list(bots.KINDS)  # kind number on the wire -> kind name
+KIND_IDS = {name: i for i, name in enumerate(KIND_NAMES)}
+
+
+def _number(command: dict, key: str) -> float:
+    """command[key], which must be a number (ValueError otherwise)"""
+    value = command.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f'{key} must be a number, not {value!r}')
+    return value
+
+
+class Viewer:
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.resync = True  # needs a keyframe before deltas make sense to it
+        self.bytes_sent = 0
+        self.skipped = 0
+
+
+class SimulationServer:
+    def __init__(self, world: World, fps: float = 60, keyframe_every: int = 60, max_buffer: int = 1 << 20):
+        self.world = world
+        self.fps = fps
+        self.max_buffer = max_buffer
+        self.encoder = netstate.StateEncoder(keyframe_every)
+        self.viewers: Dict[asyncio.StreamWriter, Viewer] = {}
+        self.commands: List[dict] = []
+
+    def states(self):
+        return [(b.id, KIND_IDS[type(b).__name__], b.center_x, b.center_y, b.angle) for b in self.world.bots if b.alive]
+
+    async def handle_viewer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.viewers[writer] = Viewer(writer)
+        print('viewer connected', writer.get_extra_info('peername'))
+        try:
+            while True:
+                length, msg_type = netstate.parse_header(await reader.readexactly(netstate.HEADER_SIZE))
+                payload = await reader.readexactly(length)
+                if msg_type == netstate.COMMAND:
+                    try:
+                        command = netstate.parse_command(payload)
+                    except ValueError as e:  # not JSON, or not UTF-8
+                        print('dropped unreadable command:', e)
+                        continue
+                    self.commands.append(command)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            del self.viewers[writer]
+            writer.close()
+            print('viewer disconnected')
+
+    def apply_command(self, command: dict) -> None:
+        """Apply one viewer command. ValueError if it is malformed, before anything in the world has changed."""
+        if not isinstance(command, dict):
+            raise ValueError('a command is a JSON object')
+        cmd = command.get('cmd')
+        world = self.world
+        if cmd == 'goal':
+            world.set_goal(_number(command, 'x'), _number(command, 'y'), bool(command.get('reverse', False)))
+        elif cmd == 'add':
+            kind = command.get('kind', 'Bot')
+            if kind not in bots.KINDS:
+                raise ValueError(f'unknown bot kind {kind!r}')
+            world.spawn_bots(kind, [(_number(command, 'x'), _number(command, 'y'))])
+        elif cmd == 'delete':
+            world.pool.despawn(world.bots_at(_number(command, 'x'), _number(command, 'y')))
+        elif cmd == 'move':
+            bot_id, x, y = _number(command, 'id'), _number(command, 'x'), _number(command, 'y')
+            b = world.find(bot_id)
+            if b is not None:
+                b.center_x = x
+                b.center_y = y
+        else:
+            raise ValueError(f'unknown command {cmd!r}')
+
+    def step(self) -> bytes:
+        """Apply the commands received since the last frame, step the world and send the frame to every viewer"""
+        commands, self.commands = self.commands, []
+        for command in commands:
+            try:
+                self.apply_command(command)
+            except (KeyError, TypeError, ValueError) as e:
+                print('dropped command', command, '-', e)
+        self.world.step()
+        message = self.encoder.encode(self.world.frame, self.states())
+        self.broadcast(message)
+        return message
+
+    def broadcast(self, message: bytes) -> None:
+        keyframe = None
+        for viewer in self.viewers.values():
+            if viewer.writer.transport.get_write_buffer_size() > self.max_buffer:
+                viewer.resync = True  # it misses this delta, so later ones won't apply
+                viewer.skipped += 1
+                continue
+            if viewer.resync:
+                if keyframe is None:
+                    keyframe = self.encoder.keyframe()
+                data = keyframe
+                viewer.resync = False
+            else:
+                data = message
+            viewer.writer.write(data)
+            viewer.bytes_sent += len(data)
+
+    async def run(self, host: str, port: int, frames: Optional[int] = None) -> None:
+        server = await asyncio.start_server(self.handle_viewer, host, port)
+        print('serving on', ', '.join(str(s.getsockname()) for s in server.sockets))
+        world = self.world
+        period = 1 / self.fps if self.fps else 0
+        next_tick = time.perf_counter()
+        report_time = next_tick
+        report_frame = world.frame
+        report_bytes = 0
+        while frames is None or world.frame < frames:
+            report_bytes += len(self.step())
+
+            now = time.perf_counter()
+            if now - report_time >= 1.0:
+                done = world.frame - report_frame
+                print('frames/s {:0.1f}, {} bots, {} viewers, {:0.0f} bytes/frame'.format(
+                    done / (now - report_time), len(world.bots), len(self.viewers), report_bytes / max(done, 1)))
+                report_time, report_frame, report_bytes = now, world.frame, 0
+            next_tick += period
+            # always yield so viewers' commands and output get serviced, even when running flat out
+            await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+            if next_tick < now - 1.0:
+                next_tick = now  # fell far behind, don't try to catch up with a burst of frames
+
+        for viewer in list(self.viewers.values()):
+            viewer.writer.close()
+        server.close()
+        await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless crowd simulation streaming state to remote viewers')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fps', type=float, default=60, help='simulation frames per second, 0 for unthrottled')
+    parser.add_argument('--keyframe-every', type=int, default=60)
+    parser.add_argument('--max-buffer', type=int, default=1 << 20, help='bytes queued before a viewer is skipped')
+    parser.add_argument('--frames', type=int, default=None, help='stop after this many frames')
+    parser.add_argument('--flow-field', action='store_true', help='goal commands route bots around obstacles')
+    args = parser.parse_args()
+
+    random.seed(12345)  # repeatable randomness
+    streams.seed(12345)
+    world = World()
+    populate_default(world)
+    if args.flow_field:
+        world.navigator = FlowFieldCache(800, 600)
+    server = SimulationServer(world, args.fps, args.keyframe_every, args.max_buffer)
+    asyncio.run(server.run(args.host, args.port, args.frames))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+SUMMARY: Remote viewer for crowd.server. Draws the streamed world and sends mouse commands back.
+
+Controls: G/Shift+G goal (toward/away) mode, A add mode (Shift+A cycles the kind), D delete mode, M move mode (click a
+bot, then drag it), ESCAPE quit.
+
+--stand-in runs without a window: it decodes the stream for --seconds, sends one of each command and reports what it
+received, which is enough to exercise the whole protocol.
+
+    cd src/
+    python -m crowd.viewer --port 8765
+    python -m crowd.viewer --port 8765 --stand-in
+"""
+import argparse
+import socket
+import threading
+import time
+from typing import Optional
+
+from common import netstate, utl
+from crowd.bots import KIND_COLORS
+from crowd.server import KIND_NAMES
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError('server closed the connection')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+class ViewerConnection:
+    """Receives the state stream on a background thread. Read `decoder` (or call bots()) for the latest state."""
+    def __init__(self, host: str, port: int):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.decoder = netstate.StateDecoder()
+        self.lock = threading.Lock()
+        self.bytes_received = 0
+        self.connected = True
+        self.thread = threading.Thread(target=self._receive, daemon=True)
+        self.thread.start()
+
+    def _receive(self) -> None:
+        try:
+            while True:
+                length, msg_type = netstate.parse_header(_recv_exactly(self.sock, netstate.HEADER_SIZE))
+                payload = _recv_exactly(self.sock, length)
+                with self.lock:
+                    self.decoder.apply(msg_type, payload)
+                    self.bytes_received += netstate.HEADER_SIZE + length
+        except (ConnectionError, OSError):
+            self.connected = False
+
+    def bots(self) -> dict:
+        with self.lock:
+            return self.decoder.bots
+
+    def send(self, cmd: str, **args) -> None:
+        self.sock.sendall(netstate.command_message(cmd, **args))
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+def run_stand_in(conn: ViewerConnection, seconds: float) -> None:
+    time.sleep(seconds / 2)
+    first = conn.bots()
+    conn.send('goal', x=100, y=100)
+    conn.send('add', kind='OctWalkBot', x=300, y=500)
+    if first:
+        bot_id, (kind, x, y, angle) = next(iter(first.items()))
+        conn.send('move', id=bot_id, x=x + 5, y=y)
+    conn.send('delete', x=723, y=200)
+    time.sleep(seconds / 2)
+    with conn.lock:
+        decoder = conn.decoder
+        print('frame {}, {} bots, {} keyframes, {} deltas, {} bytes ({:0.0f} bytes/message)'.format(
+            decoder.frame, len(decoder.state), decoder.keyframes, decoder.deltas, conn.bytes_received,
+            conn.bytes_received / max(decoder.keyframes + decoder.deltas, 1)))
+    conn.close()
+
+
+def run_window(conn: ViewerConnection) -> None:
+    import arcade
+
+    class ViewerWindow(arcade.Window):
+        def __init__(self):
+            super().__init__(800, 600, 'crowd viewer')
+            self.click_mode = 'goal'
+            self.kinds = utl.Cycler(KIND_NAMES)
+            self.clicked_id: Optional[int] = None
+
+        def on_draw(self):
+            arcade.start_render()
+            by_kind = {}
+            for kind, x, y, angle in conn.bots().values():
+                by_kind.setdefault(kind, []).append((x, y))
+            for kind, points in by_kind.items():
+                arcade.draw_points(points, KIND_COLORS[KIND_NAMES[kind]], 10)
+            if not conn.connected:
+                arcade.draw_text('disconnected', 10, 580, arcade.color.WHITE, 12)
+
+        def on_key_press(self, symbol: int, modifiers: int):
+            if symbol == arcade.key.G:
+                self.click_mode = 'goal_reverse' if modifiers & arcade.key.MOD_SHIFT else 'goal'
+            elif symbol == arcade.key.A:
+                self.click_mode = 'add'
+                if modifiers & arcade.key.MOD_SHIFT:
+                    self.kinds.next()
+                print('Current Bot add kind:', self.kinds.get())
+            elif symbol == arcade.key.D:
+                self.click_mode = 'delete'
+            elif symbol == arcade.key.M:
+                self.click_mode = 'move'
+            elif symbol == arcade.key.ESCAPE:
+                conn.close()
+                self.close()
+            print('Mouse Click Mode:', self.click_mode)
+
+        def on_mouse_press(self, x: float, y: float, button: int, modifiers: int):
+            if self.click_mode in ('goal', 'goal_reverse'):
+                conn.send('goal', x=x, y=y, reverse=self.click_mode == 'goal_reverse')
+            elif self.click_mode == 'add':
+                conn.send('add', kind=self.kinds.get(), x=x, y=y)
+            elif self.click_mode == 'delete':
+                conn.send('delete', x=x, y=y)
+            elif self.click_mode == 'move':
+                self.clicked_id = None
+                for bot_id, (kind, bx, by, angle) in conn.bots().items():
+                    if abs(bx - x) <= 5 and abs(by - y) <= 5:
+                        self.clicked_id = bot_id
+                        break
+
+        def on_mouse_drag(self, x: float, y: float, dx: float, dy: float, buttons: int, modifiers: int):
+            if self.click_mode == 'move' and self.clicked_id is not None:
+                conn.send('move', id=self.clicked_id, x=x, y=y)
+
+    ViewerWindow()
+    arcade.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Remote viewer for crowd.server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--stand-in', action='store_true', help='no window: decode the stream and report on it')
+    parser.add_argument('--seconds', type=float, default=4.0, help='how long the stand-in viewer runs')
+    args = parser.parse_args()
+
+    conn = ViewerConnection(args.host, args.port)
+    if args.stand_in:
+        run_stand_in(conn, args.seconds)
+    else:
+        run_window(conn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""The crowd world without a window: the bots, their ids and the default starting scenario.
+
+Used wherever the simulation runs headless (e.g. server.py). MyGame in crowd_sandbox builds the same scenario with
+populate_default().
+"""
+import random
+from typing import Dict, List, Optional, Tuple
+
+import arcade
+from arcade.utils import _Vec2
+
+from common.flowfield import FlowFieldCache
+from common.pool import BotPool
+from common.spatial import attach_grid
+from crowd import bots
+
+
+def populate_default(world) -> None:
+    """Add the standard starting bots to `world` (anything with `bots` and `add_bot()`, e.g. World or MyGame)"""
+    goal = _Vec2(700, 300)
+    for x in range(50, 150, 25):
+        for y in range(50, 550, 25):
+            b = bots.Bot(x, y, world.bots, arcade.color.RED)
+            b.set_goal(goal)
+            world.add_bot(b)
+    world.bots[9].angle = 355
+
+    world.add_bot(bots.OctWalkBot(400, 300, world.bots, arcade.color.YELLOW))
+    world.add_bot(bots.RunAwayBot(500, 350, world.bots, arcade.color.PURPLE))
+    world.add_bot(bots.RunAwayBot(475, 340, world.bots, arcade.color.PURPLE))
+
+    for x in range(550, 650, 25):
+        for y in range(450, 550, 25):
+            world.add_bot(bots.RandomWalkBot(x, y, world.bots, arcade.color.GREEN))
+
+    for x in (500, 600, 625, 650, 700):
+        b = bots.BounceBot(x, 300, world.bots, arcade.color.BLUE)
+        b.angle = 180
+        world.add_bot(b)
+
+    for y in range(200, 400, 20):
+        world.add_bot(bots.StationaryBot(723, y, world.bots, arcade.color.DARK_GRAY))
+
+
+SCENARIO_KINDS = ('Bot', 'OctWalkBot', 'RandomWalkBot', 'BounceBot', 'RunAwayBot', 'StationaryBot')
+
+
+def random_states(width: float, height: float, count: int, seed: int) -> List[tuple]:
+    """`count` bots of mixed kinds as Bot.get_state() tuples, on distinct 20px cells so none start overlapping"""
+    rng = random.Random(seed)
+    cells = [(x, y) for x in range(10, int(width) - 10, 20) for y in range(10, int(height) - 10, 20)]
+    if count > len(cells):
+        raise ValueError(f'{count} bots do not fit in a {width}x{height} world')
+    states = []
+    for bot_id, (x, y) in enumerate(rng.sample(cells, count)):
+        kind = rng.choice(SCENARIO_KINDS)
+        states.append((kind, bot_id, float(x), float(y), float(rng.choice(range(0, 360, 45))), {}))
+    return states
+
+
+def default_states() -> List[tuple]:
+    """The default scenario as Bot.get_state() tuples"""
+    world = World()
+    populate_default(world)
+    return [b.get_state() for b in world.bots]
+
+
+def restore_states(pool: BotPool, states: Dict[int, tuple]) -> None:
+    """Make pool's world hold exactly the bots of id -> Bot.get_state(), in that order (e.g. from a RewindBuffer).
+
+    Bots still in the world keep their object and whatever isn't part of get_state() (a Bot's flow field); the rest
+    come from the pool."""
+    existing = {b.id: b for b in pool.bots if b.alive}
+    ordered = []
+    for bot_id, (kind, _, x, y, angle, fields) in states.items():
+        b = existing.get(bot_id)
+        if b is None or type(b).__name__ != kind:
+            b = pool.acquire(bots.KINDS[kind], x, y, bots.KIND_COLORS[kind])
+            b.id = bot_id
+        b.center_x = x
+        b.center_y = y
+        b.angle = angle
+        for name, value in fields.items():
+            setattr(b, name, value)
+        ordered.append(b)
+    pool.replace(ordered)
+
+
+def changes_since(sprites, latest: Dict[int, tuple]) -> Tuple[Dict[int, tuple], List[int]]:
+    """What changed since `latest` (id -> Bot.get_state(), e.g. RewindBuffer.latest), for RewindBuffer.record_changes():
+    the states of the bots flagged `changed` (clearing the flags) and the ids of the bots that left. Costs a flag check
+    per bot instead of a get_state() per bot."""
+    alive = [b for b in sprites if b.alive]
+    flagged = [b for b in alive if b.changed]
+    for b in flagged:
+        b.changed = False
+    changed = {b.id: b.get_state() for b in flagged}
+    removed = []
+    if len(latest) + sum(bot_id not in latest for bot_id in changed) != len(alive):  # some bots left
+        ids = {b.id for b in alive}
+        removed = [bot_id for bot_id in latest if bot_id not in ids]
+    return changed, removed
+
+
+def static_obstacles(sprites) -> list:
+    """(left, bottom, right, top) of every StationaryBot, for FlowFieldCache.set_obstacles()"""
+    return [(b.left, b.bottom, b.right, b.top) for b in sprites if type(b) is bots.StationaryBot and b.alive]
+
+
+def goal_flow(navigator: Optional[FlowFieldCache], sprites, x: float, y: float):
+    """Flow field to (x, y) around the current obstacles, or None when flow field navigation is off"""
+    if navigator is None:
+        return None
+    navigator.set_obstacles(static_obstacles(sprites))
+    return navigator.get(x, y)
+
+
+class World:
+    def __init__(self):
+        self.bots = arcade.SpriteList()
+        self.pool = BotPool(self.bots)
+        self.events = bots.contact_events(self.bots)
+        self.grid = attach_grid(self.bots)  # FlockBots' neighbours, rebuilt every step()
+        self.next_id = 0
+        self.frame = 0
+        self.navigator: Optional[FlowFieldCache] = None
+
+    @classmethod
+    def from_states(cls, states) -> 'World':
+        """World holding the bots of Bot.get_state() tuples (keeping their ids)"""
+        world = cls()
+        for state in states:
+            world.bots.append(bots.from_state(state, world.bots))
+        world.next_id = max((state[1] for state in states), default=-1) + 1
+        return world
+
+    def add_bot(self, b: bots.Bot) -> None:
+        """Give the bot a unique id and add it to the world"""
+        b.id = self.next_id
+        self.next_id += 1
+        self.bots.append(b)
+
+    def spawn_bots(self, kind: str, positions) -> list:
+        """Batched add of (possibly recycled) bots of the given kind name, each with a new unique id"""
+        spawned = self.pool.spawn(bots.KINDS[kind], bots.KIND_COLORS[kind], positions)
+        for b in spawned:
+            b.id = self.next_id
+            self.next_id += 1
+        return spawned
+
+    def add_states(self, states) -> list:
+        """Batched add of the bots of Bot.get_state() tuples, keeping their ids (dead pooled bots are reused)"""
+        added = []
+        for kind, bot_id, x, y, angle, fields in states:
+            b = self.pool.acquire(bots.KINDS[kind], x, y, bots.KIND_COLORS[kind])
+            b.id = bot_id
+            b.angle = angle
+            for name, value in fields.items():
+                setattr(b, name, value)
+            self.bots.append(b)
+            added.append(b)
+            self.next_id = max(self.next_id, bot_id + 1)
+        return added
+
+    def despawn(self, bot_ids) -> None:
+        """Remove the bots with these ids (they leave the world at the start of the next step)"""
+        wanted = set(bot_ids)
+        self.pool.despawn([b for b in self.bots if b.id in wanted])
+
+    def bots_at(self, x: float, y: float) -> list:
+        return [b for b in arcade.get_sprites_at_point((x, y), self.bots) if b.alive]
+
+    def find(self, bot_id: int):
+        for b in self.bots:
+            if b.id == bot_id and b.alive:
+                return b
+        return None
+
+    def set_goal(self, x: float, y: float, reverse: bool = False) -> None:
+        """Point all plain Bots at (x, y), or directly away from it"""
+        goal = _Vec2(x, y)
+        flow = None if reverse else goal_flow(self.navigator, self.bots, x, y)
+        for b in self.bots:
+            if type(b) is bots.Bot:
+                b.set_goal(goal, flow)
+                if reverse:
+                    b.angle += 180
+
+    def restore(self, frame: int, states: Dict[int, tuple]) -> None:
+        """Go back (or forward) to `frame`, holding the bots of id -> Bot.get_state() (see common.rewind)"""
+        restore_states(self.pool, states)
+        self.events.reset()  # last frame's contacts were those of the frame left behind
+        self.next_id = max(self.next_id, max(states, default=-1) + 1)  # ids are never handed out twice
+        self.frame = frame
+
+    def step(self) -> None:
+        self.pool.compact()
+        self.grid.rebuild(self.bots)
+        self.bots.update()
+        self.events.end_frame()  # reactions to this frame's blocked moves
+        self.frame += 1
@@ -1,20 +1,28 @@
 """Various Bot implementations, each Bot following its own distinct logic"""
+import itertools
 import math
-import random
 import asyncio
 
 import arcade
 from arcade.utils import _Vec2
 
-from common import utl
+from common import collision, streams, utl
+from common.contacts import END, ContactEvents, events_of
+from common.pool import remove_sprite
+
+_ids = itertools.count()
 
 
 class Bot(arcade.Sprite):
     """Simple bot that moves in the direction of its given angle"""
+    events: ContactEvents  # blocked moves in this Bot's world, dispatched by the app once per frame (contact_events())
+
     def __init__(self, x, y, bots, color):
         super().__init__()
+        self.id = next(_ids)
         self.debug = False
         self.bots = bots
+        self.events = contact_events(bots)
         self.center_x = x
         self.center_y = y
         self.angle = 0.0
@@ -48,29 +56,24 @@ class Bot(arcade.Sprite):
         self.center_x = self.orig_x
         self.center_y = self.orig_y
 
+    def kill(self):
+        """Remove from the world (see common.pool.remove_sprite)"""
+        remove_sprite(self)
+
+    def collides(self) -> bool:
+        """Does this Bot currently overlap any other Bot? Reports the contact to self.events when it does."""
+        other = collision.first_collision(self, self.bots)
+        if other is None:
+            return False
+        self.events.hit(self, other)
+        return True
+
     def update(self):
         super().update()
         self.save_pos()
         self.step_forward(self.speed)
-        overlaps = self.collides_with_list(self.bots)
-        if len(overlaps) > 0:  # if movement would have this Sprite overlap another Sprite, cancel movement
+        if self.collides():  # if movement would have this Sprite overlap another Sprite, cancel movement
             self.restore_pos()
-            self.on_collided()
-
-    def on_collided(self):
-        pass
-
-
-async def is_true(predicate):
-    """utility coroutine that blocks until the given predicate evaluates to true, returning the argument."""
-    try:
-        while not predicate():
-            await asyncio.sleep(0)
-    except Exception as exc:
-        # Try to make exception more obvious.
-        # Very easy for a typo in a predicate to not generate a visible error (probably because I don't
-        # understand coroutines/Tasks fully yet).
-        print('ERROR! Exception in is_true:', exc)
 
 
 class AsyncBot(Bot):
@@ -84,6 +87,11 @@ class AsyncBot(Bot):
         while self.frames < end_at_frame:
             await asyncio.sleep(0)
 
+    def kill(self):
+        """Remove from the world and cancel this bot's task"""
+        self.task.cancel()
+        super().kill()
+
     def update(self):
         super().update()
         self.frames += 1
@@ -105,28 +113,43 @@ class OctWalkBot(AsyncBot):
 
 class RandomWalkBot(AsyncBot):
     """Bot walks in random directions for random lengths of time"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.walks = 0  # turns so far: the counter of this bot's random stream (see common.streams)
+
     async def async_update(self):
         while True:
-            self.angle = random.randint(0, 360)
-            await self.until_frames_elapsed(random.randint(10, 20))
+            duration = streams.randint(self.id, self.walks, 10, 20)
+            self.angle = streams.randint(self.id, self.walks, 0, 360, draw=1)
+            self.walks += 1
+            # crowd.bots' RandomWalkBot turns again on the duration + 1st frame after a turn, and so must this one for
+            # the same seed to give the same walks
+            await self.until_frames_elapsed(duration + 1)
 
 
 class BounceBot(Bot):
     """Bot that reverses direction with it touches another Bot"""
-    def on_collided(self):
-        self.angle += 180
+    @staticmethod
+    def on_contacts(events) -> None:
+        for e in events:
+            if e.kind != END:
+                e.bot.angle += 180
 
 
 class RunAwayBot(AsyncBot):
     """Moves slowly. When it gets bumped, it runs away quickly then stops. After a time it moves again."""
+    def __init__(self, x, y, bots, color):
+        super().__init__(x, y, bots, color)
+        self.bumped = asyncio.Event()  # set by the contact events, the task sleeps on it instead of polling
+
     async def async_update(self):
         self.angle = 180
-        self.collided = False
+        self.bumped.clear()
         while True:
             # normal
             self.speed = 1.0
-            await is_true(lambda: self.collided)
-            self.collided = False
+            await self.bumped.wait()
+            self.bumped.clear()
 
             # bumped
             self.speed = 5.0
@@ -138,7 +161,37 @@ class RunAwayBot(AsyncBot):
             self.angle += 180
             await self.until_frames_elapsed(60)
 
-    def on_collided(self):
-        self.collided = True
+    @staticmethod
+    def on_contacts(events) -> None:
+        for e in events:
+            if e.kind != END:
+                e.bot.bumped.set()
+
+
+def subscribe_reactions(events: ContactEvents) -> ContactEvents:
+    """Subscribe the kinds that react to being blocked"""
+    for cls in (BounceBot, RunAwayBot):
+        events.subscribe(cls, cls.on_contacts)
+    return events
+
+
+def contact_events(bots) -> ContactEvents:
+    """The ContactEvents of the world whose bot list is `bots` (see common.contacts.events_of())"""
+    return events_of(bots, subscribe_reactions)
+
+
+KINDS = {cls.__name__: cls for cls in (Bot, StationaryBot, OctWalkBot, RandomWalkBot, BounceBot, RunAwayBot)}
+
 
+def from_state(state: tuple, bots, color) -> Bot:
+    """Bot from a crowd.bots Bot.get_state() tuple (behaviour fields this engine's bots don't have are ignored).
 
+    AsyncBots start their task here, so call this with the event loop running."""
+    kind, bot_id, x, y, angle, fields = state
+    b = KINDS[kind](x, y, bots, color)
+    b.id = bot_id
+    b.angle = angle
+    for name, value in fields.items():
+        if hasattr(b, name):
+            setattr(b, name, value)
+    return b
@@ -16,14 +16,18 @@ from arcade.utils import _Vec2
 import pyglet
 
 from crowd_async import bots
+from crowd.bots import KIND_COLORS
 from common.fpsscanner import FpsScanner
-from common import utl
+from common import streams, utl
 from common.fpscounter import FpsCounter
+from common.hitch import HitchDetector, LoopLagMonitor
+from common.sampler import SamplingProfiler
 from common.timer import Timer
 
 
 class MyGame(arcade.Window):
-    def __init__(self):
+    def __init__(self, width: int = 800, height: int = 600, fps_window: int = 120, sleep: Optional[float] = None,
+                 states: Optional[list] = None, hitch_log: Optional[str] = None):
         self.times_init = []
         self.times_draw = []
         self.times_update = []
@@ -33,15 +37,18 @@ class MyGame(arcade.Window):
 
         with Timer() as init_timer:
             self.cnt = 0
-            super().__init__(800, 600, sys.argv[0])  # update_rate=1/60
+            super().__init__(width, height, sys.argv[0])  # update_rate=1/60
             self.paused = False
             self.frame_advance = False
-            self.sleep: Optional[float] = None
+            self.sleep: Optional[float] = sleep
             self.click_mode = 'goal'
             self.clicked_bot = None
             self.scanner = FpsScanner()
-            self.fps = FpsCounter(120)
+            self.fps = FpsCounter(fps_window)
+            self.profiler = SamplingProfiler()
+            self.hitches = HitchDetector(log_path=hitch_log)
             self.bots = arcade.SpriteList()
+            self.events = bots.contact_events(self.bots)
             self.bot_factories = utl.Cycler((
                 (arcade.color.RED, bots.Bot),
                 (arcade.color.DARK_GRAY, bots.StationaryBot),
@@ -51,37 +58,42 @@ class MyGame(arcade.Window):
                 (arcade.color.PURPLE, bots.RunAwayBot),
             ))
 
-            goal = _Vec2(700, 300)
-            seq = 0
-            for x in range(50, 150, 25):
-                for y in range(50, 550, 25):
-                    b = bots.Bot(x, y, self.bots, arcade.color.RED)
-                    b.id = seq
-                    seq += 1
-                    b.set_goal(goal)
-                    self.bots.append(b)
-            self.bots[9].angle = 355
-
-            self.bots.append(bots.OctWalkBot(400, 300, self.bots, arcade.color.YELLOW))
-            self.bots.append(bots.RunAwayBot(500, 350, self.bots, arcade.color.PURPLE))
-            self.bots.append(bots.RunAwayBot(475, 340, self.bots, arcade.color.PURPLE))
-
-            for x in range(550, 650, 25):
-                for y in range(450, 550, 25):
-                    self.bots.append(bots.RandomWalkBot(x, y, self.bots, arcade.color.GREEN))
-
-            for x in (500, 600, 625, 650, 700):
-                b = bots.BounceBot(x, 300, self.bots, arcade.color.BLUE)
-                b.angle = 180
-                self.bots.append(b)
-
-            for y in range(200, 400, 20):
-                self.bots.append(bots.StationaryBot(723, y, self.bots, arcade.color.DARK_GRAY))
+            if states is None:
+                self.populate_default()
+            else:  # Bot.get_state() tuples, e.g. crowd.world.random_states()
+                for state in states:
+                    self.bots.append(bots.from_state(state, self.bots, KIND_COLORS[state[0]]))
 
             print(f'There are {len(self.bots)} starting Bots')
 
         self.times_init.append(init_timer.last_elapsed)
 
+    def populate_default(self) -> None:
+        """The standard starting bots"""
+        goal = _Vec2(700, 300)
+        for x in range(50, 150, 25):
+            for y in range(50, 550, 25):
+                b = bots.Bot(x, y, self.bots, arcade.color.RED)
+                b.set_goal(goal)
+                self.bots.append(b)
+        self.bots[9].angle = 355
+
+        self.bots.append(bots.OctWalkBot(400, 300, self.bots, arcade.color.YELLOW))
+        self.bots.append(bots.RunAwayBot(500, 350, self.bots, arcade.color.PURPLE))
+        self.bots.append(bots.RunAwayBot(475, 340, self.bots, arcade.color.PURPLE))
+
+        for x in range(550, 650, 25):
+            for y in range(450, 550, 25):
+                self.bots.append(bots.RandomWalkBot(x, y, self.bots, arcade.color.GREEN))
+
+        for x in (500, 600, 625, 650, 700):
+            b = bots.BounceBot(x, 300, self.bots, arcade.color.BLUE)
+            b.angle = 180
+            self.bots.append(b)
+
+        for y in range(200, 400, 20):
+            self.bots.append(bots.StationaryBot(723, y, self.bots, arcade.color.DARK_GRAY))
+
     def on_draw(self):
         with Timer(logger=None) as draw_timer:
             arcade.start_render()
@@ -93,14 +105,18 @@ class MyGame(arcade.Window):
         with Timer(logger=None) as update_timer:
             self.fps.tick()
             if self.fps.is_ready():
-                print('FPS', self.fps.get_fps())
+                print('FPS', self.fps.get_fps(), 'bots', len(self.bots), 'tasks', len(asyncio.all_tasks()))
+            slept = None  # the preset sleep, only on frames that ran (a paused frame doesn't sleep)
             if not self.paused or self.frame_advance:
                 if self.frame_advance:
                     self.frame_advance = False
                 if self.sleep is not None:
                     time.sleep(self.sleep)
+                    slept = self.sleep
                 self.scanner.update()
                 self.bots.update()
+                self.events.end_frame()  # reactions to this frame's blocked moves, one batch per bot class
+            self.hitches.end_frame(len(self.bots), sleep=slept)
         self.times_update.append(update_timer.last_elapsed)
 
     def on_key_press(self, symbol: int, modifiers: int):
@@ -118,6 +134,9 @@ class MyGame(arcade.Window):
             self.sleep = 0.1
         elif symbol == arcade.key.KEY_3:
             self.sleep = 1.0
+        # sampling profiler (writes collapsed stacks for a flamegraph when toggled off)
+        elif symbol == arcade.key.F:
+            self.profiler.toggle()
         # click mode
         elif symbol == arcade.key.A:
             self.click_mode = 'add'
@@ -154,6 +173,10 @@ class MyGame(arcade.Window):
         self._times_summary('draw  ', self.times_draw)
         self._times_summary('update', self.times_update)
         print('total', self.total_timer.stop())
+        if self.profiler.running:
+            self.profiler.toggle()
+        print('hitches', self.hitches.hitches)
+        self.hitches.close()
 
     def on_mouse_press(self, x: float, y: float, button: int, modifiers: int):
         super().on_mouse_press(x, y, button, modifiers)
@@ -172,13 +195,12 @@ class MyGame(arcade.Window):
                 # add new bot
                 clr, bot_factory = self.bot_factories.get()
                 b = bot_factory(x, y, self.bots, clr)
-                b.id = 999999
                 self.bots.append(b)
             elif self.click_mode == 'delete':
                 touched = arcade.get_sprites_at_point((x, y), self.bots)
                 print('Removing', len(touched), 'Bots')
                 for b in touched:
-                    self.bots.remove(b)
+                    b.kill()  # also cancels an AsyncBot's task
             elif self.click_mode == 'move':
                 touched = arcade.get_sprites_at_point((x, y), self.bots)
                 if len(touched) > 0:
@@ -217,13 +239,17 @@ async def arcade_event_loop():
             print('event loop', fps.get_fps())
 
 
-async def run_event_loop():
-    game = MyGame()
+async def run_event_loop(make_game=MyGame):
+    game = make_game()  # constructed inside the running loop: AsyncBots start their tasks in __init__
     game.set_location(600, 50)
-    loop = asyncio.create_task(arcade_event_loop())
-    await loop
+    lag_monitor = asyncio.create_task(LoopLagMonitor(game.hitches).run())
+    try:
+        await arcade_event_loop()
+    finally:
+        lag_monitor.cancel()
 
 
 if __name__ == '__main__':
     random.seed(12345)  # repeatable randomness
+    streams.seed(12345)
     asyncio.run(run_event_loop())
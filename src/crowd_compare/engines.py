@@ -0,0 +1,179 @@
+"""Every crowd engine behind the same headless interface, built from the same Bot.get_state() scenario.
+
+An engine is constructed with (states, seed, workers) and has step() (one frame), snapshot() (every bot as
+(id, kind, x, y, angle)) and close(). Between frames, spawn() adds bots from more state tuples and delete() removes
+bots by id, releasing whatever task or thread a bot had; workers() counts the tasks or threads the engine runs on,
+to spot ones that outlive their bots (see soak.py). Each engine seeds the global random module and common.streams
+itself, as its sandbox does, so two runs of one engine on one scenario draw the same random numbers.
+
+    crowd         crowd.world.World, bots updated in list order
+    crowd_thread  one thread per bot, released once per frame by a FrameGate under a global lock
+    crowd_async   one asyncio task per AsyncBot, resumed once between frames
+    crowd_interp  stdlib kernel on `workers` world strips (subinterpreters on 3.12+, threads otherwise)
+
+Engines raise KeyError for bot kinds they don't implement (FlockBot is only in crowd).
+"""
+import asyncio
+import random
+import threading
+from typing import Dict, List, Tuple
+
+import arcade
+
+from common import interp, streams
+from common.celllocks import GlobalLock
+from common.framegate import FrameGate
+from crowd.bots import KIND_COLORS
+from crowd.world import World
+
+Snapshot = List[Tuple[int, str, float, float, float]]
+
+
+class CrowdEngine:
+    def __init__(self, states: List[tuple], seed: int, workers: int = 1):
+        random.seed(seed)
+        streams.seed(seed)
+        self.world = World.from_states(states)
+
+    def step(self) -> None:
+        self.world.step()
+
+    def snapshot(self) -> Snapshot:
+        return [(b.id, type(b).__name__, b.center_x, b.center_y, b.angle) for b in self.world.bots if b.alive]
+
+    def spawn(self, states: List[tuple]) -> None:
+        self.world.add_states(states)
+
+    def delete(self, bot_ids) -> None:
+        self.world.despawn(bot_ids)
+
+    def workers(self) -> int:
+        return 0
+
+    def close(self) -> None:
+        pass
+
+
+class ThreadEngine:
+    """Also stands in for the crowd_thread app: its bots only need app.gate and app.bot_locks"""
+    def __init__(self, states: List[tuple], seed: int, workers: int = 1):
+        from crowd_thread import bots
+        random.seed(seed)
+        streams.seed(seed)
+        self.gate = FrameGate()
+        self.bot_locks = GlobalLock()
+        self.bots = arcade.SpriteList()
+        self.killed = []  # bots whose threads exit during the next frame
+        self.spawn(states)
+
+    def step(self) -> None:
+        self.gate.run_frame()
+        for b in self.killed:
+            b.join()
+        self.killed = []
+
+    def snapshot(self) -> Snapshot:
+        return [(b.id, type(b).__name__, b.center_x, b.center_y, b.angle) for b in self.bots]
+
+    def spawn(self, states: List[tuple]) -> None:
+        from crowd_thread import bots
+        for state in states:
+            self.bots.append(bots.from_state(state, self.bots, KIND_COLORS[state[0]], self))
+
+    def delete(self, bot_ids) -> None:
+        wanted = set(bot_ids)
+        for b in [b for b in self.bots if b.id in wanted]:
+            b.kill()
+            self.killed.append(b)
+
+    def workers(self) -> int:
+        return threading.active_count()
+
+    def close(self) -> None:
+        self.delete([b.id for b in self.bots])
+        self.step()  # let every thread see it was killed
+
+
+class AsyncEngine:
+    """The bots' tasks run on a private event loop, advanced one frame per step() as arcade_event_loop() does"""
+    def __init__(self, states: List[tuple], seed: int, workers: int = 1):
+        from crowd_async import bots
+        random.seed(seed)
+        streams.seed(seed)
+        self.loop = asyncio.new_event_loop()
+        self.bots = arcade.SpriteList()
+        self.events = bots.contact_events(self.bots)
+        self.loop.run_until_complete(self._populate(states))
+
+    async def _populate(self, states: List[tuple]) -> None:
+        from crowd_async import bots
+        for state in states:
+            self.bots.append(bots.from_state(state, self.bots, KIND_COLORS[state[0]]))
+        await asyncio.sleep(0)  # the tasks' first run, before the first frame
+
+    def step(self) -> None:
+        # as in the app, the tasks get their turn between frames, after the last frame was drawn (snapshot())
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.bots.update()
+        self.events.end_frame()
+
+    def snapshot(self) -> Snapshot:
+        return [(b.id, type(b).__name__, b.center_x, b.center_y, b.angle) for b in self.bots]
+
+    def spawn(self, states: List[tuple]) -> None:
+        self.loop.run_until_complete(self._populate(states))
+
+    def delete(self, bot_ids) -> None:
+        wanted = set(bot_ids)
+        for b in [b for b in self.bots if b.id in wanted]:
+            b.kill()
+
+    def workers(self) -> int:
+        return len(asyncio.all_tasks(self.loop))
+
+    def close(self) -> None:
+        self.delete([b.id for b in self.bots])
+        tasks = asyncio.all_tasks(self.loop)
+        if tasks:  # gather() of nothing would make its future on another loop
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+
+
+class InterpEngine:
+    def __init__(self, states: List[tuple], seed: int, workers: int = 1):
+        from crowd_interp import kernel
+        from crowd_interp.crowd_sandbox import PartitionedWorld
+        self.kernel = kernel
+        width = max((s[2] for s in states), default=0) + 10
+        executor = 'interp' if interp.available() else 'thread'
+        if workers == 1:
+            executor = 'inline'
+        self.world = PartitionedWorld([kernel.from_state(s) for s in states], width, workers, executor, seed=seed)
+
+    def step(self) -> None:
+        self.world.step()
+
+    def snapshot(self) -> Snapshot:
+        k = self.kernel
+        return [(r[k.ID], k.KIND_NAMES[r[k.KIND]], r[k.X], r[k.Y], r[k.ANGLE]) for r in self.world.records]
+
+    def spawn(self, states: List[tuple]) -> None:
+        self.world.records.extend(self.kernel.from_state(s) for s in states)
+
+    def delete(self, bot_ids) -> None:
+        wanted = set(bot_ids)
+        self.world.records = [r for r in self.world.records if r[self.kernel.ID] not in wanted]
+
+    def workers(self) -> int:
+        return len(self.world.workers)
+
+    def close(self) -> None:
+        self.world.close()
+
+
+ENGINES: Dict[str, type] = {
+    'crowd': CrowdEngine,
+    'crowd_thread': ThreadEngine,
+    'crowd_async': AsyncEngine,
+    'crowd_interp': InterpEngine,
+}
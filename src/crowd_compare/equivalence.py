@@ -0,0 +1,192 @@
+"""
+SUMMARY: Do the crowd engines agree? Runs one seeded scenario headless on every engine and diffs the trajectories.
+
+crowd, crowd_thread, crowd_async and crowd_interp each implement the same bots their own way (see engines.py). This
+steps each of them through the same scenario for N frames, records every bot's position and angle after every frame,
+and compares each engine against the first one: the first frame and bot where they differ by more than --tolerance,
+and how many bots differ by the last frame. Next to that it prints each engine's frames/s (stepping only, recording
+excluded), so an optimization of one engine can be checked for correctness and measured in one go.
+
+Random numbers come from per-bot streams (common/streams.py), so they don't depend on update order. Expect
+differences where the update order decides who gets blocked (threads, and the kernel's strips, which see each other's
+bots one frame late) and where the async bots' state machines differ from the synchronous ones. Use --kinds to leave
+kinds out of the scenario.
+
+    cd src/
+    python -m crowd_compare.equivalence
+    python -m crowd_compare.equivalence --scenario random --bots 300 --frames 200 --kinds Bot,BounceBot,OctWalkBot
+    python -m crowd_compare.equivalence --engines crowd,crowd_interp --workers 1 --record /tmp/runs
+"""
+import argparse
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from common.trajectory import TrajectoryWriter
+from crowd.world import SCENARIO_KINDS, default_states, random_states
+from crowd_compare.engines import ENGINES
+
+
+@dataclass
+class Run:
+    engine: str
+    ids: List[np.ndarray] = field(default_factory=list)  # per frame, sorted
+    xya: List[np.ndarray] = field(default_factory=list)  # per frame, (bots, 3) x, y, angle in the order of ids
+    kinds: Dict[int, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def frames(self) -> int:
+        return len(self.ids)
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    def add(self, snapshot) -> None:
+        snapshot = sorted(snapshot)
+        self.ids.append(np.array([s[0] for s in snapshot], dtype=np.int64))
+        self.xya.append(np.array([s[2:] for s in snapshot], dtype=np.float64).reshape(-1, 3))
+        for bot_id, kind, *_ in snapshot:
+            self.kinds.setdefault(bot_id, kind)
+
+
+@dataclass
+class Divergence:
+    frame: int  # 1 based: the state after this many frames
+    bot_id: int
+    kind: str
+    expected: Optional[Tuple[float, float, float]]  # None: the bot is missing from that run
+    actual: Optional[Tuple[float, float, float]]
+    bots_at_frame: int  # how many bots differ at that frame
+    bots_at_end: int  # ... and at the last frame
+
+
+def run_engine(name: str, states: List[tuple], frames: int, seed: int, workers: int = 1,
+               record: Optional[str] = None) -> Run:
+    engine = ENGINES[name](states, seed, workers)
+    run = Run(name)
+    writer = TrajectoryWriter(os.path.join(record, name)) if record else None
+    try:
+        for _ in range(frames):
+            start = time.perf_counter()
+            engine.step()
+            run.elapsed += time.perf_counter() - start
+            snapshot = engine.snapshot()
+            run.add(snapshot)
+            if writer is not None:
+                writer.append([s[0] for s in snapshot], [writer.kind_of(s[1]) for s in snapshot],
+                              [s[2] for s in snapshot], [s[3] for s in snapshot], [s[4] for s in snapshot])
+    finally:
+        engine.close()
+        if writer is not None:
+            writer.close()
+    return run
+
+
+def differing(ids_a: np.ndarray, xya_a: np.ndarray, ids_b: np.ndarray, xya_b: np.ndarray,
+              tolerance: float) -> List[int]:
+    """Ids of the bots that are in only one frame, or whose position or angle (mod 360) differ by more than tolerance"""
+    common, ia, ib = np.intersect1d(ids_a, ids_b, assume_unique=True, return_indices=True)
+    a, b = xya_a[ia], xya_b[ib]
+    dpos = np.abs(a[:, :2] - b[:, :2]).max(axis=1) if len(common) else np.zeros(0)
+    dangle = np.abs((a[:, 2] - b[:, 2] + 180.0) % 360.0 - 180.0)
+    bad = set(common[(dpos > tolerance) | (dangle > tolerance)].tolist())
+    bad.update(np.setxor1d(ids_a, ids_b).tolist())
+    return sorted(bad)
+
+
+def compare_runs(reference: Run, other: Run, tolerance: float) -> Optional[Divergence]:
+    """First divergence of other from reference, or None when they agree on every frame"""
+    frames = min(reference.frames, other.frames)
+    first = None
+    for f in range(frames):
+        bad = differing(reference.ids[f], reference.xya[f], other.ids[f], other.xya[f], tolerance)
+        if bad:
+            first = (f, bad)
+            break
+    if first is None:
+        return None
+    f, bad = first
+    bot_id = bad[0]
+    last = frames - 1
+    at_end = differing(reference.ids[last], reference.xya[last], other.ids[last], other.xya[last], tolerance)
+
+    def state(run: Run):
+        i = np.searchsorted(run.ids[f], bot_id)
+        if i < len(run.ids[f]) and run.ids[f][i] == bot_id:
+            return tuple(float(v) for v in run.xya[f][i])
+        return None
+
+    kind = reference.kinds.get(bot_id) or other.kinds.get(bot_id, '?')
+    return Divergence(f + 1, bot_id, kind, state(reference), state(other), len(bad), len(at_end))
+
+
+def _fmt_state(s) -> str:
+    return 'missing' if s is None else '({:0.2f}, {:0.2f}, {:0.1f})'.format(*s)
+
+
+def print_report(runs: List[Run], divergences: Dict[str, Optional[Divergence]], bot_count: int) -> None:
+    reference = runs[0]
+    print('{:<13} {:>9} {:>8}  {}'.format('engine', 'frames/s', 'speedup', 'trajectories'))
+    for run in runs:
+        speedup = run.fps / reference.fps if reference.fps else 0.0
+        if run is reference:
+            verdict = 'reference'
+        elif divergences[run.engine] is None:
+            verdict = 'agree'
+        else:
+            d = divergences[run.engine]
+            verdict = f'diverge at frame {d.frame}, {d.bots_at_end}/{bot_count} bots differ at the end'
+        print('{:<13} {:>9.1f} {:>7.2f}x  {}'.format(run.engine, run.fps, speedup, verdict))
+    for run in runs[1:]:
+        d = divergences[run.engine]
+        if d is not None:
+            print(f'\n{run.engine}: first differs at frame {d.frame} in bot {d.bot_id} ({d.kind}), '
+                  f'{d.bots_at_frame} bots differ at that frame')
+            print(f'  {reference.engine:<13} x, y, angle = {_fmt_state(d.expected)}')
+            print(f'  {run.engine:<13} x, y, angle = {_fmt_state(d.actual)}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run one scenario on every crowd engine and diff the trajectories')
+    parser.add_argument('--engines', default=','.join(ENGINES),
+                        help='comma separated, the first is the reference. Any of: ' + ', '.join(ENGINES))
+    parser.add_argument('--scenario', choices=('default', 'random'), default='default')
+    parser.add_argument('--bots', type=int, default=200, help='bot count of the random scenario')
+    parser.add_argument('--kinds', default=','.join(SCENARIO_KINDS), help='bot kinds to keep in the scenario')
+    parser.add_argument('--width', type=float, default=800)
+    parser.add_argument('--height', type=float, default=600)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=12345)
+    parser.add_argument('--tolerance', type=float, default=1e-3, help='largest difference in x, y or angle')
+    parser.add_argument('--workers', type=int, default=2, help='world strips of crowd_interp')
+    parser.add_argument('--record', help='also record each engine into DIR/<engine> (see crowd.replay)')
+    args = parser.parse_args(argv)
+
+    engines = args.engines.split(',')
+    for name in engines:
+        if name not in ENGINES:
+            parser.error(f'unknown engine {name!r}')
+    if args.scenario == 'default':
+        states = default_states()
+    else:
+        states = random_states(args.width, args.height, args.bots, args.seed)
+    kinds = set(args.kinds.split(','))
+    states = [s for s in states if s[0] in kinds]
+
+    print(f'{len(states)} bots, {args.frames} frames, seed {args.seed}, tolerance {args.tolerance}')
+    runs = []
+    for name in engines:
+        runs.append(run_engine(name, states, args.frames, args.seed, args.workers, args.record))
+        print('  done', name, '{:0.2f}s'.format(runs[-1].elapsed))
+    print()
+    divergences = {run.engine: compare_runs(runs[0], run, args.tolerance) for run in runs[1:]}
+    print_report(runs, divergences, len(states))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Soak test: run an engine headless for a long time while bots are constantly spawned and deleted, and fail if memory
+or the number of tasks/threads keeps growing.
+
+Every frame `churn` random bots are deleted and each is replaced by a new bot of its kind (new id, random place), so
+the bot count and mix stay level, and so should the tasks/threads, while anything a deleted bot leaves behind (a task
+still running against a dead sprite, a thread parked in the FrameGate, pool or cache entries) accumulates. Every
+`snapshot_every` frames the traced memory (tracemalloc) and engine.workers() are sampled. The first sample is the
+baseline, taken once pools and caches have warmed up; the run fails when the last sample exceeds it by more than
+`max_growth` bytes or by any worker.
+
+Run it from the launcher, for hours if need be (--frames 0 runs until Ctrl-C):
+
+    cd src/
+    python -m crowd --engine async --headless --soak --frames 0 --churn 10
+"""
+import gc
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from crowd_compare.engines import ENGINES
+
+
+@dataclass
+class SoakResult:
+    frames: int = 0
+    spawned: int = 0
+    deleted: int = 0
+    samples: List[Tuple[int, int, int]] = field(default_factory=list)  # (frame, traced bytes, workers)
+    top_growth: List[str] = field(default_factory=list)  # biggest allocation increases since the baseline
+
+    @property
+    def memory_growth(self) -> int:
+        return self.samples[-1][1] - self.samples[0][1] if len(self.samples) > 1 else 0
+
+    @property
+    def worker_growth(self) -> int:
+        return self.samples[-1][2] - self.samples[0][2] if len(self.samples) > 1 else 0
+
+    def failures(self, max_growth: int) -> List[str]:
+        failures = []
+        if self.memory_growth > max_growth:
+            failures.append(f'traced memory grew by {self.memory_growth / 1024:0.0f} KiB '
+                            f'(limit {max_growth / 1024:0.0f} KiB)')
+        if self.worker_growth > 0:
+            failures.append(f'tasks/threads grew by {self.worker_growth}')
+        return failures
+
+
+def run_soak(engine_name: str, states: List[tuple], frames: int, churn: int = 5, snapshot_every: int = 500,
+             seed: int = 0, workers: int = 1, width: float = 800, height: float = 600,
+             report=print) -> SoakResult:
+    """Churn bots for `frames` frames (0: until Ctrl-C). See the module docstring."""
+    rng = random.Random(seed)
+    engine = ENGINES[engine_name](states, seed, workers)
+    live = {s[1]: s[0] for s in states}  # id -> kind
+    next_id = max(live, default=-1) + 1
+    result = SoakResult()
+    tracemalloc.start()
+    baseline: Optional[tracemalloc.Snapshot] = None
+    start = time.perf_counter()
+    try:
+        while frames <= 0 or result.frames < frames:
+            if churn and len(live) >= churn:
+                gone = rng.sample(sorted(live), churn)
+                engine.delete(gone)
+                result.deleted += churn
+                new = []
+                for bot_id in gone:
+                    kind = live.pop(bot_id)
+                    new.append((kind, next_id, rng.uniform(10, width - 10), rng.uniform(10, height - 10),
+                                float(rng.choice(range(0, 360, 45))), {}))
+                    live[next_id] = kind
+                    next_id += 1
+                engine.spawn(new)
+                result.spawned += churn
+            engine.step()
+            result.frames += 1
+            if result.frames % snapshot_every == 0:
+                gc.collect()
+                current, peak = tracemalloc.get_traced_memory()
+                result.samples.append((result.frames, current, engine.workers()))
+                if baseline is None:
+                    baseline = tracemalloc.take_snapshot()
+                report('frame {}: {:0.1f} MiB traced, {} tasks/threads, {} bots, {:0.0f}s'.format(
+                    result.frames, current / 2 ** 20, result.samples[-1][2], len(live),
+                    time.perf_counter() - start))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if baseline is not None and len(result.samples) > 1:
+            diff = tracemalloc.take_snapshot().compare_to(baseline, 'lineno')
+            result.top_growth = [str(stat) for stat in diff[:10] if stat.size_diff > 0]
+        tracemalloc.stop()
+        engine.close()
+    return result
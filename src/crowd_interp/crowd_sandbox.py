@@ -0,0 +1,224 @@
+"""
+SUMMARY: Crowd simulation with the world split into strips, each stepped in its own subinterpreter (Python 3.12+).
+
+Subinterpreters each have their own GIL, start in milliseconds and need no pickling: every frame the coordinator sends
+each strip a compact buffer of its bots plus the neighbouring bots within `halo` of its borders (kernel.pack_frame())
+over a pipe, and reads the stepped bots back. Bots that crossed into another strip simply get sent to that strip the
+next frame. Subinterpreters can't import arcade, so strips run the stdlib-only copy of the bot behaviour in kernel.py.
+
+The same worker loop runs on threads or child processes too (--executor), for comparison. `inline` steps the strips
+in this process, one after the other. --compare runs every executor, and the original crowd engine, on the same
+scenario and prints frames/s side by side.
+
+    cd src/
+    python3.12 -m crowd_interp.crowd_sandbox --partitions 4 --bots 1000
+    python3.12 -m crowd_interp.crowd_sandbox --compare --scenario default
+    python3.12 -m crowd_interp.crowd_sandbox --view
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from typing import List
+
+from common import interp, streams
+from crowd_interp import kernel, worker
+
+EXECUTORS = ('inline', 'thread', 'process', 'interp')
+
+INTERP_SCRIPT = '''
+import sys
+sys.path[:0] = {path!r}
+from crowd_interp import worker
+worker.serve({request_fd}, {reply_fd}, {partition}, {seed})
+'''
+
+
+class PartitionedWorld:
+    """Bots as kernel records, split into `partitions` vertical strips of a world `width` wide"""
+    def __init__(self, records: List[list], width: float, partitions: int, executor: str = 'interp',
+                 halo: float = 20.0, seed: int = 0):
+        if executor == 'interp' and not interp.available():
+            raise RuntimeError('the interp executor needs Python 3.12 or later')
+        self.records = records
+        self.partitions = partitions
+        self.strip_w = width / partitions
+        self.halo = halo
+        self.executor = executor
+        self.frame = 0
+        self.seed = seed
+        self.links = []  # (request write fd, reply read fd) per partition
+        self.workers = []  # (thread or process, interpreter id or None)
+        self.fds = []
+        if executor == 'inline':
+            return
+        for p in range(partitions):
+            request_r, request_w = os.pipe()
+            reply_r, reply_w = os.pipe()
+            self.fds += [request_r, request_w, reply_r, reply_w]
+            self.links.append((request_w, reply_r))
+            args = (request_r, reply_w, p, seed)
+            if executor == 'thread':
+                runner = threading.Thread(target=worker.serve, args=args, daemon=True)
+                runner.start()
+                self.workers.append((runner, None))
+            elif executor == 'process':
+                runner = multiprocessing.get_context('fork').Process(target=worker.serve, args=args, daemon=True)
+                runner.start()
+                self.workers.append((runner, None))
+            elif executor == 'interp':
+                script = INTERP_SCRIPT.format(path=sys.path, request_fd=request_r, reply_fd=reply_w, partition=p,
+                                              seed=seed)
+                interp_id, runner = interp.start(script)
+                self.workers.append((runner, interp_id))
+            else:
+                raise ValueError(f'unknown executor {executor!r}')
+
+    def strip_of(self, x: float) -> int:
+        return min(max(int(x // self.strip_w), 0), self.partitions - 1)
+
+    def split(self):
+        """Own bots and ghosts (copies of neighbours' bots within halo of the strip, as at the start of the frame)"""
+        own = [[] for _ in range(self.partitions)]
+        ghosts = [[] for _ in range(self.partitions)]
+        halo = self.halo
+        for r in self.records:
+            x = r[kernel.X]
+            p = self.strip_of(x)
+            own[p].append(r)
+            if p > 0 and x - p * self.strip_w < halo:
+                ghosts[p - 1].append(r[:])
+            if p < self.partitions - 1 and (p + 1) * self.strip_w - x < halo:
+                ghosts[p + 1].append(r[:])
+        return own, ghosts
+
+    def step(self) -> None:
+        own, ghosts = self.split()
+        if self.executor == 'inline':
+            for p in range(self.partitions):
+                kernel.step(own[p], ghosts[p], self.seed)
+            self.records = [r for strip in own for r in strip]
+        else:
+            for (request_w, _), strip_own, strip_ghosts in zip(self.links, own, ghosts):
+                interp.send_bytes(request_w, kernel.pack_frame(strip_own, strip_ghosts))
+            records = []
+            for _, reply_r in self.links:
+                records.extend(kernel.unpack(interp.recv_bytes(reply_r)))
+            self.records = records
+        self.frame += 1
+
+    def close(self) -> None:
+        for request_w, _ in self.links:
+            interp.send_bytes(request_w, b'')
+        for runner, interp_id in self.workers:
+            runner.join()
+            if interp_id is not None:
+                interp.destroy(interp_id)
+        for fd in self.fds:
+            os.close(fd)
+        self.links = []
+        self.workers = []
+        self.fds = []
+
+
+def scenario_states(name: str, width: float, height: float, count: int, seed: int) -> List[tuple]:
+    from crowd.world import default_states, random_states
+    if name == 'default':
+        return default_states()
+    return random_states(width, height, count, seed)
+
+
+def time_frames(step, frames: int) -> float:
+    """frames/s of calling step() `frames` times"""
+    start = time.perf_counter()
+    for _ in range(frames):
+        step()
+    return frames / (time.perf_counter() - start)
+
+
+def compare(states: List[tuple], width: float, partitions: int, frames: int, seed: int) -> None:
+    from crowd.world import World
+    random.seed(seed)
+    streams.seed(seed)
+    world = World.from_states(states)
+    results = [('crowd', 1, time_frames(world.step, frames))]
+    for executor in EXECUTORS:
+        if executor == 'interp' and not interp.available():
+            print('skipping interp: needs Python 3.12 or later')
+            continue
+        pw = PartitionedWorld([kernel.from_state(s) for s in states], width, partitions, executor, seed=seed)
+        try:
+            results.append((executor, partitions, time_frames(pw.step, frames)))
+        finally:
+            pw.close()
+    baseline = results[0][2]
+    print(f'{len(states)} bots, {frames} frames, {os.cpu_count()} CPUs')
+    print('{:<8} {:>10} {:>9} {:>8}'.format('engine', 'partitions', 'frames/s', 'speedup'))
+    for name, parts, fps in results:
+        print('{:<8} {:>10} {:>9.1f} {:>7.2f}x'.format(name, parts, fps, fps / baseline))
+
+
+def run_view(pw: PartitionedWorld, width: int, height: int) -> None:
+    import arcade
+    from crowd.bots import KIND_COLORS
+
+    class InterpWindow(arcade.Window):
+        def __init__(self):
+            super().__init__(width, height, f'crowd_interp ({pw.executor})')
+
+        def on_draw(self):
+            arcade.start_render()
+            for p in range(1, pw.partitions):
+                arcade.draw_line(p * pw.strip_w, 0, p * pw.strip_w, height, arcade.color.GRAY)
+            by_kind = {}
+            for r in pw.records:
+                by_kind.setdefault(r[kernel.KIND], []).append((r[kernel.X], r[kernel.Y]))
+            for kind, points in by_kind.items():
+                arcade.draw_points(points, KIND_COLORS[kernel.KIND_NAMES[kind]], 10)
+
+        def update(self, delta_time: float):
+            pw.step()
+
+        def on_key_press(self, symbol: int, modifiers: int):
+            if symbol == arcade.key.ESCAPE:
+                self.close()
+
+    InterpWindow()
+    arcade.run()
+    pw.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crowd simulation with world strips stepped in subinterpreters')
+    parser.add_argument('--executor', choices=EXECUTORS, default='interp' if interp.available() else 'thread')
+    parser.add_argument('--partitions', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--scenario', choices=('default', 'random'), default='random')
+    parser.add_argument('--bots', type=int, default=400, help='bot count of the random scenario')
+    parser.add_argument('--width', type=float, default=800)
+    parser.add_argument('--height', type=float, default=600)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=12345)
+    parser.add_argument('--compare', action='store_true', help='time every executor and the crowd engine')
+    parser.add_argument('--view', action='store_true', help='draw the world instead of running headless')
+    args = parser.parse_args()
+
+    states = scenario_states(args.scenario, args.width, args.height, args.bots, args.seed)
+    if args.compare:
+        compare(states, args.width, args.partitions, args.frames, args.seed)
+        return
+    pw = PartitionedWorld([kernel.from_state(s) for s in states], args.width, args.partitions, args.executor,
+                          seed=args.seed)
+    if args.view:
+        run_view(pw, int(args.width), int(args.height))
+        return
+    fps = time_frames(pw.step, args.frames)
+    pw.close()
+    print(f'{args.frames} frames of {len(states)} bots on {args.partitions} {args.executor} partitions: '
+          f'{fps:0.1f} frames/s')
+
+
+if __name__ == '__main__':
+    main()
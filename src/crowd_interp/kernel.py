@@ -0,0 +1,181 @@
+"""Bot behaviour on plain records, for running world partitions where arcade can't be imported.
+
+Subinterpreters only get extension modules that support them (arcade, pyglet and numpy don't), so this is the
+behaviour of the crowd.bots classes re-expressed with the stdlib only. A bot is a record list:
+
+    [id, kind, x, y, angle, a, b, c]
+
+where a, b and c are the per-kind counters (see from_state()). Records are packed into compact buffers with pack() to
+cross between interpreters or processes.
+"""
+import math
+import struct
+from typing import List, Tuple
+
+from common import streams
+
+KIND_NAMES = ('Bot', 'StationaryBot', 'OctWalkBot', 'RandomWalkBot', 'BounceBot', 'RunAwayBot')
+BOT, STATIONARY, OCT_WALK, RANDOM_WALK, BOUNCE, RUN_AWAY = range(len(KIND_NAMES))
+RUN_AWAY_STATES = ('normal', 'bumped', 'waiting')
+
+ID, KIND, X, Y, ANGLE, A, B, C = range(8)
+SIZE = 10.0  # all bots are 10x10 squares
+_HALF = SIZE / 2
+_OUTER = 2 * math.hypot(_HALF, _HALF)
+_INNER = 2 * _HALF
+
+_RECORD = struct.Struct('<IBdddiii')
+_COUNTS = struct.Struct('<II')
+
+
+def from_state(state: tuple) -> list:
+    """Record from crowd.bots Bot.get_state()"""
+    kind_name, bot_id, x, y, angle, fields = state
+    kind = KIND_NAMES.index(kind_name)
+    a = b = c = 0
+    if kind in (OCT_WALK, RANDOM_WALK):
+        a = fields.get('frame_count', 0)
+        b = fields.get('next_change_frame', 0)
+        c = fields.get('walks', 0)
+    elif kind == RUN_AWAY:
+        a = fields.get('frame_count', 0)
+        b = RUN_AWAY_STATES.index(fields.get('state', 'normal'))
+    return [bot_id, kind, x, y, angle, a, b, c]
+
+
+def pack(records) -> bytes:
+    return b''.join(_RECORD.pack(*r) for r in records)
+
+
+def unpack(data: bytes, offset: int = 0, count: int = None) -> List[list]:
+    if count is None:
+        count = (len(data) - offset) // _RECORD.size
+    return [list(r) for r in _RECORD.iter_unpack(data[offset:offset + count * _RECORD.size])]
+
+
+def pack_frame(own, ghosts) -> bytes:
+    """A partition's work for one frame: the bots it steps, then the neighbours' bots they can bump into"""
+    return _COUNTS.pack(len(own), len(ghosts)) + pack(own) + pack(ghosts)
+
+
+def unpack_frame(data: bytes) -> Tuple[List[list], List[list]]:
+    n_own, n_ghosts = _COUNTS.unpack_from(data)
+    own = unpack(data, _COUNTS.size, n_own)
+    ghosts = unpack(data, _COUNTS.size + n_own * _RECORD.size, n_ghosts)
+    return own, ghosts
+
+
+def _points(r) -> List[Tuple[float, float]]:
+    """Hit box corners computed as arcade's Sprite.get_points() does, rounding included, so borderline contacts agree"""
+    rad = math.radians(r[ANGLE])
+    c, s = math.cos(rad), math.sin(rad)
+    x, y = r[X], r[Y]
+    points = []
+    for px, py in ((x - _HALF, y - _HALF), (x + _HALF, y - _HALF), (x + _HALF, y + _HALF), (x - _HALF, y + _HALF)):
+        tx, ty = px - x, py - y
+        points.append((round(tx * c - ty * s + x, 2), round(tx * s + ty * c + y, 2)))
+    return points
+
+
+def _separated(pa, pb) -> bool:
+    """Separating axis test for two convex polygons (touching counts as separated, as in arcade)"""
+    for poly in (pa, pb):
+        for i in range(len(poly)):
+            x1, y1 = poly[i]
+            x2, y2 = poly[(i + 1) % len(poly)]
+            nx, ny = y2 - y1, x1 - x2
+            a = [nx * px + ny * py for px, py in pa]
+            b = [nx * px + ny * py for px, py in pb]
+            if max(a) <= min(b) or max(b) <= min(a):
+                return True
+    return False
+
+
+def overlaps(a, b) -> bool:
+    """Same decision as common.collision.overlaps() for two 10x10 bots"""
+    dx = abs(a[X] - b[X])
+    dy = abs(a[Y] - b[Y])
+    if a[ANGLE] % 90 == 0 and b[ANGLE] % 90 == 0:
+        return dx < SIZE and dy < SIZE
+    dist2 = dx * dx + dy * dy
+    if dist2 >= _OUTER * _OUTER:
+        return False
+    if dist2 < _INNER * _INNER:
+        return True
+    return not _separated(_points(a), _points(b))
+
+
+def collides(r, world) -> bool:
+    for other in world:
+        if other is not r and overlaps(r, other):
+            return True
+    return False
+
+
+def _walk(r, world, dist) -> bool:
+    """Step forward, undoing the step if it ends overlapping another bot. True when blocked."""
+    x, y = r[X], r[Y]
+    rad = math.radians(r[ANGLE])
+    r[X] = x + math.cos(rad) * dist
+    r[Y] = y + math.sin(rad) * dist
+    if collides(r, world):
+        r[X], r[Y] = x, y
+        return True
+    return False
+
+
+def update(r, world, seed: int) -> None:
+    """One frame of one bot, as its crowd.bots class's update()"""
+    kind = r[KIND]
+    if kind == STATIONARY:
+        return
+    if kind == BOT:
+        _walk(r, world, 2.0)
+    elif kind == OCT_WALK:
+        _walk(r, world, 2.0)
+        r[A] += 1
+        if r[A] > 20:
+            r[A] = 0
+            r[ANGLE] += 45
+    elif kind == RANDOM_WALK:
+        r[A] += 1
+        if r[A] > r[B]:
+            r[A] = 0
+            r[B] = streams.randint(r[ID], r[C], 10, 20, seed=seed)
+            r[ANGLE] = streams.randint(r[ID], r[C], 0, 360, draw=1, seed=seed)
+            r[C] += 1
+        _walk(r, world, 2.0)
+    elif kind == BOUNCE:
+        if _walk(r, world, 2.0):
+            r[ANGLE] += 180
+    elif kind == RUN_AWAY:
+        state = RUN_AWAY_STATES[r[B]]
+        x, y = r[X], r[Y]
+        if state == 'bumped' and r[A] <= 0:
+            state = 'waiting'
+            r[A] = 60
+        elif state == 'waiting':
+            r[A] -= 1
+            if r[A] <= 0:
+                state = 'normal'
+                r[ANGLE] += 180
+        if state != 'waiting':
+            dist = 1.0 if state == 'normal' else 5.0
+            rad = math.radians(r[ANGLE])
+            r[X] += math.cos(rad) * dist
+            r[Y] += math.sin(rad) * dist
+            if state == 'bumped':
+                r[A] -= 1
+        if collides(r, world):
+            r[X], r[Y] = x, y
+            r[ANGLE] += 180
+            state = 'bumped'
+            r[A] = 15
+        r[B] = RUN_AWAY_STATES.index(state)
+
+
+def step(own: List[list], ghosts: List[list], seed: int) -> None:
+    """Update every bot in own, in order, against own + ghosts"""
+    world = own + ghosts
+    for r in own:
+        update(r, world, seed)
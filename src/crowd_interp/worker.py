@@ -0,0 +1,16 @@
+"""Partition worker loop. Runs the same in a subinterpreter, a thread or a child process: it only needs two pipe fds.
+
+Each request is pack_frame(own, ghosts); the reply is pack(own) after one step. An empty message ends the loop.
+"""
+from common.interp import recv_bytes, send_bytes
+from crowd_interp import kernel
+
+
+def serve(request_fd: int, reply_fd: int, partition: int, seed: int) -> None:
+    while True:
+        message = recv_bytes(request_fd)
+        if not message:
+            return
+        own, ghosts = kernel.unpack_frame(message)
+        kernel.step(own, ghosts, seed)
+        send_bytes(reply_fd, kernel.pack(own))
@@ -0,0 +1,143 @@
+"""
+SUMMARY: Thread-scaling benchmark for the thread engine: bot updates per second against thread count.
+
+Instead of one thread per bot (as in crowd_sandbox), the bots are split into vertical strips, one per worker thread,
+and each frame every worker updates its strip under the chosen lock mode (see common/celllocks.py) between two
+FrameGate barriers, the same synchronization the sandbox uses.
+
+On a standard (GIL) CPython more threads can't add throughput. On a free-threaded build (python3.13t) they can, as long
+as the locks let bots in different strips update at the same time, which is what the "cells" lock mode is for. Run the
+same command under both interpreters and compare:
+
+    cd src/
+    python -m crowd_thread.bench
+    python3.13t -m crowd_thread.bench --threads 1,2,4,8,16 --bots 800
+"""
+import argparse
+import math
+import random
+import sys
+import sysconfig
+import threading
+import time
+from dataclasses import dataclass
+from typing import List
+
+import arcade
+
+from common import streams
+from common.celllocks import CellLocks, GlobalLock
+from common.framegate import FrameGate
+from crowd_thread import bots
+
+LOCK_MODES = {'global': GlobalLock, 'cells': CellLocks}
+
+
+def interpreter() -> str:
+    if not sysconfig.get_config_var('Py_GIL_DISABLED'):
+        return f'CPython {sys.version.split()[0]} (GIL)'
+    enabled = sys._is_gil_enabled()  # a free-threaded build can still have the GIL turned back on (PYTHON_GIL=1)
+    return f'CPython {sys.version.split()[0]} free-threaded, GIL {"enabled" if enabled else "disabled"}'
+
+
+@dataclass
+class Result:
+    lock_mode: str
+    threads: int
+    bots: int
+    frames: int
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        return self.bots * self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def make_bots(count: int, seed: int) -> arcade.SpriteList:
+    """count RandomWalkBots spread over a square world, none overlapping"""
+    rng = random.Random(seed)
+    side = int(math.ceil(math.sqrt(count * 4)))  # a quarter of the 20px cells are filled
+    cells = rng.sample([(x, y) for x in range(side) for y in range(side)], count)
+    world = arcade.SpriteList()
+    for i, (col, row) in enumerate(cells):
+        b = bots.RandomWalkBot(col * 20 + 10, row * 20 + 10, world, arcade.color.GREEN, None, start_thread=False)
+        b.id = i
+        world.append(b)
+    return world
+
+
+def run_one(lock_mode: str, threads: int, bot_count: int, frames: int, seed: int) -> Result:
+    random.seed(seed)
+    streams.seed(seed)
+    world = make_bots(bot_count, seed)
+    locks = LOCK_MODES[lock_mode]()
+    gate = FrameGate()
+    ordered = sorted(world, key=lambda b: b.center_x)
+    strips = [ordered[i * len(ordered) // threads:(i + 1) * len(ordered) // threads] for i in range(threads)]
+
+    def worker(strip, seen):
+        for _ in range(frames):
+            seen = gate.wait_for_frame(seen)
+            for b in strip:
+                with locks.for_move(b.center_x, b.center_y):
+                    b.update()
+            gate.done()
+
+    workers = [threading.Thread(target=worker, args=(strip, gate.register()), daemon=True) for strip in strips]
+    for t in workers:
+        t.start()
+    start = time.perf_counter()
+    for _ in range(frames):
+        gate.run_frame()
+    elapsed = time.perf_counter() - start
+    for t in workers:
+        t.join()
+    return Result(lock_mode, threads, bot_count, frames, elapsed)
+
+
+def print_report(results: List[Result], bar_width: int = 30) -> None:
+    """One block per lock mode. Speedup is relative to one thread in the same lock mode."""
+    baseline = {r.lock_mode: r.throughput for r in results if r.threads == 1}
+    best = max(r.throughput for r in results)
+    print('{:<7} {:>7} {:>9} {:>12} {:>8}  {}'.format('locks', 'threads', 'time(s)', 'updates/s', 'speedup', 'scaling'))
+    prev = None
+    for r in results:
+        if prev is not None and r.lock_mode != prev:
+            print()
+        prev = r.lock_mode
+        base = baseline.get(r.lock_mode)
+        speedup = '{:0.2f}x'.format(r.throughput / base) if base else '-'
+        bar = '#' * int(round(bar_width * r.throughput / best)) if best > 0 else ''
+        print('{:<7} {:>7} {:>9.3f} {:>12.0f} {:>8}  {}'.format(
+            r.lock_mode, r.threads, r.elapsed, r.throughput, speedup, bar))
+
+
+def _int_list(txt):
+    return [int(v) for v in txt.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bot update throughput of the thread engine against thread count')
+    parser.add_argument('--threads', type=_int_list, default=[1, 2, 4, 8], help='comma separated thread counts')
+    parser.add_argument('--locks', default=','.join(LOCK_MODES), help='comma separated subset of: ' +
+                        ', '.join(LOCK_MODES))
+    parser.add_argument('--bots', type=int, default=400)
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=12345)
+    args = parser.parse_args(argv)
+
+    print(interpreter())
+    print(f'{args.bots} bots, {args.frames} frames')
+    results = []
+    for lock_mode in args.locks.split(','):
+        if lock_mode not in LOCK_MODES:
+            parser.error(f'unknown lock mode {lock_mode!r}')
+        for threads in args.threads:
+            results.append(run_one(lock_mode, threads, args.bots, args.frames, args.seed))
+            print('  done', lock_mode, threads, '{:0.3f}s'.format(results[-1].elapsed))
+    print()
+    print_report(results)
+
+
+if __name__ == '__main__':
+    main()
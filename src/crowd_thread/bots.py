@@ -1,18 +1,22 @@
 """Various Bot implementations, each Bot following its own distinct logic"""
+import itertools
 import math
-import random
 import threading
 
 import arcade
 from arcade.utils import _Vec2
 
-from common import utl
+from common import collision, streams, utl
+from common.pool import remove_sprite
+
+_ids = itertools.count()
 
 
 class Bot(arcade.Sprite):
     """Simple bot that moves in the direction of its given angle"""
-    def __init__(self, x, y, bots, color, app):
+    def __init__(self, x, y, bots, color, app, start_thread=True):
         super().__init__()
+        self.id = next(_ids)
         self.debug = False
         self.bots = bots
         self.center_x = x
@@ -23,10 +27,14 @@ class Bot(arcade.Sprite):
         square_texture = arcade.make_soft_square_texture(10, color, 255, 255)
         self.append_texture(square_texture)
         self.set_texture(0)
-        # threading
+        # threading (without a thread of its own the bot is updated by whoever calls update(), see crowd_thread.bench)
         self.app = app
-        self.worker = threading.Thread(target=self.worker_update, args=(), daemon=True)
-        self.worker.start()
+        self.worker = None
+        self.stopped = False
+        if start_thread:
+            seen = app.gate.register()  # before the thread starts, so it can't miss the next frame
+            self.worker = threading.Thread(target=self.worker_update, args=(seen,), daemon=True)
+            self.worker.start()
 
     def pos(self) -> _Vec2:
         """Convenience method to return current sprite position as a Vector"""
@@ -47,19 +55,45 @@ class Bot(arcade.Sprite):
         self.center_x = self.orig_x
         self.center_y = self.orig_y
 
-    def worker_update(self):
-        """Each bot has one thread. Each thread runs this method which triggers an update every time an Event is signaled."""
+    def collides(self) -> bool:
+        """Does this Bot currently overlap any other Bot?"""
+        return collision.any_collision(self, self.bots)
+
+    def worker_update(self, seen):
+        """Each bot has one thread. Each thread runs this method, which makes one update per frame of the app's gate."""
+        gate = self.app.gate
         while True:
-            self.app.bot_update_event.wait()  # blocks until event is set
-            with self.app.bot_lock:  # Make the assumption that bot data is mutated only during update()
-                self.update()
+            seen = gate.wait_for_frame(seen)  # blocks until the next frame starts
+            if self.stopped:  # killed since the last frame: leave the gate (this frame still counts us once)
+                gate.unregister()
+                gate.done()
+                return
+            try:
+                # Make the assumption that bot data is mutated only during update(). Depending on the app's lock mode
+                # this holds either the one global lock or just the locks of the cells around this bot (see
+                # common.celllocks).
+                with self.app.bot_locks.for_move(self.center_x, self.center_y):
+                    self.update()
+            except BaseException:
+                gate.unregister()  # don't leave the app waiting for a thread that is gone
+                gate.done()
+                raise
+            gate.done()
+
+    def kill(self):
+        """Remove from the world and stop this bot's thread, which exits when the next frame starts (see join())"""
+        self.stopped = True
+        remove_sprite(self)
+
+    def join(self, timeout=None):
+        if self.worker is not None:
+            self.worker.join(timeout)
 
     def update(self):
         super().update()
         self.save_pos()
         self.step_forward(2.0)
-        overlaps = self.collides_with_list(self.bots)
-        if len(overlaps) > 0:  # if movement would have this Sprite overlap another Sprite, cancel movement
+        if self.collides():  # if movement would have this Sprite overlap another Sprite, cancel movement
             self.restore_pos()
 
 
@@ -71,8 +105,8 @@ class StationaryBot(Bot):
 
 class OctWalkBot(Bot):
     """Bot walks in an octagon path"""
-    def __init__(self, x, y, bots, color, app):
-        super().__init__(x, y, bots, color, app)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.frame_count = 0
 
     def update(self):
@@ -85,17 +119,19 @@ class OctWalkBot(Bot):
 
 class RandomWalkBot(Bot):
     """Bot walks in random directions for random lengths of time"""
-    def __init__(self, x, y, bots, color, app):
-        super().__init__(x, y, bots, color, app)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.frame_count = 0
         self.next_change_frame = 0
+        self.walks = 0  # turns so far: the counter of this bot's random stream (see common.streams)
 
     def update(self):
         self.frame_count += 1
         if self.frame_count > self.next_change_frame:
             self.frame_count = 0
-            self.next_change_frame = random.randint(10, 20)
-            self.angle = random.randint(0, 360)
+            self.next_change_frame = streams.randint(self.id, self.walks, 10, 20)
+            self.angle = streams.randint(self.id, self.walks, 0, 360, draw=1)
+            self.walks += 1
         super().update()
 
 
@@ -104,16 +140,15 @@ class BounceBot(Bot):
     def update(self):
         self.save_pos()
         self.step_forward(2.0)
-        overlaps = self.collides_with_list(self.bots)
-        if len(overlaps) > 0:  # if movement would have this Sprite overlap another Sprite, cancel movement and reflect
+        if self.collides():  # if movement would have this Sprite overlap another Sprite, cancel movement and reflect
             self.restore_pos()
             self.angle += 180
 
 
 class RunAwayBot(Bot):
     """Moves slowly. When it gets bumped, it runs away quickly then stops. After a time it moves again."""
-    def __init__(self, x, y, bots, color, app):
-        super().__init__(x, y, bots, color, app)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.state = 'normal'
         self.frame_count = 0
         self.angle = 180
@@ -134,9 +169,23 @@ class RunAwayBot(Bot):
             elif self.state == "bumped":
                 self.step_forward(5.0)
                 self.frame_count -= 1
-        overlaps = self.collides_with_list(self.bots)
-        if len(overlaps) > 0:  # if movement would have this Sprite overlap another Sprite, cancel movement and reflect
+        if self.collides():  # if movement would have this Sprite overlap another Sprite, cancel movement and reflect
             self.restore_pos()
             self.angle += 180
             self.state = 'bumped'
             self.frame_count = 15
+
+
+KINDS = {cls.__name__: cls for cls in (Bot, StationaryBot, OctWalkBot, RandomWalkBot, BounceBot, RunAwayBot)}
+
+
+def from_state(state: tuple, bots, color, app, start_thread: bool = True) -> Bot:
+    """Bot from a crowd.bots Bot.get_state() tuple (behaviour fields this engine's bots don't have are ignored)"""
+    kind, bot_id, x, y, angle, fields = state
+    b = KINDS[kind](x, y, bots, color, app, start_thread)
+    b.id = bot_id
+    b.angle = angle
+    for name, value in fields.items():
+        if hasattr(b, name):
+            setattr(b, name, value)
+    return b
@@ -3,11 +3,17 @@ SUMMARY: Simple crowd simulation (implemented with threads). Multiple "Bots" wit
 
 Observation: It is common for Bots to deadlock against each other and stop moving. It isn't worth making more
 sophisticated collision resolution logic as this is just an experiment.
+
+Each frame, update() lets every bot thread make exactly one update and waits for all of them (common/framegate.py),
+so drawing and changes to the bot list never overlap with bot updates. By default one global lock serializes the bot
+updates. With --cell-locks each bot only locks the cells of the world around it, so bots in different regions update
+concurrently (see common/celllocks.py). Together these keep the updates safe on free-threaded (no-GIL) CPython; see
+crowd_thread/bench.py for how they scale.
 """
 import random
 import sys
-import time
 import threading
+import time
 import statistics
 from typing import Optional
 
@@ -15,14 +21,19 @@ import arcade
 from arcade.utils import _Vec2
 
 from crowd_thread import bots
+from crowd.bots import KIND_COLORS
 from common.fpsscanner import FpsScanner
-from common import utl
+from common import streams, utl
+from common.celllocks import CellLocks, GlobalLock
+from common.framegate import FrameGate
 from common.fpscounter import FpsCounter
+from common.sampler import SamplingProfiler
 from common.timer import Timer
 
 
 class MyGame(arcade.Window):
-    def __init__(self):
+    def __init__(self, cell_locks: bool = False, width: int = 800, height: int = 600, fps_window: int = 120,
+                 sleep: Optional[float] = None, states: Optional[list] = None):
         self.times_init = []
         self.times_draw = []
         self.times_update = []
@@ -31,14 +42,15 @@ class MyGame(arcade.Window):
 
         with Timer() as init_timer:
             self.cnt = 0
-            super().__init__(800, 600, sys.argv[0])  # update_rate=1/60
+            super().__init__(width, height, sys.argv[0])  # update_rate=1/60
             self.paused = False
             self.frame_advance = False
-            self.sleep: Optional[float] = None
+            self.sleep: Optional[float] = sleep
             self.click_mode = 'goal'
             self.clicked_bot = None
             self.scanner = FpsScanner()
-            self.fps = FpsCounter(120)
+            self.fps = FpsCounter(fps_window)
+            self.profiler = SamplingProfiler()
             self.bots = arcade.SpriteList()
             self.bot_factories = utl.Cycler((
                 (arcade.color.RED, bots.Bot),
@@ -49,40 +61,46 @@ class MyGame(arcade.Window):
                 (arcade.color.PURPLE, bots.RunAwayBot),
             ))
 
-            self.bot_update_event = threading.Event()
-            self.bot_lock = threading.Lock()
-
-            goal = _Vec2(700, 300)
-            seq = 0
-            for x in range(50, 150, 25):
-                for y in range(50, 550, 25):
-                    b = bots.Bot(x, y, self.bots, arcade.color.RED, self)
-                    b.id = seq
-                    seq += 1
-                    b.set_goal(goal)
-                    self.bots.append(b)
-            self.bots[9].angle = 355
-
-            self.bots.append(bots.OctWalkBot(400, 300, self.bots, arcade.color.YELLOW, self))
-            self.bots.append(bots.RunAwayBot(500, 350, self.bots, arcade.color.PURPLE, self))
-            self.bots.append(bots.RunAwayBot(475, 340, self.bots, arcade.color.PURPLE, self))
-
-            for x in range(550, 650, 25):
-                for y in range(450, 550, 25):
-                    self.bots.append(bots.RandomWalkBot(x, y, self.bots, arcade.color.GREEN, self))
-
-            for x in (500, 600, 625, 650, 700):
-                b = bots.BounceBot(x, 300, self.bots, arcade.color.BLUE, self)
-                b.angle = 180
-                self.bots.append(b)
+            self.gate = FrameGate()
+            self.bot_locks = CellLocks() if cell_locks else GlobalLock()
+            print('Bot update locking:', type(self.bot_locks).__name__)
 
-            for y in range(200, 400, 20):
-                self.bots.append(bots.StationaryBot(723, y, self.bots, arcade.color.DARK_GRAY, self))
+            if states is None:
+                self.populate_default()
+            else:  # Bot.get_state() tuples, e.g. crowd.world.random_states()
+                for state in states:
+                    self.bots.append(bots.from_state(state, self.bots, KIND_COLORS[state[0]], self))
 
             print(f'There are {len(self.bots)} starting Bots')
 
         self.times_init.append(init_timer.last_elapsed)
 
+    def populate_default(self) -> None:
+        """The standard starting bots"""
+        goal = _Vec2(700, 300)
+        for x in range(50, 150, 25):
+            for y in range(50, 550, 25):
+                b = bots.Bot(x, y, self.bots, arcade.color.RED, self)
+                b.set_goal(goal)
+                self.bots.append(b)
+        self.bots[9].angle = 355
+
+        self.bots.append(bots.OctWalkBot(400, 300, self.bots, arcade.color.YELLOW, self))
+        self.bots.append(bots.RunAwayBot(500, 350, self.bots, arcade.color.PURPLE, self))
+        self.bots.append(bots.RunAwayBot(475, 340, self.bots, arcade.color.PURPLE, self))
+
+        for x in range(550, 650, 25):
+            for y in range(450, 550, 25):
+                self.bots.append(bots.RandomWalkBot(x, y, self.bots, arcade.color.GREEN, self))
+
+        for x in (500, 600, 625, 650, 700):
+            b = bots.BounceBot(x, 300, self.bots, arcade.color.BLUE, self)
+            b.angle = 180
+            self.bots.append(b)
+
+        for y in range(200, 400, 20):
+            self.bots.append(bots.StationaryBot(723, y, self.bots, arcade.color.DARK_GRAY, self))
+
     def on_draw(self):
         with Timer(logger=None) as draw_timer:
             arcade.start_render()
@@ -94,16 +112,15 @@ class MyGame(arcade.Window):
         with Timer(logger=None) as update_timer:
             self.fps.tick()
             if self.fps.is_ready():
-                print('FPS', self.fps.get_fps())
+                print('FPS', self.fps.get_fps(), 'bots', len(self.bots), 'threads', threading.active_count())
             if not self.paused or self.frame_advance:
                 if self.frame_advance:
                     self.frame_advance = False
                 if self.sleep is not None:
                     time.sleep(self.sleep)
                 self.scanner.update()
-                self.bot_update_event.set()  # Event all threads that they can do their update
+                self.gate.run_frame()  # every bot thread does one update, wait for all of them
         self.times_update.append(update_timer.last_elapsed)
-        self.bot_update_event.clear()
 
     def on_key_press(self, symbol: int, modifiers: int):
         # pause
@@ -120,6 +137,9 @@ class MyGame(arcade.Window):
             self.sleep = 0.1
         elif symbol == arcade.key.KEY_3:
             self.sleep = 1.0
+        # sampling profiler (writes collapsed stacks for a flamegraph when toggled off)
+        elif symbol == arcade.key.F:
+            self.profiler.toggle()
         # click mode
         elif symbol == arcade.key.A:
             self.click_mode = 'add'
@@ -156,6 +176,8 @@ class MyGame(arcade.Window):
         self._times_summary('draw  ', self.times_draw)
         self._times_summary('update', self.times_update)
         print('total', self.total_timer.stop())
+        if self.profiler.running:
+            self.profiler.toggle()
 
     def on_mouse_press(self, x: float, y: float, button: int, modifiers: int):
         super().on_mouse_press(x, y, button, modifiers)
@@ -173,14 +195,14 @@ class MyGame(arcade.Window):
                 print('adding bot....')
                 # add new bot
                 clr, bot_factory = self.bot_factories.get()
-                b = bot_factory(x, y, self.bots, clr)
-                b.id = 999999
-                self.bots.append(b)
+                with self.bot_locks.all():
+                    self.bots.append(bot_factory(x, y, self.bots, clr, self))
             elif self.click_mode == 'delete':
                 touched = arcade.get_sprites_at_point((x, y), self.bots)
                 print('Removing', len(touched), 'Bots')
-                for b in touched:
-                    self.bots.remove(b)
+                with self.bot_locks.all():
+                    for b in touched:
+                        b.kill()  # the bot's thread exits at the start of the next frame
             elif self.click_mode == 'move':
                 touched = arcade.get_sprites_at_point((x, y), self.bots)
                 if len(touched) > 0:
@@ -194,12 +216,14 @@ class MyGame(arcade.Window):
 
     def on_mouse_drag(self, x: float, y: float, dx: float, dy: float, buttons: int, modifiers: int):
         if self.clicked_bot is not None:
-            self.clicked_bot.center_x = x
-            self.clicked_bot.center_y = y
+            with self.bot_locks.all():
+                self.clicked_bot.center_x = x
+                self.clicked_bot.center_y = y
 
 
 if __name__ == '__main__':
     random.seed(12345)  # repeatable randomness
-    game = MyGame()
+    streams.seed(12345)
+    game = MyGame(cell_locks='--cell-locks' in sys.argv)
     game.set_location(600, 50)
     arcade.run()
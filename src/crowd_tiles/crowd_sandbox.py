@@ -0,0 +1,174 @@
+"""
+SUMMARY: Domain-decomposed crowd simulation. The world is split into tiles, each stepped by its own worker process.
+
+Workers only exchange the bots near their borders (ghosts) and the bots that cross a border (migrants) with their
+neighbours, see tiles.py. The world can then grow with the number of workers instead of being capped by one process.
+
+This process is only the coordinator: it builds a seeded scenario, hands each worker the bots in its tile, and then
+collects a (id, kind, x, y) snapshot per tile per frame. Headless it reports frames/s and checks that no bot was lost
+or duplicated; with --view it draws the snapshots.
+
+    cd src/
+    python -m crowd_tiles.crowd_sandbox --cols 2 --rows 2 --bots 2000 --frames 600
+    python -m crowd_tiles.crowd_sandbox --cols 3 --rows 2 --width 1200 --height 600 --view
+"""
+import argparse
+import collections
+import math
+import multiprocessing
+import time
+from typing import Dict, List, Tuple
+
+from crowd import bots
+from crowd.world import random_states
+from crowd_tiles.tiles import TileLayout, worker_main
+
+
+class TiledWorld:
+    """Starts one worker per tile, wired to each of its neighbours by a Pipe"""
+    def __init__(self, layout: TileLayout, states: List[tuple], frames: int, halo: float = 20.0, seed: int = 0):
+        self.layout = layout
+        self.frames = frames
+        self.bot_count = len(states)
+        per_tile: Dict[int, List[tuple]] = {tile: [] for tile in range(len(layout))}
+        for state in states:
+            per_tile[layout.tile_at(state[2], state[3])].append(state)
+
+        links: Dict[int, Dict[int, object]] = {tile: {} for tile in range(len(layout))}
+        for tile in range(len(layout)):
+            for n in layout.neighbours(tile):
+                if n > tile:
+                    links[tile][n], links[n][tile] = multiprocessing.Pipe()
+
+        self.conns = []
+        self.processes = []
+        for tile in range(len(layout)):
+            recv_conn, send_conn = multiprocessing.Pipe(duplex=False)
+            p = multiprocessing.Process(
+                target=worker_main, args=(tile, layout, per_tile[tile], links[tile], send_conn, frames, halo, seed),
+                daemon=True)
+            self.conns.append(recv_conn)
+            self.processes.append(p)
+
+    def start(self) -> None:
+        for p in self.processes:
+            p.start()
+
+    def next_frame(self) -> Tuple[List[tuple], Dict[int, dict]]:
+        """Wait for every tile to report the next frame. Returns all bots and the per-tile counts."""
+        snapshot: List[tuple] = []
+        counts = {}
+        for conn in self.conns:
+            frame, tile, tile_bots, tile_counts = conn.recv()
+            snapshot.extend(tile_bots)
+            counts[tile] = tile_counts
+        return snapshot, counts
+
+    def join(self) -> None:
+        for conn in self.conns:
+            conn.recv()  # end of stream
+        for p in self.processes:
+            p.join()
+
+
+def deep_overlaps(snapshot: List[tuple], distance: float = 10.0) -> List[Tuple[int, int]]:
+    """Pairs of bot ids whose centers are less than `distance` apart. Closer than a bot's width (10), two bots overlap
+    whatever their angles."""
+    cells: Dict[Tuple[int, int], List[tuple]] = collections.defaultdict(list)
+    for bot_id, kind, x, y in snapshot:
+        cells[(int(math.floor(x / distance)), int(math.floor(y / distance)))].append((bot_id, x, y))
+    limit = distance * distance
+    pairs = []
+    for (col, row), members in cells.items():
+        for dc in (-1, 0, 1):
+            for dr in (-1, 0, 1):
+                for other_id, ox, oy in cells.get((col + dc, row + dr), ()):
+                    for bot_id, x, y in members:
+                        if bot_id < other_id and (x - ox) ** 2 + (y - oy) ** 2 < limit:
+                            pairs.append((bot_id, other_id))
+    return pairs
+
+
+def check_conservation(snapshot: List[tuple], bot_count: int) -> List[Tuple[int, int]]:
+    """Raise if a bot was lost or duplicated. Returns the deep_overlaps(), which the tiles' second exchange should leave
+    none of (see tiles.py)."""
+    ids = [b[0] for b in snapshot]
+    if len(ids) != bot_count or len(set(ids)) != bot_count:
+        raise RuntimeError(f'bots lost or duplicated: {len(ids)} reported, {len(set(ids))} distinct, {bot_count} expected')
+    return deep_overlaps(snapshot)
+
+
+def run_headless(world: TiledWorld) -> None:
+    world.start()
+    start = time.perf_counter()
+    migrations = 0
+    taken_back = 0
+    overlaps = set()
+    for frame in range(world.frames):
+        snapshot, counts = world.next_frame()
+        overlaps.update(check_conservation(snapshot, world.bot_count))
+        migrations += sum(c['out'] for c in counts.values())
+        taken_back += sum(c['taken_back'] for c in counts.values())
+    elapsed = time.perf_counter() - start
+    world.join()
+    print(f'{world.frames} frames of {world.bot_count} bots on {len(world.layout)} tiles in {elapsed:0.2f}s '
+          f'({world.frames / elapsed:0.1f} frames/s), {migrations} migrations, {taken_back} moves taken back at '
+          f'tile borders, no bots lost, {len(overlaps)} pairs of bots overlapped')
+
+
+def run_view(world: TiledWorld) -> None:
+    import arcade
+
+    class TileWindow(arcade.Window):
+        def __init__(self):
+            super().__init__(int(world.layout.width), int(world.layout.height), 'crowd_tiles')
+            self.frame = 0
+            self.snapshot: List[tuple] = []
+
+        def on_draw(self):
+            arcade.start_render()
+            layout = world.layout
+            for col in range(1, layout.cols):
+                arcade.draw_line(col * layout.tile_w, 0, col * layout.tile_w, layout.height, arcade.color.GRAY)
+            for row in range(1, layout.rows):
+                arcade.draw_line(0, row * layout.tile_h, layout.width, row * layout.tile_h, arcade.color.GRAY)
+            by_kind: Dict[str, List[Tuple[float, float]]] = {}
+            for bot_id, kind, x, y in self.snapshot:
+                by_kind.setdefault(kind, []).append((x, y))
+            for kind, points in by_kind.items():
+                arcade.draw_points(points, bots.KIND_COLORS[kind], 10)
+
+        def update(self, delta_time: float):
+            if self.frame < world.frames:
+                self.snapshot, counts = world.next_frame()
+                self.frame += 1
+
+    window = TileWindow()
+    world.start()
+    arcade.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crowd simulation split over one worker process per tile')
+    parser.add_argument('--cols', type=int, default=2)
+    parser.add_argument('--rows', type=int, default=2)
+    parser.add_argument('--width', type=float, default=800)
+    parser.add_argument('--height', type=float, default=600)
+    parser.add_argument('--bots', type=int, default=400)
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--halo', type=float, default=20.0, help='ghost zone width, at least one bot plus one step')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--view', action='store_true', help='draw the world instead of running headless')
+    args = parser.parse_args()
+
+    layout = TileLayout(args.width, args.height, args.cols, args.rows)
+    world = TiledWorld(layout, random_states(args.width, args.height, args.bots, args.seed), args.frames, args.halo,
+                       args.seed)
+    if args.view:
+        run_view(world)
+    else:
+        run_headless(world)
+
+
+if __name__ == '__main__':
+    main()
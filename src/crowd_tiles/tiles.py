@@ -0,0 +1,219 @@
+"""Spatial tiling of the world and the worker process that simulates one tile.
+
+Each worker owns the bots whose center is inside its tile and steps only those. Every frame it sends each neighbouring
+tile one message holding:
+- ghosts: compact copies (id, x, y, angle) of its own bots (and of those it just handed over) within `halo` of that
+  neighbour, so bots near the border collide with bots on the other side
+- migrants: full state (Bot.get_state()) of bots that crossed into (or toward) that neighbour last frame
+
+then waits for the same message from every neighbour. That exchange is also what keeps the workers in lockstep.
+
+Ghosts stand where the neighbour's bots were when the frame started, so after stepping a second exchange sends the
+moves that ended within `halo` of a neighbour. Of two bots on either side of a border that stepped into the same space,
+the one with the higher id takes its move back, as if it had been blocked.
+
+Workers talk over multiprocessing Connections (Pipe() ends here, which are local sockets on Unix). A Connection from
+multiprocessing.connection.Client()/Listener() has the same send()/recv() API, which is the path to spreading tiles
+over several machines.
+"""
+import math
+import queue
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+from common import collision, streams
+from common.spatial import SpatialGrid, attach_grid
+from crowd import bots
+
+Tile = int
+
+
+class TileLayout:
+    """cols x rows grid of equal tiles covering width x height. Edge tiles also own everything beyond the edge."""
+    def __init__(self, width: float, height: float, cols: int, rows: int):
+        self.width = width
+        self.height = height
+        self.cols = cols
+        self.rows = rows
+        self.tile_w = width / cols
+        self.tile_h = height / rows
+
+    def __len__(self) -> int:
+        return self.cols * self.rows
+
+    def col_row(self, tile: Tile) -> Tuple[int, int]:
+        return tile % self.cols, tile // self.cols
+
+    def tile_at(self, x: float, y: float) -> Tile:
+        col = min(max(int(math.floor(x / self.tile_w)), 0), self.cols - 1)
+        row = min(max(int(math.floor(y / self.tile_h)), 0), self.rows - 1)
+        return row * self.cols + col
+
+    def neighbours(self, tile: Tile) -> List[Tile]:
+        """The up to 8 tiles touching this one"""
+        col, row = self.col_row(tile)
+        result = []
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                c, r = col + dc, row + dr
+                if (dc or dr) and 0 <= c < self.cols and 0 <= r < self.rows:
+                    result.append(r * self.cols + c)
+        return result
+
+    def halo_targets(self, tile: Tile, x: float, y: float, halo: float) -> Set[Tile]:
+        """Neighbouring tiles that need a ghost of a bot at (x, y): those within halo of it"""
+        targets = set()
+        for px in (x - halo, x, x + halo):
+            for py in (y - halo, y, y + halo):
+                targets.add(self.tile_at(px, py))
+        targets.discard(tile)
+        return targets
+
+    def next_hop(self, tile: Tile, owner: Tile) -> Tile:
+        """Neighbour of tile one step toward owner (bots normally only ever cross into a direct neighbour)"""
+        col, row = self.col_row(tile)
+        owner_col, owner_row = self.col_row(owner)
+        col += (owner_col > col) - (owner_col < col)
+        row += (owner_row > row) - (owner_row < row)
+        return row * self.cols + col
+
+
+class Ghost:
+    """Read-only stand-in for a bot owned by a neighbouring tile. Has just what the collision tests need."""
+    width = 10
+    height = 10
+    alive = True
+
+    def __init__(self, bot_id, x, y, angle):
+        self.id = bot_id
+        self.center_x = x
+        self.center_y = y
+        self.angle = angle
+
+    @property
+    def points(self):
+        rad = math.radians(self.angle)
+        c, s = math.cos(rad), math.sin(rad)
+        hw, hh = self.width / 2, self.height / 2
+        return [(self.center_x + px * c - py * s, self.center_y + px * s + py * c)
+                for px, py in ((-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh))]
+
+
+class TileBots(list):
+    """A tile's own bots + ghosts, what the bots collide against. A list subclass, so it can keep the tile's
+    ContactEvents (see bots.contact_events()) and its SpatialGrid: collision queries only test the bots in the cells
+    around the moving bot (see collision.first_collision()) instead of the whole list."""
+    collision_pad = 20.0  # bots overlap only within 14.2 of each other, plus the farthest a bot moves in a frame (5)
+
+
+def _sender(send_queue: queue.Queue) -> None:
+    """Sends run on their own thread so two workers sending each other big messages can't block each other forever"""
+    while True:
+        item = send_queue.get()
+        if item is None:
+            return
+        conn, msg = item
+        conn.send(msg)
+
+
+def worker_main(tile: Tile, layout: TileLayout, states: Iterable[tuple], links: Dict[Tile, object], out_conn,
+                frames: int, halo: float, seed: int) -> None:
+    """Simulate one tile for `frames` frames. Sends (frame, tile, [(id, kind, x, y)], counts) to out_conn per frame."""
+    streams.seed(seed)  # per-bot streams: a bot draws the same numbers whichever tile it is on
+    world = TileBots()
+    events = bots.contact_events(world)
+    world.collision_grid = attach_grid(world)  # FlockBots find their flockmates in it too
+    own = [bots.from_state(state, world) for state in states]
+    outbox: Dict[Tile, List[tuple]] = {n: [] for n in links}
+    send_queue: queue.Queue = queue.Queue()
+    sender = threading.Thread(target=_sender, args=(send_queue,), daemon=True)
+    sender.start()
+
+    for frame in range(frames):
+        # 1. halo exchange (+ last frame's migrants)
+        ghosts_out: Dict[Tile, List[tuple]] = {n: [] for n in links}
+        for b in own:
+            for n in layout.halo_targets(tile, b.center_x, b.center_y, halo):
+                if n in ghosts_out:
+                    ghosts_out[n].append((b.id, b.center_x, b.center_y, b.angle))
+        # a migrant's new owner only sends ghosts of it from the next frame on: until then this tile stands in
+        departed = []
+        for n, states in outbox.items():
+            for kind, bot_id, x, y, angle, fields in states:
+                departed.append(Ghost(bot_id, x, y, angle))
+                for m in layout.halo_targets(tile, x, y, halo):
+                    if m in ghosts_out and m != n:
+                        ghosts_out[m].append((bot_id, x, y, angle))
+        for n, conn in links.items():
+            send_queue.put((conn, (ghosts_out[n], outbox[n])))
+            outbox[n] = []
+        ghosts = departed
+        migrated_in = 0
+        for n, conn in links.items():
+            their_ghosts, migrants = conn.recv()
+            ghosts.extend(Ghost(*g) for g in their_ghosts)
+            for state in migrants:
+                own.append(bots.from_state(state, world))
+                migrated_in += 1
+        world[:] = own + ghosts
+        world.collision_grid.rebuild(world)
+
+        # 2. step own bots
+        starts = [(b.center_x, b.center_y) for b in own]
+        for b in own:
+            b.update()
+
+        # 3. second exchange, of the moves that ended in a halo. Both tiles see a pair of bots that stepped into the
+        # same space, and agree that the one with the higher id goes back.
+        moved = {b: start for b, start in zip(own, starts) if (b.center_x, b.center_y) != start}
+        moves_out: Dict[Tile, List[tuple]] = {n: [] for n in links}
+        for b in moved:
+            for n in layout.halo_targets(tile, b.center_x, b.center_y, halo):
+                if n in moves_out:
+                    moves_out[n].append((b.id, b.center_x, b.center_y, b.angle))
+        for n, conn in links.items():
+            send_queue.put((conn, moves_out[n]))
+        their_moves = SpatialGrid()
+        their_moves.rebuild([Ghost(*g) for conn in links.values() for g in conn.recv()])
+        pad = world.collision_pad
+        blocked = []  # (bot going back, the bot it ran into)
+        for b in moved:
+            for other in their_moves.query_box(b.center_x - pad, b.center_y - pad, b.center_x + pad, b.center_y + pad):
+                if other.id < b.id and collision.overlaps(b, other):
+                    blocked.append((b, other))
+                    break
+        taken_back = 0
+        while blocked:
+            b, other = blocked.pop()
+            if b not in moved:
+                continue  # already back
+            b.center_x, b.center_y = moved.pop(b)
+            events.hit(b, other)
+            taken_back += 1
+            # one of our bots may have stepped into the space it left since: that one goes back too
+            for c in world.collision_grid.query_box(b.center_x - pad, b.center_y - pad, b.center_x + pad,
+                                                    b.center_y + pad):
+                if c in moved and collision.overlaps(b, c):
+                    blocked.append((c, b))
+        events.end_frame()
+
+        # 4. hand over bots that left the tile
+        keep = []
+        for b in own:
+            owner = layout.tile_at(b.center_x, b.center_y)
+            if owner == tile:
+                keep.append(b)
+            else:
+                outbox[layout.next_hop(tile, owner)].append(b.get_state())
+        migrated_out = len(own) - len(keep)
+        own = keep
+
+        # bots in an outbox are between owners until the next exchange, they are reported by the tile they left
+        in_transit = [(state[1], state[0], state[2], state[3]) for states in outbox.values() for state in states]
+        out_conn.send((frame, tile, [(b.id, type(b).__name__, b.center_x, b.center_y) for b in own] + in_transit,
+                       {'own': len(own), 'ghosts': len(ghosts), 'in': migrated_in, 'out': migrated_out,
+                        'taken_back': taken_back}))
+
+    send_queue.put(None)
+    sender.join()
+    out_conn.send(None)
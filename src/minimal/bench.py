@@ -0,0 +1,384 @@
+"""
+SUMMARY: Single benchmark runner for the "central counter" apps in minimal/.
+
+Each of the minimal apps hard-codes 5 workers doing 100 increments and times itself. This runner sweeps worker count
+and iteration count over every backend and reports scaling (increments per second as workers are added) and lock
+contention (how often a worker found the lock already held and how long it waited for it).
+
+Like the minimal apps, every increment is made of two delays:
+- "local" delay: work a worker does without the lock
+- "shared" delay: work done inside the critical section while the lock is held
+
+Usage:
+
+    cd src/
+    python -m minimal.bench
+    python -m minimal.bench --workers 1,2,4,8,16 --iters 50,100 --local-delay 0.001 --shared-delay 0.0001
+    python -m minimal.bench --backends threaded,thread_pool --csv bench.csv
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import csv
+import multiprocessing
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from common import interp
+from common.sharded import ProcessShardedCounter, ShardedCounter
+
+
+@dataclass
+class LockStats:
+    """Lock contention counters gathered by a single worker"""
+    acquires: int = 0
+    contended: int = 0  # acquires where the lock was already held by another worker
+    wait: float = 0.0  # total seconds spent blocked waiting for the lock
+
+    def add(self, other: "LockStats") -> None:
+        self.acquires += other.acquires
+        self.contended += other.contended
+        self.wait += other.wait
+
+    def as_tuple(self):
+        """Plain tuple so stats can be sent back through a multiprocessing.Queue"""
+        return self.acquires, self.contended, self.wait
+
+
+@dataclass
+class Result:
+    backend: str
+    workers: int
+    iters: int
+    elapsed: float
+    count: int
+    stats: LockStats
+
+    @property
+    def expected(self) -> int:
+        return self.workers * self.iters
+
+    @property
+    def throughput(self) -> float:
+        return self.count / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def contended_pct(self) -> float:
+        return 100.0 * self.stats.contended / self.stats.acquires if self.stats.acquires else 0.0
+
+    @property
+    def avg_wait_ms(self) -> float:
+        return 1000.0 * self.stats.wait / self.stats.contended if self.stats.contended else 0.0
+
+
+class Counter:
+    """Plain shared counter for the in-process backends (mirrors multiprocessing.Value's .value attribute)"""
+    def __init__(self):
+        self.value = 0
+
+
+def acquire(lock, stats: LockStats) -> None:
+    """Acquire lock, recording whether it was contended and how long the wait was"""
+    stats.acquires += 1
+    if lock.acquire(False):
+        return
+    stats.contended += 1
+    start = time.perf_counter()
+    lock.acquire()
+    stats.wait += time.perf_counter() - start
+
+
+def incr(counter, lock, local_delay: float, shared_delay: float, stats: LockStats) -> None:
+    """One increment of the central counter. Same shape as CentralCounter.incr() in minimal/threaded."""
+    time.sleep(local_delay)  # represents "local" work that doesn't need the lock
+    acquire(lock, stats)
+    try:
+        cur = counter.value
+        time.sleep(shared_delay)  # represents work on shared data
+        counter.value = cur + 1
+    finally:
+        lock.release()
+
+
+def countup(iters, counter, lock, local_delay, shared_delay) -> LockStats:
+    stats = LockStats()
+    for i in range(iters):
+        incr(counter, lock, local_delay, shared_delay, stats)
+    return stats
+
+
+def _proc_countup(iters, counter, lock, local_delay, shared_delay, queue):
+    queue.put(countup(iters, counter, lock, local_delay, shared_delay).as_tuple())
+
+
+def countup_sharded(iters, shard, local_delay, shared_delay) -> LockStats:
+    """Same work as countup() but the "shared" work is done on the worker's own shard, so there is no lock to take"""
+    for i in range(iters):
+        time.sleep(local_delay)
+        time.sleep(shared_delay)
+        shard.incr()
+    return LockStats()
+
+
+def _proc_countup_sharded(iters, counter, index, local_delay, shared_delay):
+    shard = counter.shard(index)
+    countup_sharded(iters, shard, local_delay, shared_delay)
+    shard.flush()
+
+
+# ProcessPoolExecutor can't pickle a Lock or Value as a submit() argument, so they are handed to each pool process
+# once through the pool initializer and kept in module globals.
+_pool_counter = None
+_pool_lock = None
+
+
+def _pool_init(counter, lock):
+    global _pool_counter, _pool_lock
+    _pool_counter = counter
+    _pool_lock = lock
+
+
+def _pool_countup(iters, local_delay, shared_delay):
+    return countup(iters, _pool_counter, _pool_lock, local_delay, shared_delay).as_tuple()
+
+
+def run_sync(workers, iters, local_delay, shared_delay):
+    counter = Counter()
+    lock = threading.Lock()
+    stats = LockStats()
+    for w in range(workers):
+        stats.add(countup(iters, counter, lock, local_delay, shared_delay))
+    return counter.value, stats
+
+
+def run_threaded(workers, iters, local_delay, shared_delay):
+    counter = Counter()
+    lock = threading.Lock()
+    results: List[LockStats] = []
+
+    def worker():
+        results.append(countup(iters, counter, lock, local_delay, shared_delay))
+
+    threads = [threading.Thread(target=worker, daemon=True) for t in range(workers)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    stats = LockStats()
+    [stats.add(s) for s in results]
+    return counter.value, stats
+
+
+def run_multiproc(workers, iters, local_delay, shared_delay):
+    # lock=False because access is already serialized by our own lock (it is the one we want to measure)
+    counter = multiprocessing.Value('i', 0, lock=False)
+    lock = multiprocessing.Lock()
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_proc_countup, args=(iters, counter, lock, local_delay, shared_delay, queue),
+                                     daemon=True) for p in range(workers)]
+    [p.start() for p in procs]
+    stats = LockStats()
+    for p in procs:
+        stats.add(LockStats(*queue.get()))
+    [p.join() for p in procs]
+    return counter.value, stats
+
+
+def run_threaded_sharded(workers, iters, local_delay, shared_delay):
+    counter = ShardedCounter()
+    threads = [threading.Thread(target=countup_sharded, args=(iters, counter, local_delay, shared_delay), daemon=True)
+               for t in range(workers)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    return counter.value, LockStats()
+
+
+def run_multiproc_sharded(workers, iters, local_delay, shared_delay):
+    counter = ProcessShardedCounter(workers)
+    procs = [multiprocessing.Process(target=_proc_countup_sharded, args=(iters, counter, p, local_delay, shared_delay),
+                                     daemon=True) for p in range(workers)]
+    [p.start() for p in procs]
+    [p.join() for p in procs]
+    return counter.value, LockStats()
+
+
+def run_thread_pool(workers, iters, local_delay, shared_delay):
+    counter = Counter()
+    lock = threading.Lock()
+    stats = LockStats()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(countup, iters, counter, lock, local_delay, shared_delay) for w in range(workers)]
+        for f in futures:
+            stats.add(f.result())
+    return counter.value, stats
+
+
+def run_process_pool(workers, iters, local_delay, shared_delay):
+    counter = multiprocessing.Value('i', 0, lock=False)
+    lock = multiprocessing.Lock()
+    stats = LockStats()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_pool_init,
+                                                initargs=(counter, lock)) as pool:
+        futures = [pool.submit(_pool_countup, iters, local_delay, shared_delay) for w in range(workers)]
+        for f in futures:
+            stats.add(LockStats(*f.result()))
+    return counter.value, stats
+
+
+def run_async(workers, iters, local_delay, shared_delay):
+    """Coroutines, one per worker. The critical section awaits, so it needs an asyncio.Lock to stay correct."""
+    counter = Counter()
+    stats = LockStats()
+
+    async def countup_async(lock):
+        for i in range(iters):
+            await asyncio.sleep(local_delay)
+            stats.acquires += 1
+            contended = lock.locked()
+            start = time.perf_counter()
+            async with lock:
+                if contended:
+                    stats.contended += 1
+                    stats.wait += time.perf_counter() - start
+                cur = counter.value
+                await asyncio.sleep(shared_delay)
+                counter.value = cur + 1
+
+    async def runner():
+        lock = asyncio.Lock()
+        await asyncio.gather(*[countup_async(lock) for w in range(workers)])
+
+    asyncio.run(runner())
+    return counter.value, stats
+
+
+def run_async_executor(workers, iters, local_delay, shared_delay):
+    """Coroutines, one per worker, that hand each blocking increment off to a thread pool with run_in_executor()"""
+    counter = Counter()
+    lock = threading.Lock()
+    results: List[LockStats] = []
+
+    async def countup_async(pool):
+        loop = asyncio.get_running_loop()
+        stats = LockStats()
+        for i in range(iters):
+            await loop.run_in_executor(pool, incr, counter, lock, local_delay, shared_delay, stats)
+        results.append(stats)
+
+    async def runner():
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            await asyncio.gather(*[countup_async(pool) for w in range(workers)])
+
+    asyncio.run(runner())
+    stats = LockStats()
+    [stats.add(s) for s in results]
+    return counter.value, stats
+
+
+def run_subinterp(workers, iters, local_delay, shared_delay):
+    """One subinterpreter (with its own GIL) per worker. The counter is a token passed through a pipe, see
+    minimal/subinterp."""
+    from minimal.subinterp.main_subinterp import countup as countup_subinterp
+    count, stats = countup_subinterp(workers, iters, local_delay, shared_delay)
+    return count, LockStats(*stats)
+
+
+BACKENDS: Dict[str, Callable] = {
+    'sync': run_sync,
+    'threaded': run_threaded,
+    'multiproc': run_multiproc,
+    'threaded_sharded': run_threaded_sharded,
+    'multiproc_sharded': run_multiproc_sharded,
+    'async': run_async,
+    'thread_pool': run_thread_pool,
+    'process_pool': run_process_pool,
+    'async_executor': run_async_executor,
+}
+if interp.available():  # Python 3.12+
+    BACKENDS['subinterp'] = run_subinterp
+
+
+def run_one(backend: str, workers: int, iters: int, local_delay: float, shared_delay: float) -> Result:
+    start = time.perf_counter()
+    count, stats = BACKENDS[backend](workers, iters, local_delay, shared_delay)
+    elapsed = time.perf_counter() - start
+    return Result(backend, workers, iters, elapsed, count, stats)
+
+
+def sweep(backends, worker_counts, iter_counts, local_delay, shared_delay,
+          on_result: Optional[Callable[[Result], None]] = None) -> List[Result]:
+    results = []
+    for backend in backends:
+        for iters in iter_counts:
+            for workers in worker_counts:
+                result = run_one(backend, workers, iters, local_delay, shared_delay)
+                results.append(result)
+                if on_result:
+                    on_result(result)
+    return results
+
+
+HEADER = '{:<17} {:>7} {:>6} {:>9} {:>10} {:>8} {:>6} {:>10} {:>12}  {}'.format(
+    'backend', 'workers', 'iters', 'time(s)', 'incr/s', 'speedup', 'ok', 'contended', 'avg wait ms', 'scaling')
+
+
+def print_report(results: List[Result], bar_width: int = 30) -> None:
+    """Prints one block per backend. Speedup is relative to the sync backend at the same workers/iters (when it was
+    run) and the bar is throughput relative to the best result, so the rows of each block read as a scaling curve."""
+    baseline = {(r.workers, r.iters): r.elapsed for r in results if r.backend == 'sync'}
+    best = max(r.throughput for r in results)
+    print(HEADER)
+    prev = None
+    for r in results:
+        if prev is not None and (r.backend, r.iters) != prev:
+            print()
+        prev = (r.backend, r.iters)
+        base = baseline.get((r.workers, r.iters))
+        speedup = '{:0.2f}x'.format(base / r.elapsed) if base else '-'
+        bar = '#' * int(round(bar_width * r.throughput / best)) if best > 0 else ''
+        print('{:<17} {:>7} {:>6} {:>9.3f} {:>10.1f} {:>8} {:>6} {:>9.1f}% {:>12.3f}  {}'.format(
+            r.backend, r.workers, r.iters, r.elapsed, r.throughput, speedup,
+            'yes' if r.count == r.expected else 'NO', r.contended_pct, r.avg_wait_ms, bar))
+
+
+def write_csv(path: str, results: List[Result]) -> None:
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['backend', 'workers', 'iters', 'elapsed', 'count', 'expected', 'throughput',
+                         'acquires', 'contended', 'lock_wait'])
+        for r in results:
+            writer.writerow([r.backend, r.workers, r.iters, r.elapsed, r.count, r.expected, r.throughput,
+                             r.stats.acquires, r.stats.contended, r.stats.wait])
+
+
+def _int_list(txt):
+    return [int(v) for v in txt.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sweep the minimal "central counter" app over concurrency backends')
+    parser.add_argument('--backends', default=','.join(BACKENDS), help='comma separated subset of: ' + ', '.join(BACKENDS))
+    parser.add_argument('--workers', type=_int_list, default=[1, 2, 5, 10], help='comma separated worker counts')
+    parser.add_argument('--iters', type=_int_list, default=[100], help='comma separated iteration counts')
+    parser.add_argument('--local-delay', type=float, default=0.0001, help='seconds of work done outside the lock')
+    parser.add_argument('--shared-delay', type=float, default=0.0001, help='seconds of work done inside the lock')
+    parser.add_argument('--csv', help='also write raw results to this CSV file')
+    args = parser.parse_args(argv)
+
+    backends = args.backends.split(',')
+    for b in backends:
+        if b not in BACKENDS:
+            parser.error(f'unknown backend {b!r}')
+
+    print(f'local delay {args.local_delay}s, shared delay {args.shared_delay}s')
+    results = sweep(backends, args.workers, args.iters, args.local_delay, args.shared_delay,
+                    on_result=lambda r: print('  done', r.backend, r.workers, r.iters, '{:0.3f}s'.format(r.elapsed)))
+    print()
+    print_report(results)
+    if args.csv:
+        write_csv(args.csv, results)
+        print('wrote', args.csv)
+
+
+if __name__ == '__main__':
+    main()
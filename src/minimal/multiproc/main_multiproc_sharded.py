@@ -0,0 +1,36 @@
+# Minimal implementation of "central counter" in multiprocessor fashion, using a sharded counter in shared memory
+# instead of a Lock around a shared Value. Each process only writes its own shard, so no lock is needed.
+import multiprocessing
+import time
+from common.sharded import ProcessShardedCounter
+from common.timer import Timer
+
+
+def multi_countup(iters, central_counter, shard_index):
+    proc = multiprocessing.current_process()
+    print('worker', proc.name, proc.ident, proc._identity, 'shard', shard_index)
+
+    shard = central_counter.shard(shard_index)
+    for i in range(iters):
+        time.sleep(0.0001)  # represents "local" work that doesn't need the lock
+        time.sleep(0.0001)  # represents work on shared data, now done on this process's own shard
+        shard.incr()
+    shard.flush()
+
+
+def main():
+    worker_count = 5
+    iters = 100
+    central_counter = ProcessShardedCounter(worker_count)
+    print('central counter init', central_counter.value)
+    procs = [multiprocessing.Process(target=multi_countup, args=(iters, central_counter, p), daemon=True) for p in range(worker_count)]
+    print('starting', len(procs), 'processes with', iters, 'iterations each')
+    [p.start() for p in procs]
+    [p.join() for p in procs]
+
+    print('central counter final', central_counter.value)
+
+
+if __name__ == '__main__':
+    with Timer() as t:
+        main()
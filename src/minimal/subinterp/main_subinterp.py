@@ -0,0 +1,65 @@
+# Minimal implementation of "central counter" with subinterpreters (Python 3.12+, each with its own GIL)
+# Interpreters share no objects, so there is no Lock or Value to hand them. The counter itself is the lock: it lives
+# in a pipe as a single 8 byte token. Reading the token takes the lock (other readers block until it is written back),
+# writing back the incremented value releases it.
+import os
+import struct
+import time
+
+from common import interp
+
+TOKEN = struct.Struct('<q')
+
+WORKER = '''
+import os, select, struct, time
+token = struct.Struct('<q')
+acquires = contended = 0
+wait = 0.0
+for i in range({iters}):
+    time.sleep({local_delay})  # represents "local" work that doesn't need the lock
+    acquires += 1
+    ready, _, _ = select.select([{lock_r}], [], [], 0)
+    start = time.perf_counter()
+    cur, = token.unpack(os.read({lock_r}, token.size))  # blocks while another interpreter holds the token
+    if not ready:
+        contended += 1
+        wait += time.perf_counter() - start
+    time.sleep({shared_delay})  # represents work on shared data
+    os.write({lock_w}, token.pack(cur + 1))
+os.write({result_w}, struct.pack('<qqd', acquires, contended, wait))
+'''
+
+
+def countup(workers, iters, local_delay=0.0001, shared_delay=0.0001):
+    """Returns (final count, (acquires, contended, lock wait seconds) summed over the workers)"""
+    lock_r, lock_w = os.pipe()
+    result_r, result_w = os.pipe()
+    os.write(lock_w, TOKEN.pack(0))
+    script = WORKER.format(iters=iters, local_delay=local_delay, shared_delay=shared_delay, lock_r=lock_r,
+                           lock_w=lock_w, result_w=result_w)
+    started = [interp.start(script) for w in range(workers)]
+    for interp_id, thread in started:
+        thread.join()
+        interp.destroy(interp_id)
+    acquires = contended = 0
+    wait = 0.0
+    for w in range(workers):
+        a, c, s = struct.unpack('<qqd', os.read(result_r, 24))
+        acquires, contended, wait = acquires + a, contended + c, wait + s
+    count, = TOKEN.unpack(os.read(lock_r, TOKEN.size))
+    for fd in (lock_r, lock_w, result_r, result_w):
+        os.close(fd)
+    return count, (acquires, contended, wait)
+
+
+def main():
+    worker_count = 5
+    iters = 100
+    print('starting', worker_count, 'subinterpreters with', iters, 'iterations each')
+    count, stats = countup(worker_count, iters)
+    print('central counter final', count)
+
+
+if __name__ == '__main__':
+    import timeit
+    print('time:', timeit.timeit(main, number=1))
@@ -0,0 +1,43 @@
+# Minimal implementation of "central counter" in threaded fashion, using a sharded counter instead of a lock
+# Compare run time with main_threaded.py: here the workers never wait on each other
+import threading
+import time
+
+from common.sharded import ShardedCounter
+
+
+class CentralCounter:
+    def __init__(self):
+        self.counter = ShardedCounter()
+
+    def incr(self):
+        time.sleep(0.0001)  # represents "local" work that doesn't need the lock
+        time.sleep(0.0001)  # represents work on shared data, now done on this thread's own shard
+        self.counter.incr()
+
+    @property
+    def count(self):
+        return self.counter.value
+
+
+def multi_countup(iters, ctr):
+    for i in range(iters):
+        ctr.incr()
+
+
+def main():
+    central_counter = CentralCounter()  # object shared by threads
+    print('central counter init', central_counter.count)
+    worker_count = 5
+    iters = 100
+    threads = [threading.Thread(target=multi_countup, args=(iters, central_counter), daemon=True) for t in range(worker_count)]
+
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+
+    print('central counter final', central_counter.count, 'from', central_counter.counter.shard_count, 'shards')
+
+
+if __name__ == '__main__':
+    import timeit
+    print('time:', timeit.timeit(main, number=1))
@@ -0,0 +1,32 @@
+import threading
+
+from common.celllocks import CellLocks, GlobalLock
+
+
+def test_nearby_bots_share_a_lock():
+    locks = CellLocks(cell_size=40, reach=20, stripes=1024)
+    for (ax, ay), (bx, by) in [((100, 100), (119, 100)), ((39, 39), (41, 41)), ((-5, 300), (14, 319))]:
+        assert set(locks.stripes_for(ax, ay)) & set(locks.stripes_for(bx, by))
+    assert not set(locks.stripes_for(100, 100)) & set(locks.stripes_for(300, 300))
+    assert locks.stripes_for(20, 20) == sorted(locks.stripes_for(20, 20))
+
+
+def test_concurrent_moves_and_all():
+    for locks in (CellLocks(stripes=8), GlobalLock()):
+        counts = {'near': 0}
+
+        def work(x):
+            for _ in range(2000):
+                with locks.for_move(x, 50):
+                    counts['near'] += 1  # all workers are within reach of each other, so this is protected
+
+        threads = [threading.Thread(target=work, args=(x,)) for x in (40, 50, 60)]
+        for t in threads:
+            t.start()
+        for _ in range(50):
+            with locks.all():
+                pass
+        for t in threads:
+            t.join(timeout=10)
+        assert not any(t.is_alive() for t in threads)
+        assert counts['near'] == 6000
@@ -0,0 +1,47 @@
+import math
+
+from common import collision
+
+
+class FakeSprite:
+    """Just enough of arcade.Sprite for the collision functions: a rectangle with a center, size and angle"""
+    def __init__(self, x, y, angle=0.0, size=10):
+        self.center_x = x
+        self.center_y = y
+        self.angle = angle
+        self.width = size
+        self.height = size
+
+    @property
+    def points(self):
+        rad = math.radians(self.angle)
+        c, s = math.cos(rad), math.sin(rad)
+        hw, hh = self.width / 2, self.height / 2
+        return [(self.center_x + x * c - y * s, self.center_y + x * s + y * c)
+                for x, y in ((-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh))]
+
+
+def test_axis_aligned():
+    a = FakeSprite(0, 0)
+    assert collision.overlaps(a, FakeSprite(9, 9))
+    assert collision.overlaps(a, FakeSprite(0, 9.9, angle=90))
+    assert not collision.overlaps(a, FakeSprite(10, 0))  # touching edges is not an overlap
+    assert not collision.overlaps(a, FakeSprite(0, 25, angle=180))
+
+
+def test_rotated():
+    a = FakeSprite(0, 0, angle=45)
+    assert collision.overlaps(a, FakeSprite(9, 0, angle=45))  # inscribed circles overlap
+    assert collision.overlaps(a, FakeSprite(11, 0))  # needs polygon test: diagonal reaches x=7.07
+    assert not collision.overlaps(a, FakeSprite(13, 0))
+    assert not collision.overlaps(a, FakeSprite(30, 0, angle=10))  # circumscribed circles apart
+
+
+def test_first_collision():
+    me = FakeSprite(0, 0)
+    far = FakeSprite(100, 100)
+    near = FakeSprite(5, 0, angle=30)
+    sprites = [me, far, near]
+    assert collision.first_collision(me, sprites) is near
+    assert collision.any_collision(me, sprites)
+    assert not collision.any_collision(far, sprites)
@@ -0,0 +1,123 @@
+import arcade
+from common.contacts import BEGIN, ContactCache
+
+from crowd import bots
+
+
+def test_jammed_bot_hits_cache_and_events():
+    world = arcade.SpriteList()
+    a = bots.Bot(100, 100, world, arcade.color.RED)
+    wall = bots.StationaryBot(111, 100, world, arcade.color.DARK_GRAY)
+    far = bots.StationaryBot(300, 300, world, arcade.color.DARK_GRAY)
+    for i, b in enumerate((a, wall, far)):
+        b.id = i
+        world.append(b)
+    cache = ContactCache()
+
+    a.center_x = 102  # tentative move into the wall
+    assert cache.query(a, world)
+    cache.end_frame()
+    assert cache.began == {(0, 1)} and cache.full_scans == 1
+
+    a.center_x = 102  # same move next frame: answered from the cache
+    assert cache.query(a, world)
+    cache.end_frame()
+    assert cache.cache_hits == 1 and cache.full_scans == 1
+    assert cache.began == set() and cache.pairs == {(0, 1)}
+
+    wall.center_x = 200  # wall moved away: cache entry dropped, full scan finds nothing
+    assert not cache.query(a, world)
+    cache.end_frame()
+    assert cache.ended == {(0, 1)} and cache.full_scans == 2
+
+
+def test_bot_uses_class_cache():
+    world = arcade.SpriteList()
+    a = bots.Bot(100, 100, world, arcade.color.RED)
+    b = bots.StationaryBot(111, 100, world, arcade.color.DARK_GRAY)
+    a.id, b.id = 0, 1
+    world.append(a)
+    world.append(b)
+    bots.Bot.contacts = ContactCache()
+    try:
+        for frame in range(3):
+            a.update()
+            bots.Bot.contacts.end_frame()
+        assert a.center_x == 100  # blocked every frame
+        assert bots.Bot.contacts.cache_hits == 2
+    finally:
+        bots.Bot.contacts = None
+
+
+def test_events_batched_per_class():
+    from types import SimpleNamespace
+    from common.contacts import BEGIN, END, PERSIST, ContactEvents
+
+    class A(SimpleNamespace):
+        pass
+
+    class B(SimpleNamespace):
+        pass
+
+    events = ContactEvents()
+    calls = []
+    events.subscribe(A, calls.append)
+    a1, a2, b1, wall = A(id=1), A(id=2), B(id=3), B(id=4)
+    events.hit(a1, wall)
+    events.hit(b1, a1)  # B has no subscribers
+    assert events.end_frame() == 1
+    events.hit(a1, wall)
+    events.hit(a2, b1)
+    assert events.end_frame() == 2
+    assert events.end_frame() == 2
+    assert [[(e.kind, e.bot_id, e.other_id) for e in batch] for batch in calls] == [
+        [(BEGIN, 1, 4)],
+        [(PERSIST, 1, 4), (BEGIN, 2, 3)],
+        [(END, 1, 4), (END, 2, 3)],
+    ]
+    assert calls[1][1].bot is a2
+
+
+def test_bounce_reaction_dispatched_at_end_of_frame():
+    from crowd.world import World
+    world = World.from_states([('BounceBot', 0, 100.0, 100.0, 0.0, {}), ('StationaryBot', 1, 111.0, 100.0, 0.0, {})])
+    bounce = world.find(0)
+    world.bots.update()
+    assert bounce.angle == 0  # blocked, not yet reacted
+    world.events.end_frame()
+    assert bounce.angle == 180 and bounce.center_x == 100
+    world.step()
+    assert bounce.center_x == 98
+
+
+def test_worlds_have_their_own_events():
+    from crowd.world import World
+    states = [('Bot', 0, 100.0, 100.0, 0.0, {}), ('StationaryBot', 1, 111.0, 100.0, 0.0, {})]  # blocked every frame
+
+    def kinds_of_a_step(world):
+        seen = []
+        world.events.subscribe(bots.Bot, seen.extend)
+        world.step()
+        world.events.subscribers[bots.Bot].remove(seen.extend)
+        return [e.kind for e in seen]
+
+    first = World.from_states(states)
+    assert kinds_of_a_step(first) == [BEGIN]
+    second = World.from_states(states)  # same ids, but first's contacts are not second's
+    assert second.events is not first.events
+    assert kinds_of_a_step(second) == [BEGIN]
+    first.restore(0, {s[1]: s for s in states})  # contacts from before the jump don't carry over
+    assert kinds_of_a_step(first) == [BEGIN]
+
+
+def test_async_run_away_wakes_on_contact():
+    from crowd_compare.engines import AsyncEngine
+    engine = AsyncEngine([('RunAwayBot', 0, 100.0, 100.0, 180.0, {}), ('StationaryBot', 1, 90.0, 100.0, 0.0, {})], 1)
+    try:
+        engine.step()
+        runner = engine.bots[0]
+        assert runner.speed == 1.0 and runner.bumped.is_set()  # blocked, the task reacts on its turn
+        engine.step()
+        assert runner.speed == 5.0 and not runner.bumped.is_set()  # bumped: running away
+    finally:
+        engine.close()
@@ -0,0 +1,47 @@
+import numpy as np
+
+from crowd.world import random_states
+from crowd_compare.equivalence import Run, compare_runs, run_engine
+
+
+def _run(name, frames):
+    run = Run(name)
+    for snapshot in frames:
+        run.add(snapshot)
+    return run
+
+
+def test_compare_runs_finds_first_divergence():
+    reference = _run('a', [[(0, 'Bot', 0.0, 0.0, 0.0), (1, 'Bot', 5.0, 5.0, 355.0)],
+                           [(0, 'Bot', 2.0, 0.0, 0.0), (1, 'Bot', 7.0, 5.0, 355.0)],
+                           [(0, 'Bot', 4.0, 0.0, 0.0), (1, 'Bot', 9.0, 5.0, 355.0)]])
+    other = _run('b', [[(1, 'Bot', 5.0, 5.0, -5.0), (0, 'Bot', 0.0, 0.0, 360.0)],  # order and angle wrap don't matter
+                       [(0, 'Bot', 2.0, 0.0, 0.0), (1, 'Bot', 7.0, 5.5, 355.0)],
+                       [(0, 'Bot', 4.0, 0.0, 0.0)]])
+    d = compare_runs(reference, other, tolerance=0.1)
+    assert (d.frame, d.bot_id, d.kind, d.bots_at_frame, d.bots_at_end) == (2, 1, 'Bot', 1, 1)
+    assert d.expected == (7.0, 5.0, 355.0) and d.actual == (7.0, 5.5, 355.0)
+    assert compare_runs(reference, other, tolerance=1.0).frame == 3  # then bot 1 is missing
+    assert compare_runs(reference, reference, tolerance=0.0) is None
+
+
+def test_crowd_and_kernel_agree():
+    states = random_states(300, 200, 50, seed=9)  # random walkers too: both draw from per-bot streams
+    crowd = run_engine('crowd', states, 30, seed=1)
+    kernel = run_engine('crowd_interp', states, 30, seed=1, workers=1)
+    assert crowd.frames == kernel.frames == 30
+    assert compare_runs(crowd, kernel, tolerance=1e-6) is None
+
+
+def test_async_engine_runs_headless():
+    states = random_states(200, 200, 20, seed=3)
+    run = run_engine('crowd_async', states, 5, seed=1)
+    assert run.frames == 5
+    assert np.array_equal(run.ids[-1], np.arange(20))
+
+
+def test_crowd_and_async_walk_alike():
+    states = [s for s in random_states(800, 600, 40, seed=4) if s[0] == 'RandomWalkBot']  # ten walkers
+    crowd = run_engine('crowd', states, 120, seed=1)
+    walkers = run_engine('crowd_async', states, 120, seed=1)
+    assert compare_runs(crowd, walkers, tolerance=1e-6) is None  # same turns on the same frames
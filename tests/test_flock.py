@@ -0,0 +1,34 @@
+import arcade
+
+from common.spatial import attach_grid
+from crowd import bots
+
+
+def test_flock_aligns():
+    world = arcade.SpriteList()
+    flock = []
+    for i, angle in enumerate((0, 60, 120)):
+        b = bots.FlockBot(100 + i * 20, 100, world, arcade.color.ORANGE)
+        b.id = i
+        b.angle = angle
+        world.append(b)
+        flock.append(b)
+    grid = attach_grid(world)
+    for _ in range(60):
+        grid.rebuild(world)
+        for b in flock:
+            b.update()
+    spread = [(b.angle - flock[0].angle + 180) % 360 - 180 for b in flock]
+    assert max(spread) - min(spread) < 20
+
+
+def test_headless_world_flocks():
+    from crowd.world import World
+    world = World.from_states([('FlockBot', i, 100.0 + i * 20, 100.0, float(angle), {})
+                               for i, angle in enumerate((0, 60, 120))])
+    assert World().grid is not world.grid  # every world keeps its own
+    for _ in range(60):
+        world.step()  # rebuilds the world's grid
+    flock = list(world.bots)
+    spread = [(b.angle - flock[0].angle + 180) % 360 - 180 for b in flock]
+    assert max(spread) - min(spread) < 20
@@ -0,0 +1,37 @@
+import math
+
+from common.flowfield import FlowFieldCache
+
+
+def follow(field, x, y, steps=200):
+    """Walk a point along the field, one cell-sized step at a time, until it reaches the goal cell"""
+    for _ in range(steps):
+        angle = field.angle_at(x, y)
+        if angle is None:
+            break
+        x += math.cos(math.radians(angle)) * field.cell_size
+        y += math.sin(math.radians(angle)) * field.cell_size
+    return x, y
+
+
+def test_routes_around_wall():
+    cache = FlowFieldCache(200, 200, cell_size=10)
+    cache.set_obstacles([(95, 20, 105, 200)])  # wall with a gap at the bottom
+    field = cache.get(150, 150)
+    assert field.angle_at(150, 150) is None  # at the goal
+    assert field.angle_at(50, 150) == -90.0  # straight toward the goal would hit the wall, head for the gap
+    x, y = follow(field, 50, 150)
+    assert cache.cell_of(x, y) == (15, 15)
+
+
+def test_lru_cache():
+    cache = FlowFieldCache(100, 100, cell_size=10, capacity=2)
+    first = cache.get(5, 5)
+    assert cache.get(8, 2) is first  # same goal cell
+    second = cache.get(55, 55)
+    cache.get(5, 5)
+    cache.get(95, 95)  # evicts the least recently used field, the second one
+    assert cache.get(55, 55) is not second
+    assert (cache.hits, cache.misses) == (2, 4)
+    cache.set_obstacles([(40, 40, 60, 60)])
+    assert not cache.fields
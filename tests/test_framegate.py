@@ -0,0 +1,36 @@
+import threading
+
+from common.framegate import FrameGate
+
+
+def test_one_step_per_frame():
+    gate = FrameGate()
+    steps = [0, 0, 0]
+
+    def worker(i, seen):
+        while True:
+            seen = gate.wait_for_frame(seen)
+            if seen > 5:
+                gate.unregister()
+                gate.done()
+                return
+            steps[i] += 1
+            gate.done()
+
+    threads = [threading.Thread(target=worker, args=(i, gate.register()), daemon=True) for i in range(3)]
+    for t in threads:
+        t.start()
+    for frame in range(1, 6):
+        assert gate.run_frame(timeout=5)
+        assert steps == [frame] * 3  # every worker made exactly one step, and all of them are done
+    assert gate.run_frame(timeout=5)
+    for t in threads:
+        t.join(timeout=5)
+    assert gate.workers == 0
+    assert gate.run_frame(timeout=1)  # no workers left, nothing to wait for
+
+
+def test_thread_bench_smoke():
+    from crowd_thread import bench
+    result = bench.run_one('cells', 2, bot_count=20, frames=3, seed=1)
+    assert result.throughput > 0
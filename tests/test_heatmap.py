@@ -0,0 +1,28 @@
+import numpy as np
+from common.heatmap import FlowGrid
+
+
+def test_occupancy_and_flow(tmp_path):
+    grid = FlowGrid(100, 50, cell_size=10, smoothing=1.0)  # smoothing=1: averages are just the latest frame
+    ids = np.array([0, 1, 2])
+    grid.accumulate(ids, [5, 6, 95], [5, 5, 45])
+    grid.accumulate(ids, [7, 8, 95], [5, 5, 45])  # bots 0 and 1 move right by 2, bot 2 stays
+    grids = grid.grids()
+    assert grids['occupancy'].shape == (5, 10)
+    assert grids['occupancy'][0, 0] == 4
+    assert grids['occupancy'][4, 9] == 2
+    assert grids['density'][0, 0] == 2
+    assert grids['vx'][0, 0] == 2
+    assert grids['vy'][0, 0] == 0
+    assert grids['speed'][4, 9] == 0
+
+    path = str(tmp_path / 'heat.npz')
+    grid.export(path)
+    assert np.load(path)['occupancy'].sum() == 6
+
+
+def test_new_bots_have_no_velocity():
+    grid = FlowGrid(100, 100, cell_size=10, smoothing=1.0)
+    grid.accumulate([0], [50], [50])
+    grid.accumulate([0, 7], [50, 51], [50, 50])  # bot 7 appears far from where any "previous" value could be
+    assert grid.mean_speed.max() == 0
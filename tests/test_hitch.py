@@ -0,0 +1,49 @@
+import gc
+import json
+import time
+
+from common.hitch import GcScheduler, HitchDetector
+
+
+def test_flags_slow_frame_with_gc_context(tmp_path):
+    log = tmp_path / 'hitches.jsonl'
+    detector = HitchDetector(budget=0.01, log_path=str(log))
+    try:
+        assert detector.end_frame(bot_count=5) is None  # first frame only starts the clock
+        assert detector.end_frame(bot_count=5) is None  # fast frame
+        gc.collect(0)
+        time.sleep(0.02)
+        record = detector.end_frame(bot_count=7, spawned=2, deleted=1)
+    finally:
+        detector.close()
+    assert record is not None
+    assert record['frame'] == 2 and record['bots'] == 7 and record['spawned'] == 2 and record['deleted'] == 1
+    assert any(e['generation'] == 0 for e in record['gc'])
+    assert json.loads(log.read_text().splitlines()[-1])['frame'] == 2
+
+
+def test_gc_scheduler_collects_only_with_slack():
+    scheduler = GcScheduler(min_slack=0.004)
+    scheduler.freeze_after_init()
+    try:
+        assert not gc.isenabled()
+        garbage = [[] for i in range(scheduler.thresholds[0] + 10)]
+        assert scheduler.idle(slack=0.0) is None  # over threshold, but no time to spare this frame
+        assert scheduler.idle(slack=0.01) is not None
+    finally:
+        scheduler.restore()
+    assert gc.isenabled()
+
+
+def test_intentional_sleep_is_not_a_hitch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    detector = HitchDetector(budget=0.01)
+    try:
+        detector.end_frame(bot_count=1)
+        time.sleep(0.03)  # a frame rate preset's sleep
+        assert detector.end_frame(bot_count=1, sleep=0.03) is None
+        time.sleep(0.03)
+        assert detector.end_frame(bot_count=1, sleep=0.005)['sleep'] == 0.005
+    finally:
+        detector.close()
+    assert list(tmp_path.iterdir()) == []  # no log unless asked for
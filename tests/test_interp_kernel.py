@@ -0,0 +1,54 @@
+import pytest
+
+from common import interp, streams
+from crowd.world import World, random_states
+from crowd_interp import kernel
+from crowd_interp.crowd_sandbox import PartitionedWorld
+
+
+def test_pack_round_trip():
+    own = [[1, kernel.RUN_AWAY, 10.5, 20.25, 45.0, 15, 1, 0]]
+    ghosts = [[2, kernel.BOT, 30.0, 40.0, 0.0, 0, 0, 0], [3, kernel.STATIONARY, 50.0, 60.0, 90.0, 0, 0, 0]]
+    assert kernel.unpack(kernel.pack(own)) == own
+    assert kernel.unpack_frame(kernel.pack_frame(own, ghosts)) == (own, ghosts)
+
+
+def test_overlaps_matches_crowd():
+    a = [1, kernel.BOT, 100.0, 100.0, 0.0, 0, 0, 0]
+    assert kernel.overlaps(a, [2, kernel.BOT, 109.0, 100.0, 0.0, 0, 0, 0])
+    assert not kernel.overlaps(a, [2, kernel.BOT, 110.0, 100.0, 0.0, 0, 0, 0])  # touching
+    assert kernel.overlaps(a, [2, kernel.BOT, 111.0, 100.0, 45.0, 0, 0, 0])
+    assert not kernel.overlaps(a, [2, kernel.BOT, 113.0, 100.0, 45.0, 0, 0, 0])
+
+
+def test_kernel_follows_crowd_bots():
+    """The kernel and the crowd engine take the same steps, random walkers included"""
+    states = random_states(300, 200, 60, seed=4)
+    assert any(s[0] == 'RandomWalkBot' for s in states)
+    streams.seed(7)
+    world = World.from_states(states)
+    records = [kernel.from_state(s) for s in states]
+    for _ in range(40):
+        world.step()
+        kernel.step(records, [], 7)
+    expected = {b.id: (b.center_x, b.center_y) for b in world.bots}
+    for r in records:
+        assert r[kernel.X] == pytest.approx(expected[r[kernel.ID]][0])
+        assert r[kernel.Y] == pytest.approx(expected[r[kernel.ID]][1])
+
+
+@pytest.mark.parametrize('executor', ['thread', 'interp'])
+def test_partitions_conserve_bots(executor):
+    if executor == 'interp' and not interp.available():
+        pytest.skip('needs Python 3.12 or later')
+    records = [kernel.from_state(s) for s in random_states(400, 200, 80, seed=2)]
+    inline = PartitionedWorld([list(r) for r in records], 400, 3, 'inline', seed=5)
+    pw = PartitionedWorld([list(r) for r in records], 400, 3, executor, seed=5)
+    try:
+        for _ in range(20):
+            inline.step()
+            pw.step()
+    finally:
+        pw.close()
+    assert sorted(r[kernel.ID] for r in pw.records) == list(range(80))
+    assert sorted(map(tuple, pw.records)) == sorted(map(tuple, inline.records))
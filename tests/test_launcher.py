@@ -0,0 +1,30 @@
+import urllib.request
+
+from common.metrics import Metrics, MetricsServer
+from crowd.__main__ import main
+
+
+def test_metrics_text_format():
+    metrics = Metrics()
+    metrics.add('frames_total', 2, 'frames simulated')
+    metrics.add('frames_total', 3)
+    metrics.set('bots', 40)
+    assert metrics.render() == ('# TYPE crowd_bots gauge\ncrowd_bots 40\n'
+                                '# HELP crowd_frames_total frames simulated\n'
+                                '# TYPE crowd_frames_total counter\ncrowd_frames_total 5\n')
+
+
+def test_metrics_server():
+    metrics = Metrics()
+    metrics.set('fps', 60.0)
+    server = MetricsServer(metrics, 0)
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.port}/metrics') as response:
+            assert 'crowd_fps 60.0' in response.read().decode()
+    finally:
+        server.close()
+
+
+def test_headless_run(capsys):
+    main(['--engine', 'sync', '--headless', '--frames', '5', '--scenario', 'random', '--bots', '30'])
+    assert 'sync: 5 frames of 30 bots' in capsys.readouterr().out
@@ -0,0 +1,36 @@
+import arcade
+from common.lod import LodScheduler
+from common.spatial import SpatialGrid
+
+from crowd import bots
+
+
+def _world():
+    world = arcade.SpriteList()
+    for i, (x, y) in enumerate([(100, 100), (115, 100), (400, 400)]):
+        b = bots.Bot(x, y, world, arcade.color.RED)
+        b.id = i
+        world.append(b)
+    return world
+
+
+def test_isolated_bot_updates_every_kth_frame_with_scaled_step():
+    world = _world()
+    crowded, lone = world[0], world[2]
+    lone.angle = 0
+    lod = LodScheduler(SpatialGrid(), radius=40, k=4)
+    for frame in range(8):
+        lod.update(world, frame)
+        assert lod.full == 2
+    # lone bot was updated twice (frames 2 and 6 with id 2) but still covered the distance of about 8 frames
+    assert lone.lod_last_update == 6
+    assert 400 + 2.0 * 6 <= lone.center_x <= 400 + 2.0 * 8
+    assert crowded.lod_last_update == 7
+
+
+def test_focus_rectangle():
+    world = _world()
+    lod = LodScheduler(SpatialGrid(), radius=40, k=4)
+    lod.focus = (300, 300, 500, 500)  # only the lone bot is inside, and it has no neighbours
+    lod.update(world, 1)
+    assert lod.full == 0
@@ -0,0 +1,41 @@
+from common import netstate
+
+
+def test_round_trip_and_delta_size():
+    encoder = netstate.StateEncoder(keyframe_every=10)
+    decoder = netstate.StateDecoder()
+    frames = [
+        [(1, 0, 10.0, 20.0, 0.0), (2, 3, 50.0, 50.0, 90.0)],
+        [(1, 0, 12.0, 20.0, 0.0), (2, 3, 50.0, 50.0, 90.0)],  # only bot 1 moved
+        [(1, 0, 12.0, 20.0, 45.0), (3, 1, 700.0, 10.0, 0.0)],  # bot 2 removed, bot 3 added
+        [(1, 0, 9000.0, 20.0, 45.0), (3, 1, 700.25, 10.0, 0.0)],  # bot 1 moved too far for a delta
+    ]
+    sizes = []
+    for frame, states in enumerate(frames):
+        message = encoder.encode(frame, states)
+        sizes.append(len(message))
+        length, msg_type = netstate.parse_header(message[:netstate.HEADER_SIZE])
+        assert length == len(message) - netstate.HEADER_SIZE
+        decoder.apply(msg_type, message[netstate.HEADER_SIZE:])
+        assert decoder.frame == frame
+        assert decoder.bots == {bot_id: (kind, x, y, angle) for bot_id, kind, x, y, angle in states}
+    assert decoder.keyframes == 1 and decoder.deltas == 3
+    assert sizes[1] < sizes[0]
+
+
+def test_late_viewer_waits_for_keyframe():
+    encoder = netstate.StateEncoder(keyframe_every=100)
+    encoder.encode(0, [(1, 0, 10.0, 20.0, 0.0)])
+    delta = encoder.encode(1, [(1, 0, 11.0, 20.0, 0.0)])
+    decoder = netstate.StateDecoder()
+    decoder.apply(netstate.DELTA, delta[netstate.HEADER_SIZE:])
+    assert decoder.frame is None and decoder.bots == {}
+    decoder.apply(netstate.KEYFRAME, encoder.keyframe()[netstate.HEADER_SIZE:])
+    assert decoder.frame == 1 and decoder.bots == {1: (0, 11.0, 20.0, 0.0)}
+
+
+def test_command_message():
+    message = netstate.command_message('move', id=3, x=1.5, y=2)
+    length, msg_type = netstate.parse_header(message[:netstate.HEADER_SIZE])
+    assert msg_type == netstate.COMMAND
+    assert netstate.parse_command(message[netstate.HEADER_SIZE:]) == {'cmd': 'move', 'id': 3, 'x': 1.5, 'y': 2}
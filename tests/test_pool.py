@@ -0,0 +1,39 @@
+import arcade
+from common.pool import BotPool, remove_sprite
+
+from crowd import bots
+
+
+def test_spawn_despawn_recycles():
+    world = arcade.SpriteList()
+    pool = BotPool(world)
+    first = pool.spawn(bots.OctWalkBot, arcade.color.YELLOW, [(10, 10), (50, 50), (90, 90)])
+    assert len(world) == 3
+    first[0].frame_count = 17
+
+    pool.despawn(first[:2])
+    pool.despawn(first[:1])  # despawning twice is harmless
+    assert len(world) == 3  # nothing leaves the world until compact()
+    assert pool.compact() == 2
+    assert list(world) == [first[2]]
+    assert world.sprite_idx == {first[2]: 0}
+    assert pool.free_count == 2
+
+    again = pool.spawn(bots.OctWalkBot, arcade.color.YELLOW, [(200, 200)])
+    assert again[0] in first[:2]  # reused, not newly allocated
+    assert again[0].alive and again[0].frame_count == 0 and again[0].center_x == 200
+    assert pool.created == 3 and pool.reused == 1
+
+    other = pool.spawn(bots.BounceBot, arcade.color.BLUE, [(300, 300)])
+    assert other[0] not in first
+
+
+def test_remove_sprite_leaves_no_index_entry():
+    world = arcade.SpriteList()
+    a, b = bots.OctWalkBot(10, 10, world, arcade.color.YELLOW), bots.OctWalkBot(50, 50, world, arcade.color.YELLOW)
+    world.append(a)
+    world.append(b)
+    remove_sprite(a)
+    assert list(world) == [b]
+    assert world.sprite_idx == {b: 0}  # SpriteList.remove() would keep a as a key
+    assert not a.sprite_lists
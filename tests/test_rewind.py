@@ -0,0 +1,110 @@
+import pytest
+
+from common.rewind import RewindBuffer
+from crowd.world import World, changes_since, random_states
+
+
+def _frames(count):
+    """id -> state per frame: bot 0 moves every frame, 1 never does, 2 leaves at frame 3, 3 arrives at frame 5"""
+    frames = []
+    for f in range(count):
+        states = {0: ('a', f), 1: ('b', 0)}
+        if f < 3:
+            states[2] = ('c', 0)
+        if f >= 5:
+            states[3] = ('d', f // 4)
+        frames.append(states)
+    return frames
+
+
+def test_keeps_only_changes():
+    buffer = RewindBuffer(capacity=1000, keyframe_every=1000)
+    still = {i: ('Bot', i, float(i), 0.0, 0.0, {}) for i in range(2000)}
+    buffer.record(0, dict(still))
+    keyframe = buffer.nbytes
+    for f in range(1, 101):
+        buffer.record(f, dict(still))
+    assert buffer.nbytes - keyframe < 100 * 50  # an empty delta per frame
+    for f in range(101, 201):
+        buffer.record(f, {**still, **{i: ('Bot', i, float(i), float(f), 0.0, {}) for i in range(100)}})
+    assert len(buffer) == 201 and (buffer.oldest, buffer.newest) == (0, 200)
+    assert buffer.state_at(150)[7] == ('Bot', 7, 7.0, 150.0, 0.0, {})
+
+
+def test_state_at_any_frame_in_either_direction():
+    frames = _frames(40)
+    buffer = RewindBuffer(capacity=1000, keyframe_every=7)
+    for f, states in enumerate(frames):
+        buffer.record(f, dict(states))
+    for f in list(range(39, -1, -1)) + list(range(40)) + [13, 2, 30, 6, 5, 4, 3]:
+        assert list(buffer.state_at(f).items()) == list(frames[f].items())  # order too
+    with pytest.raises(IndexError):
+        buffer.state_at(40)
+
+
+def test_capacity_drops_whole_segments():
+    buffer = RewindBuffer(capacity=20, keyframe_every=5)
+    for f, states in enumerate(_frames(100)):
+        buffer.record(f, dict(states))
+    assert 20 <= len(buffer) < 25 and buffer.newest == 99
+    with pytest.raises(IndexError):
+        buffer.state_at(buffer.oldest - 1)
+    assert buffer.state_at(buffer.oldest) == _frames(100)[buffer.oldest]
+
+
+def test_truncate_then_record_another_future():
+    frames = _frames(30)
+    buffer = RewindBuffer(capacity=100, keyframe_every=4)
+    for f, states in enumerate(frames):
+        buffer.record(f, dict(states))
+    buffer.truncate(9)
+    assert buffer.newest == 9
+    buffer.record(10, {0: ('z', 0)})
+    assert buffer.state_at(10) == {0: ('z', 0)}
+    assert buffer.state_at(9) == frames[9] and buffer.state_at(2) == frames[2]
+
+
+def test_world_resumed_from_a_buffered_frame_replays_the_same():
+    world = World.from_states(random_states(300, 200, 60, seed=5))
+    buffer = RewindBuffer(capacity=100, keyframe_every=10)
+    recorded = {}
+    for _ in range(40):
+        world.step()
+        if world.frame == 15:
+            world.spawn_bots('RandomWalkBot', [(150.0, 100.0)])
+        if world.frame == 25:
+            world.despawn([3, 4])
+        recorded[world.frame] = [b.get_state() for b in world.bots if b.alive]
+        buffer.record(world.frame, {b.id: b.get_state() for b in world.bots if b.alive})
+
+    world.restore(20, buffer.state_at(20))  # bots that left since come back, the bots' order included
+    assert [b.get_state() for b in world.bots] == recorded[20]
+    buffer.truncate(20)
+    while world.frame < 40:
+        world.step()
+        if world.frame == 25:
+            world.despawn([3, 4])
+        assert [b.get_state() for b in world.bots if b.alive] == recorded[world.frame]
+
+
+def test_recording_the_changed_bots_keeps_the_same_frames():
+    world = World.from_states(random_states(300, 200, 60, seed=7))
+    world.spawn_bots('FlockBot', [(30.0 + 12 * i, 30.0) for i in range(5)])
+    everything = RewindBuffer(capacity=100, keyframe_every=10)
+    changes = RewindBuffer(capacity=100, keyframe_every=10)
+    changes.record(world.frame, {b.id: b.get_state() for b in world.bots})
+    everything.record(world.frame, {b.id: b.get_state() for b in world.bots})
+    for _ in range(50):
+        world.step()
+        if world.frame == 15:
+            world.spawn_bots('RandomWalkBot', [(150.0, 100.0)])
+        if world.frame == 25:
+            world.despawn([3, 4])
+        if world.frame == 30:
+            world.set_goal(10.0, 10.0)
+        changes.record_changes(world.frame, *changes_since(world.bots, changes.latest))
+        everything.record(world.frame, {b.id: b.get_state() for b in world.bots if b.alive})
+    for f in range(everything.oldest, everything.newest + 1):
+        assert list(changes.state_at(f).items()) == list(everything.state_at(f).items())
+    with pytest.raises(ValueError):
+        changes.record_changes(world.frame + 2, {}, [])
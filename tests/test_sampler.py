@@ -0,0 +1,33 @@
+import threading
+
+from common.sampler import SamplingProfiler
+
+
+def test_sample_skips_idle_threads():
+    ready = threading.Event()
+    release = threading.Event()
+
+    def idle():
+        ready.set()
+        release.wait()
+
+    t = threading.Thread(target=idle, daemon=True)
+    t.start()
+    ready.wait()
+    try:
+        profiler = SamplingProfiler()
+        profiler.sample()
+        # the calling thread is never sampled and the idle thread is parked in Event.wait()
+        assert all(stack[-1][1] != 'Condition.wait' for stack in profiler.counts)
+
+        profiler = SamplingProfiler(include_idle=True, per_thread=True)
+        profiler.sample()
+        assert any(stack[0] == ('thread', t.name) for stack in profiler.counts)
+    finally:
+        release.set()
+
+
+def test_collapsed_format():
+    profiler = SamplingProfiler()
+    profiler.counts[(('mod', 'outer'), ('mod', 'inner'))] = 3
+    assert list(profiler.collapsed()) == ['mod:outer;mod:inner 3']
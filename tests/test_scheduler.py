@@ -0,0 +1,34 @@
+import time
+
+from common.scheduler import BudgetScheduler
+
+
+class SlowBot:
+    def __init__(self):
+        self.updates = 0
+        self.scales = []
+        self.step_scale = 1
+
+    def update(self):
+        self.updates += 1
+        self.scales.append(self.step_scale)
+        time.sleep(0.001)
+
+
+def test_round_robin_under_budget():
+    bots = [SlowBot() for i in range(40)]
+    sched = BudgetScheduler(budget=0.005, min_per_frame=4, check_every=1)
+    for frame in range(20):
+        sched.update(bots, frame)
+        assert sched.updated < len(bots)  # never the whole list in one frame
+    counts = [b.updates for b in bots]
+    assert max(counts) - min(counts) <= 1  # round robin: nobody starves
+    assert sched.lag > 1
+    assert max(max(b.scales) for b in bots) > 1  # stale bots catch up with bigger steps
+
+
+def test_everything_updated_when_cheap():
+    bots = [SlowBot() for i in range(3)]
+    sched = BudgetScheduler(budget=1.0)
+    sched.update(bots, 0)
+    assert [b.updates for b in bots] == [1, 1, 1]
@@ -0,0 +1,35 @@
+import asyncio
+
+from common import netstate
+from crowd.server import SimulationServer
+from crowd.world import World
+
+
+class FakeWriter:
+    def get_extra_info(self, name):
+        return ('viewer', 0)
+
+    def close(self):
+        pass
+
+
+def test_bad_commands_are_dropped_and_the_server_keeps_stepping():
+    server = SimulationServer(World(), fps=0)
+    reader = asyncio.StreamReader()
+    for message in (netstate.frame_message(netstate.COMMAND, b'{not json'),
+                    netstate.frame_message(netstate.COMMAND, b'\xff\xfe'),
+                    netstate.frame_message(netstate.COMMAND, b'[1, 2]'),
+                    netstate.command_message('add', kind='NoSuchBot', x=1, y=2),
+                    netstate.command_message('add', kind='Bot', x='far', y=2),
+                    netstate.command_message('move', x=1, y=2),
+                    netstate.command_message('jump', x=1, y=2),
+                    netstate.command_message('add', kind='Bot', x=100, y=100)):
+        reader.feed_data(message)
+    reader.feed_eof()
+    asyncio.run(server.handle_viewer(reader, FakeWriter()))  # returns at EOF, not on the first bad payload
+    assert len(server.commands) == 6  # the two unreadable payloads were dropped
+
+    server.step()
+    server.step()
+    assert server.world.frame == 2
+    assert [type(b).__name__ for b in server.world.bots] == ['Bot']  # only the good command was applied
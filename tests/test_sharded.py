@@ -0,0 +1,49 @@
+import multiprocessing
+import threading
+
+import pytest
+from common.sharded import ProcessShardedCounter, ShardedCounter
+
+
+def _countup(counter, iters):
+    for i in range(iters):
+        counter.incr()
+
+
+def test_sharded_counter_threads():
+    c = ShardedCounter()
+    threads = [threading.Thread(target=_countup, args=(c, 1000)) for t in range(4)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    assert c.value == 4000
+    assert c.shard_count == 4
+
+
+def _proc_countup(counter, index, iters):
+    shard = counter.shard(index, flush_every=7)
+    for i in range(iters):
+        shard.incr()
+    shard.flush()
+
+
+def test_process_sharded_counter():
+    c = ProcessShardedCounter(3)
+    procs = [multiprocessing.Process(target=_proc_countup, args=(c, p, 100)) for p in range(3)]
+    [p.start() for p in procs]
+    [p.join() for p in procs]
+    assert c.value == 300
+
+
+def test_shard_flush_batches_writes():
+    c = ProcessShardedCounter(1)
+    shard = c.shard(0, flush_every=10)
+    for i in range(9):
+        shard.incr()
+    assert c.value == 0
+    shard.incr()
+    assert c.value == 10
+
+
+def test_bad_shard_index():
+    with pytest.raises(IndexError):
+        ProcessShardedCounter(2).shard(2)
@@ -0,0 +1,55 @@
+import gc
+import weakref
+
+from crowd.world import random_states
+from crowd_compare.engines import AsyncEngine, ThreadEngine
+from crowd_compare.soak import run_soak
+
+STATES = [('RandomWalkBot', 0, 100.0, 100.0, 0.0, {}), ('RunAwayBot', 1, 300.0, 300.0, 90.0, {}),
+          ('Bot', 2, 500.0, 100.0, 180.0, {})]
+
+
+def test_thread_kill_ends_thread():
+    engine = ThreadEngine(STATES, 1)
+    try:
+        engine.step()
+        before = engine.workers()
+        bot = engine.bots[0]
+        engine.delete([bot.id])
+        engine.step()  # the thread exits at the start of this frame, step() joins it
+        assert not bot.worker.is_alive()
+        assert engine.workers() == before - 1
+        assert [b.id for b in engine.bots] == [1, 2]
+    finally:
+        engine.close()
+    assert engine.workers() == before - 3
+
+
+def test_async_kill_cancels_task_and_frees_bot():
+    engine = AsyncEngine(STATES, 1)
+    try:
+        engine.step()
+        before = engine.workers()
+        bot = engine.bots[1]
+        task = bot.task
+        ref = weakref.ref(bot)
+        engine.delete([1])
+        del bot
+        engine.step()
+        assert task.cancelled()
+        assert engine.workers() == before - 1
+        del task  # its coroutine refers to the bot
+        gc.collect()
+        assert ref() is None  # nothing (the SpriteList index included) keeps a deleted bot alive
+    finally:
+        engine.close()
+
+
+def test_short_soak_is_level():
+    states = [s for s in random_states(400, 300, 20, 3) if s[0] != 'FlockBot']
+    for name in ('crowd', 'crowd_thread', 'crowd_async'):
+        result = run_soak(name, states, 60, churn=3, snapshot_every=20, width=400, height=300, report=lambda *a: None)
+        assert result.frames == 60 and result.spawned == result.deleted == 180
+        assert len(result.samples) == 3
+        assert result.worker_growth == 0, name
+        assert result.failures(512 * 1024) == [], name
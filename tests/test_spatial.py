@@ -0,0 +1,34 @@
+import random
+
+from common.spatial import SpatialGrid
+
+
+class Point:
+    def __init__(self, x, y):
+        self.center_x = x
+        self.center_y = y
+
+
+def test_within_and_has_neighbour():
+    a, b, c, d = Point(0, 0), Point(30, 0), Point(100, 100), Point(-31, -1)
+    grid = SpatialGrid(cell_size=32)
+    grid.rebuild([a, b, c, d])
+    assert set(grid.within(0, 0, 31, exclude=a)) == {b}
+    assert set(grid.within(0, 0, 40)) == {a, b, d}
+    assert grid.has_neighbour(a, 30)
+    assert not grid.has_neighbour(c, 50)
+    assert set(grid.query_box(90, 90, 110, 110)) == {c}
+
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(3)
+    points = [Point(rng.uniform(0, 500), rng.uniform(0, 500)) for _ in range(300)]
+    grid = SpatialGrid(cell_size=32)
+    grid.rebuild(points)
+    for x, y in [(250, 250), (0, 0), (-100, 600), (499, 1)]:
+        by_distance = sorted(points, key=lambda p: (p.center_x - x) ** 2 + (p.center_y - y) ** 2)
+        assert grid.nearest(x, y, 5) == by_distance[:5]
+        within = [p for p in by_distance if (p.center_x - x) ** 2 + (p.center_y - y) ** 2 <= 40 ** 2]
+        assert grid.nearest(x, y, 100, max_radius=40) == within
+    assert grid.nearest(250, 250, 3, exclude=by_distance[0])[0] is not by_distance[0]
+    assert SpatialGrid().nearest(0, 0, 3) == []
@@ -0,0 +1,40 @@
+import numpy as np
+
+from common import streams
+from crowd.world import World
+
+
+def test_draws_are_pure_functions_of_the_key():
+    a = streams.randint(3, 5, 0, 360, seed=1)
+    assert streams.randint(3, 5, 0, 360, seed=1) == a
+    assert [streams.randint(3, k, 0, 360, seed=1) for k in range(8)] != [a] * 8
+    keys = {(s, i, k, d) for s in (1, 2) for i in (0, 1) for k in (0, 1) for d in (0, 1)}
+    assert len({streams.bits(i, k, d, seed=s) for s, i, k, d in keys}) == len(keys)
+    values = [streams.randint(i, 0, 10, 20, seed=1) for i in range(2000)]
+    assert min(values) == 10 and max(values) == 20
+    assert all(0.0 <= streams.random(i, 1) < 1.0 for i in range(100))
+
+
+def test_batches_equal_single_draws():
+    ids = np.arange(-5, 500)
+    counters = ids % 13
+    ints = streams.randints(ids, counters, 0, 360, draw=1, seed=99)
+    assert ints.tolist() == [streams.randint(int(i), int(k), 0, 360, draw=1, seed=99) for i, k in zip(ids, counters)]
+    floats = streams.uniforms(ids, 4, -30, 30, seed=99)
+    assert floats.tolist() == [streams.uniform(int(i), 4, -30, 30, seed=99) for i in ids]
+
+
+def _walkers(order):
+    """Far enough apart that they can't bump into each other in 60 frames"""
+    return World.from_states([('RandomWalkBot', i, 300.0 * i, 300.0 * i, 0.0, {}) for i in order])
+
+
+def test_random_walk_is_independent_of_update_order():
+    streams.seed(12345)
+    forward, backward = _walkers(range(6)), _walkers(reversed(range(6)))
+    for _ in range(60):
+        forward.step()
+        backward.step()
+    state = sorted(b.get_state()[1:5] for b in forward.bots)
+    assert state == sorted(b.get_state()[1:5] for b in backward.bots)
+    assert all(b.walks > 1 for b in forward.bots)
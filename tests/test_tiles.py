@@ -0,0 +1,61 @@
+from crowd import bots
+from crowd_tiles.crowd_sandbox import TiledWorld, check_conservation, deep_overlaps
+from crowd_tiles.tiles import TileLayout
+
+
+def test_layout():
+    layout = TileLayout(300, 200, 3, 2)
+    assert len(layout) == 6
+    assert layout.tile_at(10, 10) == 0
+    assert layout.tile_at(250, 150) == 5
+    assert layout.tile_at(-50, 500) == 3  # beyond the edge belongs to the edge tile
+    assert sorted(layout.neighbours(0)) == [1, 3, 4]
+    assert len(layout.neighbours(4)) == 5
+    assert layout.halo_targets(0, 50, 50, 20) == set()
+    assert layout.halo_targets(0, 95, 95, 20) == {1, 3, 4}
+    assert layout.next_hop(0, 2) == 1
+
+
+def test_state_round_trip():
+    b = bots.RandomWalkBot(30, 40, [], bots.KIND_COLORS['RandomWalkBot'])
+    b.id = 7
+    b.angle = 90
+    b.frame_count = 5
+    copy = bots.from_state(b.get_state(), [])
+    assert type(copy) is bots.RandomWalkBot
+    assert (copy.id, copy.center_x, copy.center_y, copy.angle, copy.frame_count) == (7, 30, 40, 90, 5)
+
+
+def test_bots_migrate_without_loss():
+    layout = TileLayout(200, 100, 2, 1)
+    # two bots heading right across the border, one heading left, and one that bumps into a ghost on the border
+    states = [('Bot', 0, 80.0, 20.0, 0.0, {}), ('Bot', 1, 60.0, 50.0, 0.0, {}), ('Bot', 2, 120.0, 80.0, 180.0, {}),
+              ('StationaryBot', 3, 106.0, 20.0, 0.0, {})]
+    world = TiledWorld(layout, states, frames=25)
+    world.start()
+    for frame in range(25):
+        snapshot, counts = world.next_frame()
+        check_conservation(snapshot, 4)
+    world.join()
+    positions = {b[0]: (b[2], b[3]) for b in snapshot}
+    assert positions[0] == (96.0, 20.0)  # blocked by the ghost of bot 3 in the other tile
+    assert positions[1][0] > 100
+    assert positions[2][0] < 100
+
+
+def test_deep_overlaps():
+    snapshot = [(0, 'Bot', 10.0, 10.0), (1, 'Bot', 18.0, 12.0), (2, 'Bot', 40.0, 10.0), (3, 'Bot', 50.0, 10.0)]
+    assert deep_overlaps(snapshot) == [(0, 1)]  # 2 and 3 are a bot's width apart: touching, not overlapping
+
+
+def test_bots_stepping_into_the_same_space_across_a_border():
+    layout = TileLayout(200, 100, 2, 1)
+    # each is clear of where the other started, but they step to 8 apart: the higher id takes its move back
+    states = [('Bot', 0, 91.0, 50.0, 0.0, {}), ('Bot', 1, 103.0, 50.0, 180.0, {})]
+    world = TiledWorld(layout, states, frames=3)
+    world.start()
+    for frame in range(3):
+        snapshot, counts = world.next_frame()
+        assert check_conservation(snapshot, 2) == []
+    world.join()
+    assert sorted((b[0], b[2], b[3]) for b in snapshot) == [(0, 93.0, 50.0), (1, 103.0, 50.0)]
@@ -0,0 +1,49 @@
+import json
+
+from common.tracing import Tracer
+
+
+class Walker:
+    def step(self):
+        pass
+
+    def update(self):
+        self.step()
+
+
+class Runner(Walker):
+    pass
+
+
+def test_capture_window(tmp_path):
+    tracer = Tracer(path_prefix=str(tmp_path / 'trace'))
+    tracer.instrument(Walker, 'step', 'move')
+    orig_step = Walker.step
+    sprites = [Walker(), Runner(), Runner()]
+
+    tracer.start(frames=2)
+    assert Walker.step is not orig_step  # wrapped while capturing
+    for frame in range(2):
+        tracer.update_sprites(sprites)
+        tracer.end_frame()
+    assert not tracer.active
+    assert Walker.step is orig_step  # restored afterwards, so no cost when off
+
+    totals = tracer.totals()
+    assert totals[('Walker', 'update')][0] == 2
+    assert totals[('Runner', 'update')][0] == 4
+    assert totals[('Runner', 'move')][0] == 4
+    assert totals[('frame', 'frame')][0] == 2
+
+    path, = tmp_path.glob('trace_*.json')
+    events = json.loads(path.read_text())['traceEvents']
+    assert len(events) == 14
+    assert all(e['ph'] == 'X' for e in events)
+
+
+def test_span_inactive_is_noop():
+    tracer = Tracer()
+    with tracer.span('draw', 'draw'):
+        pass
+    tracer.end_frame()
+    assert tracer.events == []
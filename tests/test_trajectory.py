@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from common.trajectory import TrajectoryReader, TrajectoryWriter
+
+
+class FakeBot:
+    def __init__(self, id, x, y, angle=0.0):
+        self.id = id
+        self.center_x = x
+        self.center_y = y
+        self.angle = angle
+
+
+class OtherBot(FakeBot):
+    pass
+
+
+def test_write_and_seek(tmp_path):
+    path = str(tmp_path / 'traj')
+    with TrajectoryWriter(path) as writer:
+        for frame in range(10):
+            bots = [FakeBot(i, frame + i, -frame, 45.0) for i in range(frame % 3 + 1)]  # varying bot count
+            bots.append(OtherBot(99, 0, 0))
+            writer.append_sprites(bots)
+
+    reader = TrajectoryReader(path)
+    assert len(reader) == 10
+    assert reader.kinds == ['FakeBot', 'OtherBot']
+
+    f7 = reader.frame(7)  # 7 % 3 + 1 = 2 FakeBots + 1 OtherBot
+    assert list(f7['id']) == [0, 1, 99]
+    assert list(f7['x']) == [7, 8, 0]
+    assert list(f7['kind']) == [0, 0, 1]
+    assert isinstance(f7['x'], np.memmap)  # a view into the mapped file, not a copy
+
+    last = reader.frame(-1)
+    assert list(last['y']) == [-9, 0]
+
+    data = reader.frame_range(2, 5)
+    assert list(data['offsets']) == [0, 4, 6]
+    assert len(data['id']) == 4 + 2 + 3
+
+    track = reader.track(1)
+    assert list(track['frame']) == [1, 2, 4, 5, 7, 8]
+    assert list(track['x']) == [2, 3, 5, 6, 8, 9]
+
+    with pytest.raises(IndexError):
+        reader.frame(10)
+
+
+def test_mismatched_columns(tmp_path):
+    with TrajectoryWriter(str(tmp_path / 'traj')) as writer:
+        with pytest.raises(ValueError):
+            writer.append([1, 2], [0, 0], [1.0], [1.0, 2.0], [0.0, 0.0])
+
+
+def test_read_while_recording(tmp_path):
+    path = str(tmp_path / 'traj')
+    writer = TrajectoryWriter(path, flush_every=2)
+    reader = TrajectoryReader(path)  # meta.json is there before the first frame
+    assert len(reader) == 0 and reader.kinds == []
+
+    writer.append_sprites([FakeBot(1, 1, 1)])
+    reader.reload()
+    assert len(reader) == 0  # not flushed yet
+    writer.append_sprites([FakeBot(1, 2, 2), OtherBot(2, 0, 0)])
+    reader.reload()
+    assert len(reader) == 2
+    assert reader.kinds == ['FakeBot', 'OtherBot']
+    assert list(reader.frame(1)['kind']) == [0, 1]
+
+    # columns written past the index, and an index ahead of a column, are not counted
+    writer._files['x'].write(np.float32(5).tobytes()[:2])
+    writer._files['x'].flush()
+    reader.reload()
+    assert len(reader) == 2
+    with open(str(tmp_path / 'traj' / 'index.i64'), 'ab') as f:
+        f.write(np.int64(10).tobytes())
+    reader.reload()
+    assert len(reader) == 2